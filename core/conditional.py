@@ -0,0 +1,65 @@
+"""
+Conditional GET for endpoints serving slowly changing collections.
+
+The ETag and Last-Modified of a response are derived from the version stamps
+of the models it is built from (see core.versioning), read with one indexed
+query. A request whose `If-None-Match` or `If-Modified-Since` still matches is
+answered with 304 before the view runs, so the collection itself is never
+queried. Responses carry `Cache-Control: public, max-age=...` so HTTP caches
+can serve them without asking at all for a while.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from core import versioning
+from core.models import DataVersion
+
+
+def stamps(keys):
+    """The ETag and last modification time of the data sets `keys`."""
+    rows = DataVersion.objects.filter(key__in=keys).values_list('key', 'version', 'updated_at')
+    versions, last_modified = {}, None
+    for key, version, updated_at in rows:
+        versions[key] = version
+        last_modified = max(last_modified, updated_at) if last_modified else updated_at
+    return '"{}"'.format('.'.join(str(versions.get(key, 0)) for key in keys)), last_modified
+
+
+def conditional_get(*models, max_age=None):
+    """
+    Decorates a GET view (or, through `method_decorator`, a view method) whose
+    response only changes when rows of `models` change. Saves and deletes of
+    `models` are tracked from here on; bulk writes must bump the stamps
+    themselves.
+    """
+    versioning.track(*models)
+    keys = [versioning.key_for(model) for model in models]
+
+    def cached_stamps(request):
+        # Both header callbacks of one request share a single query.
+        if not hasattr(request, '_conditional_stamps'):
+            request._conditional_stamps = stamps(keys)
+        return request._conditional_stamps
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=lambda request, *args, **kwargs: cached_stamps(request)[0],
+            last_modified_func=lambda request, *args, **kwargs: cached_stamps(request)[1],
+        )(view)
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+                patch_cache_control(response, public=True, max_age=(
+                    max_age if max_age is not None else getattr(settings, 'CONDITIONAL_GET_MAX_AGE', 60)
+                ))
+                patch_vary_headers(response, ['Accept'])
+            return response
+
+        return inner
+
+    return decorator
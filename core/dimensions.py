@@ -0,0 +1,34 @@
+"""
+Parsing of 'LxWxH' dimension strings into numeric, orientation-free columns.
+
+Dimensions are stored sorted from largest to smallest, so "box A fits in box B
+in some axis-aligned orientation" becomes three plain column comparisons.
+"""
+import re
+
+DIMENSIONS_PATTERN = re.compile(
+    r'^\s*(\d+(?:\.\d+)?)\s*[xX×*]\s*(\d+(?:\.\d+)?)\s*[xX×*]\s*(\d+(?:\.\d+)?)\s*$'
+)
+
+
+def parse_dimensions(value):
+    """
+    Returns the dimensions in `value` sorted in descending order, or None when
+    the string is empty, malformed or all zeros ('0x0x0' means "not given").
+    """
+    match = DIMENSIONS_PATTERN.match(value or '')
+    if match is None:
+        return None
+    dimensions = sorted((float(side) for side in match.groups()), reverse=True)
+    if not any(dimensions):
+        return None
+    return tuple(dimensions)
+
+
+def dimension_columns(value):
+    """Values for the (large, medium, small, volume) columns; all None when not given."""
+    dimensions = parse_dimensions(value)
+    if dimensions is None:
+        return None, None, None, None
+    large, medium, small = dimensions
+    return large, medium, small, large * medium * small
@@ -0,0 +1,35 @@
+from rest_framework import serializers
+
+
+class PrimaryKeyListField(serializers.ListField):
+    """
+    A list of primary keys validated in bulk: ids found in `cached_ids` (a
+    callable returning a set-like of known ids) cost nothing, the rest are
+    checked with a single `pk__in` query, and every missing id is reported at
+    once. Validates to the de-duplicated list of ids, in request order.
+    """
+    default_error_messages = {
+        'does_not_exist': 'Invalid pk(s) {pk_values} - object(s) do not exist.',
+    }
+
+    def __init__(self, queryset, cached_ids=None, **kwargs):
+        kwargs.setdefault('child', serializers.IntegerField())
+        self.queryset = queryset
+        self.cached_ids = cached_ids
+        super().__init__(**kwargs)
+
+    def __deepcopy__(self, memo):
+        # Serializers deep-copy their fields; share the id source (e.g. a registry) instead.
+        memo[id(self.cached_ids)] = self.cached_ids
+        return super().__deepcopy__(memo)
+
+    def to_internal_value(self, data):
+        ids = list(dict.fromkeys(super().to_internal_value(data)))
+        known = self.cached_ids() if self.cached_ids is not None else ()
+        unknown = [pk for pk in ids if pk not in known]
+        if unknown:
+            found = set(self.queryset.filter(pk__in=unknown).values_list('pk', flat=True))
+            missing = [pk for pk in unknown if pk not in found]
+            if missing:
+                self.fail('does_not_exist', pk_values=', '.join(map(str, missing)))
+        return ids
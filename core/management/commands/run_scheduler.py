@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core import scheduler
+
+
+class Command(BaseCommand):
+    help = "Run the periodic jobs registered by the installed apps"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run every job once and exit")
+
+    def handle(self, *args, **kwargs):
+        jobs = scheduler.jobs()
+        for job in jobs:
+            self.stdout.write(f"{job.name}: every {job.interval}s")
+        runner = scheduler.Scheduler(jobs)
+        if kwargs['once']:
+            runner.run_pending()
+            self.stdout.write(self.style.SUCCESS(f"Ran {len(jobs)} jobs."))
+            return
+        runner.run_forever()
@@ -1,8 +1,54 @@
-from django.db import models
+from django.db import models, transaction
 
 class ApplicationVersion(models.Model):
     version = models.CharField(max_length=50)
     release_date = models.DateField()
 
     def __str__(self):
-        return f"Version {self.version} released on {self.release_date}"
\ No newline at end of file
+        return f"Version {self.version} released on {self.release_date}"
+
+class DataVersion(models.Model):
+    """
+    A counter per data set (usually a model label) that is bumped on every
+    change, so caches in any process can tell whether they are stale.
+    """
+    key = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key} v{self.version}"
+
+
+class SyncTrackedModel(models.Model):
+    """
+    Reference data that clients copy and keep in sync (see core.sync). Every
+    save stamps the row with the next sync version in the same transaction.
+    Bulk writes bypass save() and must set `sync_version` themselves.
+    """
+    updated_at = models.DateTimeField(auto_now=True)
+    sync_version = models.PositiveBigIntegerField(default=0, db_index=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        from core import sync
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'sync_version', 'updated_at'}
+        with transaction.atomic(using=kwargs.get('using')):
+            self.sync_version = sync.next_version()
+            super().save(*args, **kwargs)
+
+
+class Tombstone(models.Model):
+    """A deleted row of a SyncTrackedModel, kept so clients can drop their copy."""
+    model_label = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    sync_version = models.PositiveBigIntegerField(db_index=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.model_label} #{self.object_id} deleted at v{self.sync_version}"
@@ -0,0 +1,124 @@
+"""
+Builds select_related/prefetch_related plans from a serializer's field tree,
+so list endpoints run a fixed number of queries however many rows they return.
+"""
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+def _related_field(model, attr):
+    try:
+        return model._meta.get_field(attr)
+    except FieldDoesNotExist:
+        # Reverse relations without a related_name are reached through `<model>_set`.
+        for relation in model._meta.related_objects:
+            if relation.get_accessor_name() == attr:
+                return relation
+    return None
+
+
+def _resolve(model, source_attrs):
+    """
+    Follows `source_attrs` through model relations. Returns the lookup path,
+    the target model and whether a to-many relation was crossed, or None when
+    the source is not a plain chain of relations (methods, properties, ...).
+    """
+    path = []
+    to_many = False
+    for attr in source_attrs:
+        field = _related_field(model, attr)
+        if field is None or not field.is_relation:
+            return None
+        path.append(attr)
+        to_many = to_many or field.many_to_many or field.one_to_many
+        model = field.related_model
+    return path, model, to_many
+
+
+def _reads_related_object(field):
+    if isinstance(field, (serializers.BaseSerializer, serializers.ManyRelatedField)):
+        return True
+    if isinstance(field, serializers.RelatedField):
+        return not (len(field.source_attrs) == 1 and field.use_pk_only_optimization())
+    return False
+
+
+def _walk(serializer, model, prefix, in_prefetch, select, prefetch):
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            if isinstance(field, serializers.BaseSerializer):
+                _walk(field, model, prefix, in_prefetch, select, prefetch)
+            continue
+        if not _reads_related_object(field):
+            continue
+
+        resolved = _resolve(model, field.source_attrs)
+        if resolved is None:
+            continue
+        path, related_model, to_many = resolved
+        lookup = '__'.join(prefix + path)
+        nested_in_prefetch = in_prefetch or to_many
+        (prefetch if nested_in_prefetch else select).add(lookup)
+
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        if isinstance(nested, serializers.BaseSerializer):
+            _walk(nested, related_model, prefix + path, nested_in_prefetch, select, prefetch)
+
+
+def _leaves(lookups):
+    """Drops lookups that are a prefix of a longer one; Django follows those anyway."""
+    return sorted(
+        lookup for lookup in lookups
+        if not any(other.startswith(lookup + '__') for other in lookups)
+    )
+
+
+def _build_plan(serializer, model):
+    select, prefetch = set(), set()
+    _walk(serializer, model, [], False, select, prefetch)
+    return _leaves(select), _leaves(prefetch)
+
+
+@lru_cache(maxsize=None)
+def _class_plan(serializer_class, model):
+    return _build_plan(serializer_class(), model)
+
+
+def plan_for(serializer, model):
+    """
+    Returns `(select_related, prefetch_related)` lookups for rendering `model`
+    instances with `serializer`, which may be a class or an instance. Plans for
+    serializer classes are computed once and reused.
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    if isinstance(serializer, type):
+        return _class_plan(serializer, model)
+    return _build_plan(serializer, model)
+
+
+def optimize_queryset(queryset, serializer):
+    select, prefetch = plan_for(serializer, queryset.model)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+class QueryPlanMixin:
+    """
+    Generic view mixin that applies the serializer's query plan to the
+    filtered queryset, for list and detail endpoints alike.
+    """
+
+    def get_query_plan_serializer(self):
+        """The serializer (class or instance) the plan is built from."""
+        return self.get_serializer_class()
+
+    def filter_queryset(self, queryset):
+        return optimize_queryset(super().filter_queryset(queryset), self.get_query_plan_serializer())
@@ -0,0 +1,61 @@
+"""
+In-process registries of reference data.
+
+A registry builds an immutable snapshot of a few small tables on first use and
+serves lookups from memory. Before reusing a snapshot it re-reads the tables'
+version stamps at most every `REFERENCE_DATA_CHECK_INTERVAL` seconds, so other
+processes pick up changes within that interval. Writes made in this process
+drop the snapshot right away.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from core import versioning
+
+
+class Registry:
+    models = ()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._version = None
+        self._checked_at = 0.0
+        self.keys = [versioning.key_for(model) for model in self.models]
+
+    @property
+    def check_interval(self):
+        return getattr(settings, 'REFERENCE_DATA_CHECK_INTERVAL', 5)
+
+    def build(self):
+        """Loads and returns a new snapshot."""
+        raise NotImplementedError
+
+    def get(self):
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return snapshot
+        with self._lock:
+            version = versioning.current_many(self.keys)
+            if self._snapshot is None or version != self._version:
+                self._snapshot = self.build()
+                self._version = version
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def _version_bumped(self, key, **kwargs):
+        if key in self.keys:
+            self.invalidate()
+            # Another thread may reload before the write commits; reload once more afterwards.
+            transaction.on_commit(self.invalidate)
+
+    def connect(self):
+        """Tracks the registry's models and drops the snapshot on local writes. Call from AppConfig.ready()."""
+        versioning.track(*self.models)
+        versioning.version_bumped.connect(self._version_bumped, dispatch_uid=f'{type(self).__module__}.registry')
@@ -0,0 +1,50 @@
+"""
+Periodic jobs run by `manage.py run_scheduler`.
+
+Apps register their jobs from AppConfig.ready() with an interval in seconds;
+one scheduler process per deployment runs each job once it is due. A job that
+raises is logged and retried at its next run, so one failing job does not stop
+the others.
+"""
+import logging
+import time
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+Job = namedtuple('Job', ['name', 'interval', 'func'])
+
+_jobs = {}
+
+
+def register(name, interval, func):
+    """Runs `func()` every `interval` seconds in the scheduler process. Registering a name again replaces the job."""
+    _jobs[name] = Job(name, interval, func)
+
+
+def jobs():
+    return list(_jobs.values())
+
+
+class Scheduler:
+    def __init__(self, jobs, clock=time.monotonic):
+        self.jobs = list(jobs)
+        self.clock = clock
+        now = clock()
+        self.due = {job.name: now for job in self.jobs}
+
+    def run_pending(self):
+        """Runs the jobs that are due and returns the seconds until the next one is."""
+        for job in self.jobs:
+            if self.clock() < self.due[job.name]:
+                continue
+            try:
+                job.func()
+            except Exception:
+                logger.exception("Scheduled job %s failed", job.name)
+            self.due[job.name] = self.clock() + job.interval
+        return max(0, min(self.due.values(), default=60) - self.clock())
+
+    def run_forever(self, sleep=time.sleep):
+        while True:
+            sleep(self.run_pending())
@@ -0,0 +1,65 @@
+"""
+Sparse fieldsets: `?fields=id,status,offer.price` renders only the listed
+fields. Dotted names select fields of nested serializers, and a nested field
+named without any of its own keeps all of them. Views that combine
+SparseFieldsMixin with QueryPlanMixin also build the query plan from the
+pruned serializer, so relations that are not rendered are not fetched.
+"""
+from drf_yasg import openapi
+from rest_framework import serializers
+
+FIELDS_QUERY_PARAM = 'fields'
+
+SPARSE_FIELDS_PARAMETER = openapi.Parameter(
+    FIELDS_QUERY_PARAM, openapi.IN_QUERY,
+    description="Comma-separated fields to return; use dots for nested fields, e.g. 'id,status,offer.price'",
+    type=openapi.TYPE_STRING,
+)
+
+
+def parse(value):
+    """Turns 'id,offer.price' into the tree {'id': {}, 'offer': {'price': {}}}."""
+    tree = {}
+    for name in value.split(','):
+        node = tree
+        for part in name.strip().split('.'):
+            if part:
+                node = node.setdefault(part, {})
+    return tree
+
+
+def prune(serializer, tree, path=''):
+    """Drops the fields of `serializer` that `tree` does not select and returns it."""
+    if isinstance(serializer, serializers.ListSerializer):
+        prune(serializer.child, tree, path)
+        return serializer
+    fields = serializer.fields
+    unknown = [f'{path}{name}' for name in tree if name not in fields]
+    if unknown:
+        raise serializers.ValidationError({FIELDS_QUERY_PARAM: [f"Unknown field: {name}" for name in unknown]})
+    for name in list(fields):
+        if name not in tree:
+            fields.pop(name)
+        elif tree[name]:
+            if not isinstance(fields[name], serializers.BaseSerializer):
+                raise serializers.ValidationError({FIELDS_QUERY_PARAM: [f"{path}{name} has no nested fields"]})
+            prune(fields[name], tree[name], f'{path}{name}.')
+    return serializer
+
+
+class SparseFieldsMixin:
+    """Generic view mixin that applies `?fields=` to the serializer and, with QueryPlanMixin, to the query plan."""
+
+    def sparse_fields(self):
+        value = self.request.query_params.get(FIELDS_QUERY_PARAM)
+        return parse(value) if value else None
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        tree = self.sparse_fields()
+        return prune(serializer, tree) if tree else serializer
+
+    def get_query_plan_serializer(self):
+        if self.sparse_fields():
+            return self.get_serializer()
+        return super().get_query_plan_serializer()
@@ -0,0 +1,69 @@
+"""
+Streaming serialization of large querysets.
+
+Rows are read with `QuerySet.iterator(chunk_size=...)` and serialized one chunk
+at a time, so the worker never holds more than a chunk of model instances or
+rendered JSON in memory, and the first bytes leave before the last row is read.
+"""
+import json
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.query_planner import optimize_queryset
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Makes `Accept: application/x-ndjson` and `?format=ndjson` negotiable. Views
+    that list it stream newline-delimited JSON themselves instead of rendering.
+    """
+    media_type = NDJSON_MEDIA_TYPE
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, list):
+            return ''.join(json.dumps(row, cls=JSONEncoder) + '\n' for row in data).encode()
+        return (json.dumps(data, cls=JSONEncoder) + '\n').encode()
+
+
+def _chunks(queryset, chunk_size):
+    rows = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_json_array(queryset, serializer_class, chunk_size):
+    encoder = JSONEncoder()
+    yield '['
+    first = True
+    for chunk in _chunks(queryset, chunk_size):
+        rendered = ','.join(encoder.encode(row) for row in serializer_class(chunk, many=True).data)
+        yield rendered if first else ',' + rendered
+        first = False
+    yield ']'
+
+
+def iter_ndjson(queryset, serializer_class, chunk_size):
+    encoder = JSONEncoder()
+    for chunk in _chunks(queryset, chunk_size):
+        yield ''.join(encoder.encode(row) + '\n' for row in serializer_class(chunk, many=True).data)
+
+
+def streaming_response(queryset, serializer_class, chunk_size=500, ndjson=False):
+    queryset = optimize_queryset(queryset, serializer_class)
+    if ndjson:
+        return StreamingHttpResponse(
+            iter_ndjson(queryset, serializer_class, chunk_size), content_type=NDJSON_MEDIA_TYPE
+        )
+    return StreamingHttpResponse(
+        iter_json_array(queryset, serializer_class, chunk_size), content_type='application/json'
+    )
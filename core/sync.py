@@ -0,0 +1,86 @@
+"""
+Offline copies of reference data.
+
+Models deriving from core.models.SyncTrackedModel are stamped with a global,
+monotonically increasing sync version on every save, and their deletions leave
+a Tombstone with the version of the delete. Apps register the models clients
+copy with `register()`; the reference data document then holds, per data set,
+either every row or only the rows changed and deleted after a client's version:
+
+    {"version": 42, "since": 40,
+     "datasets": {"airports": {"fields": ["id", ...], "rows": [[...], ...], "deleted": [7]}, ...}}
+
+Rows are column lists in `fields` order to keep the document small. The full
+document is rendered and gzip-compressed once per version.
+"""
+import gzip
+import json
+import threading
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.signals import post_delete
+
+from core import versioning
+from core.models import DataVersion, Tombstone
+
+SYNC_KEY = 'reference_data.sync'
+
+_datasets = {}
+_snapshot_lock = threading.Lock()
+_snapshot = None
+
+
+def next_version():
+    """Takes the next sync version; call inside the transaction of the write it stamps."""
+    return versioning.bump(SYNC_KEY)
+
+
+def current_version():
+    return versioning.current(SYNC_KEY)
+
+
+def _record_deletion(sender, instance, **kwargs):
+    Tombstone.objects.create(
+        model_label=versioning.key_for(sender), object_id=instance.pk, sync_version=next_version(),
+    )
+
+
+def register(name, model, fields):
+    """Publishes `fields` of `model` as the data set `name`. Call from AppConfig.ready()."""
+    _datasets[name] = (model, list(fields))
+    post_delete.connect(_record_deletion, sender=model, dispatch_uid=f'core.sync.{versioning.key_for(model)}')
+
+
+def document(since=None):
+    """The reference data as a dict; only changes after version `since` when given."""
+    # Read the version first: rows written meanwhile are sent again next time, never skipped.
+    version = current_version()
+    datasets = {}
+    for name, (model, fields) in _datasets.items():
+        rows = model.objects.order_by('pk')
+        dataset = {'fields': fields}
+        if since is not None:
+            rows = rows.filter(sync_version__gt=since)
+            dataset['deleted'] = list(Tombstone.objects.filter(
+                model_label=versioning.key_for(model), sync_version__gt=since,
+            ).order_by('sync_version').values_list('object_id', flat=True))
+        dataset['rows'] = [list(row) for row in rows.values_list(*fields)]
+        datasets[name] = dataset
+    return {'version': version, 'since': since, 'datasets': datasets}
+
+
+def render(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+
+
+def full_snapshot():
+    """(version, JSON bytes, gzip bytes) of the whole reference data, rendered once per version."""
+    global _snapshot
+    # The stamp's change time guards against a version number being reused, e.g. after a restore.
+    stamp = DataVersion.objects.filter(key=SYNC_KEY).values_list('version', 'updated_at').first()
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot[0] != stamp:
+            data = document()
+            content = render(data)
+            _snapshot = (stamp, (data['version'], content, gzip.compress(content, mtime=0)))
+        return _snapshot[1]
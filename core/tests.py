@@ -1,3 +1,196 @@
+import gzip
+import json
+from datetime import date
+
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework import serializers
+
+from core import scheduler, sync, versioning
+from core.dimensions import parse_dimensions
+from core.fields import PrimaryKeyListField
+from core.models import ApplicationVersion, DataVersion, Tombstone
+from locations.models import Country, City, Airport
+from items.models.items import ItemCategory
+
+
+class VersioningTest(TestCase):
+    def test_bump_creates_and_increments(self):
+        self.assertEqual(versioning.current('tests.thing'), 0)
+        versioning.bump('tests.thing')
+        versioning.bump('tests.thing')
+        self.assertEqual(versioning.current('tests.thing'), 2)
+
+    def test_current_many_keeps_order(self):
+        DataVersion.objects.create(key='tests.b', version=7)
+        self.assertEqual(versioning.current_many(['tests.a', 'tests.b']), (0, 7))
+
+
+class PrimaryKeyListFieldTest(TestCase):
+    def setUp(self):
+        self.ids = [ItemCategory.objects.create(name=name, description=name).pk for name in ('A', 'B', 'C')]
+
+    def validate(self, data, cached_ids=None):
+        field = PrimaryKeyListField(queryset=ItemCategory.objects.all(), cached_ids=cached_ids)
+        return field.run_validation(data)
+
+    def test_single_query_for_the_whole_list(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.validate(self.ids + [self.ids[0]]), self.ids)
+
+    def test_reports_every_missing_id(self):
+        with self.assertRaises(serializers.ValidationError) as raised:
+            self.validate([self.ids[0], 998, 999])
+        self.assertIn('998, 999', str(raised.exception.detail))
+
+    def test_cached_ids_skip_the_query(self):
+        with self.assertNumQueries(0):
+            self.validate(self.ids, cached_ids=lambda: set(self.ids))
+        with self.assertNumQueries(1):
+            self.validate(self.ids, cached_ids=lambda: {self.ids[0]})
+
+
+class ParseDimensionsTest(TestCase):
+    def test_parse_dimensions(self):
+        self.assertEqual(parse_dimensions('15x10x2.5'), (15.0, 10.0, 2.5))
+        self.assertEqual(parse_dimensions(' 2 X 30 x 4 '), (30.0, 4.0, 2.0))
+        self.assertIsNone(parse_dimensions('0x0x0'))
+        self.assertIsNone(parse_dimensions('15x10'))
+        self.assertIsNone(parse_dimensions(''))
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        ItemCategory.objects.create(name='Documents', description='Paper')
+        self.url = reverse('get-all-categories')
+
+    def test_unchanged_collection_is_not_queried(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=', response['Cache-Control'])
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        # Only the version stamps are read.
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        ItemCategory.objects.create(name='Fragile', description='Glass')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_function_view(self):
+        ApplicationVersion.objects.create(version='1.2.0', release_date=date(2025, 1, 1))
+        response = self.client.get('/core/latest-version/')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/core/latest-version/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+
+class ReferenceDataSyncTest(TestCase):
+    def setUp(self):
+        self.url = reverse('reference-data')
+        self.country = Country.objects.create(country_code='AM', country_abbr='ARM', country_name='Armenia')
+        self.city = City.objects.create(country=self.country, city_code='EVN', city_abbr='EV',
+                                        city_name='Yerevan', timezone='Asia/Yerevan')
+        self.airport = Airport.objects.create(city=self.city, airport_code='EVN', airport_name='Zvartnots')
+        ItemCategory.objects.create(name='Documents', description='Paper')
+
+    def fetch(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, json.loads(response.content)
+
+    def rows(self, data, dataset):
+        fields = data['datasets'][dataset]['fields']
+        return [dict(zip(fields, row)) for row in data['datasets'][dataset]['rows']]
+
+    def test_full_snapshot(self):
+        response, data = self.fetch()
+        self.assertEqual(response['ETag'], f'"{data["version"]}"')
+        self.assertEqual(self.rows(data, 'airports')[0]['airport_code'], 'EVN')
+        self.assertEqual(self.rows(data, 'cities')[0]['country_id'], self.country.pk)
+        self.assertEqual(self.rows(data, 'categories')[0]['name'], 'Documents')
+        self.assertEqual(set(data['datasets']),
+                         {'countries', 'cities', 'airports', 'city_policies', 'categories'})
+
+    def test_gzip_is_precompressed_once_per_version(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content))['version'], sync.current_version())
+
+        # Unchanged data: only the version stamp is read.
+        with self.assertNumQueries(1):
+            self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+
+    def test_delta_since_version(self):
+        _, data = self.fetch()
+        version = data['version']
+
+        self.airport.airport_name = 'Zvartnots International'
+        self.airport.save(update_fields=['airport_name'])
+        gyumri = City.objects.create(country=self.country, city_code='LWN', city_abbr='GY',
+                                     city_name='Gyumri', timezone='Asia/Yerevan')
+        deleted_id = gyumri.pk
+        gyumri.delete()
+
+        response, delta = self.fetch(since=version)
+        self.assertGreater(delta['version'], version)
+        self.assertEqual([row['airport_name'] for row in self.rows(delta, 'airports')], ['Zvartnots International'])
+        self.assertEqual(delta['datasets']['countries']['rows'], [])
+        self.assertEqual(delta['datasets']['cities']['rows'], [])
+        self.assertEqual(delta['datasets']['cities']['deleted'], [deleted_id])
+
+        response = self.client.get(self.url, {'since': version}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_cascaded_deletes_leave_tombstones(self):
+        _, data = self.fetch()
+        self.country.delete()
+        _, delta = self.fetch(since=data['version'])
+        self.assertEqual(delta['datasets']['airports']['deleted'], [self.airport.pk])
+        self.assertEqual(Tombstone.objects.count(), 3)
+
+    def test_invalid_since(self):
+        self.assertEqual(self.client.get(self.url, {'since': -1}).status_code, 400)
+
+
+class SchedulerTest(TestCase):
+    def test_jobs_run_when_due(self):
+        now = [0]
+        runs = []
+        runner = scheduler.Scheduler([
+            scheduler.Job('often', 10, lambda: runs.append('often')),
+            scheduler.Job('rarely', 60, lambda: runs.append('rarely')),
+        ], clock=lambda: now[0])
+
+        self.assertEqual(runner.run_pending(), 10)
+        now[0] = 10
+        self.assertEqual(runner.run_pending(), 10)
+        now[0] = 60
+        runner.run_pending()
+        self.assertEqual(runs, ['often', 'rarely', 'often', 'often', 'rarely'])
+
+    def test_failing_job_does_not_stop_the_others(self):
+        runs = []
+
+        def broken():
+            raise RuntimeError('boom')
+
+        runner = scheduler.Scheduler([
+            scheduler.Job('broken', 10, broken),
+            scheduler.Job('healthy', 10, lambda: runs.append('healthy')),
+        ], clock=lambda: 0)
+        with self.assertLogs('core.scheduler', 'ERROR'):
+            runner.run_pending()
+        self.assertEqual(runs, ['healthy'])
 
-# Create your tests here.
+    def test_apps_register_their_jobs(self):
+        self.assertIn('expire_offers', {job.name for job in scheduler.jobs()})
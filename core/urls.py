@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import version_info
+from .views import version_info, ReferenceDataView
 urlpatterns = [
     path('latest-version/', version_info, name='item-list-create'),
+    path('reference-data/', ReferenceDataView.as_view(), name='reference-data'),
 
 ]
@@ -0,0 +1,51 @@
+"""
+Version stamps for slowly changing data.
+
+`track()` bumps a model's stamp whenever one of its rows is saved or deleted
+through the ORM. Bulk writes (`bulk_create`, `QuerySet.update`, raw SQL) do not
+send signals, so code doing those has to call `bump()` itself.
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal
+
+from core.models import DataVersion
+
+# Sent after a stamp was bumped, with `key`.
+version_bumped = Signal()
+
+
+def key_for(model):
+    return model._meta.label_lower
+
+
+def bump(key):
+    """Increments the stamp of `key` and returns its new value."""
+    with transaction.atomic():
+        stamp, created = DataVersion.objects.select_for_update().get_or_create(key=key, defaults={'version': 1})
+        if not created:
+            stamp.version += 1
+            stamp.save(update_fields=['version', 'updated_at'])
+    version_bumped.send(sender=DataVersion, key=key)
+    return stamp.version
+
+
+def current(key):
+    return current_many([key])[0]
+
+
+def current_many(keys):
+    """Returns the stamps of `keys` as a tuple, in order, with 0 for keys never bumped."""
+    versions = dict(DataVersion.objects.filter(key__in=keys).values_list('key', 'version'))
+    return tuple(versions.get(key, 0) for key in keys)
+
+
+def _model_changed(sender, **kwargs):
+    bump(key_for(sender))
+
+
+def track(*models):
+    for model in models:
+        uid = f'core.versioning.{key_for(model)}'
+        post_save.connect(_model_changed, sender=model, dispatch_uid=uid + '.save')
+        post_delete.connect(_model_changed, sender=model, dispatch_uid=uid + '.delete')
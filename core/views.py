@@ -1,12 +1,75 @@
 # core/views.py
-from django.http import JsonResponse
+import gzip
+
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import permissions, serializers, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import sync
+from core.conditional import conditional_get
 from core.models import ApplicationVersion
 
 
+@conditional_get(ApplicationVersion)
 def version_info(request):
     try:
         current_version = ApplicationVersion.objects.latest('release_date')
     except ApplicationVersion.DoesNotExist:
         return JsonResponse({'error': 'No version information available.'}, status=404)
 
-    return JsonResponse({'version': current_version.version})
\ No newline at end of file
+    return JsonResponse({'version': current_version.version})
+
+
+class ReferenceDataQuerySerializer(serializers.Serializer):
+    since = serializers.IntegerField(required=False, min_value=0,
+                                     help_text="Version the client already has; only later changes are returned.")
+
+
+class ReferenceDataView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    @staticmethod
+    def etag(version, since):
+        return quote_etag(str(version) if since is None else f'{version}-{since}')
+
+    @swagger_auto_schema(
+        query_serializer=ReferenceDataQuerySerializer,
+        operation_description="Countries, cities, airports, city policies and item categories as one "
+                              "versioned document of column lists. With `since`, only rows changed after "
+                              "that version plus the ids deleted since. Gzip-compressed when accepted.",
+        responses={
+            200: "Returned the reference data.",
+            304: "The client's copy is current.",
+            400: "Bad Request",
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        query = ReferenceDataQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        since = query.validated_data.get('since')
+
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and if_none_match == self.etag(sync.current_version(), since):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+            response['ETag'] = if_none_match
+        else:
+            if since is None:
+                version, content, compressed = sync.full_snapshot()
+            else:
+                data = sync.document(since)
+                version, content, compressed = data['version'], sync.render(data), None
+            if 'gzip' in request.headers.get('Accept-Encoding', ''):
+                response = HttpResponse(compressed or gzip.compress(content, mtime=0),
+                                        content_type='application/json')
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(content, content_type='application/json')
+            response['ETag'] = self.etag(version, since)
+        patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+        patch_vary_headers(response, ['Accept-Encoding'])
+        return response
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class FlightRequestsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'flight_requests'
+
+    def ready(self):
+        from django.conf import settings
+
+        from core import scheduler
+        from flight_requests import checkout, holds
+
+        scheduler.register('release_capacity_holds', getattr(settings, 'CAPACITY_HOLD_REAP_INTERVAL', 60),
+                           holds.release_expired)
+        scheduler.register('process_checkout_outbox', getattr(settings, 'CHECKOUT_OUTBOX_INTERVAL', 2),
+                           checkout.process_outbox)
@@ -0,0 +1,98 @@
+"""
+Courier capacity taken by requests.
+
+A request reserves its item's weight on the offer when it is paid for or, if
+it was not, when the courier accepts it, out of the weight held for it during
+checkout if the hold has not expired (see flight_requests.holds). The
+reservation is one conditional UPDATE that only matches while the offer is
+available and has that much weight left besides the weight held for payments
+in progress, so concurrent reservations can never oversell it. The same
+statement flips the offer to 'taken' when the reservation uses up the last of
+its weight. Rejecting or cancelling a request gives its weight back and
+reopens a full offer.
+
+Request transitions are conditional updates on the state the caller read, so
+of two concurrent actions on one request only the first takes effect. Offers
+without an available weight are not limited by weight.
+
+`update()` sends no signals, so every change re-indexes the offer itself.
+"""
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from flight_requests.models.request import Request
+from offers import search_index
+from offers.models import Offer
+from offers.signals import invalidate_after_commit
+
+ACCEPTED = 'in_process'
+OPEN_STATUSES = ('pending', ACCEPTED)
+
+
+class CapacityError(Exception):
+    """The request can not move to the asked status; the message says why."""
+
+
+def take(weight, held=0):
+    """The UPDATE values taking `weight` off an offer, of which `held` was held for it."""
+    return {
+        # Every expression of an UPDATE reads the row as it was, so this compares the weight before the reservation.
+        'status': Case(When(status='available', available_weight=weight, then=Value('taken')), default=F('status')),
+        'available_weight': F('available_weight') - weight,
+        'held_weight': F('held_weight') - held,
+    }
+
+
+def reserve(offer_id, weight):
+    """Takes `weight` off the offer if it is available and has that much left unheld. Returns whether it did."""
+    return bool(Offer.objects.filter(
+        Q(available_weight__isnull=True) | Q(available_weight__gte=F('held_weight') + weight),
+        pk=offer_id,
+        status='available',
+    ).update(**take(weight)))
+
+
+def restore(offer_id, weight):
+    """Gives `weight` back to the offer, reopening it if it was full."""
+    Offer.objects.filter(pk=offer_id).update(
+        status=Case(When(status='taken', available_weight__lte=0, then=Value('available')), default=F('status')),
+        available_weight=F('available_weight') + weight,
+    )
+
+
+def reindex(offer_id):
+    invalidate_after_commit(search_index.sync_offers([offer_id]), [offer_id])
+
+
+def accept(flight_request):
+    """Moves a pending request to accepted, reserving its item's weight on the offer unless it already is."""
+    from flight_requests import holds
+
+    reserved = flight_request.reserved_weight
+    weight = reserved if reserved is not None else flight_request.item.weight
+    with transaction.atomic():
+        if not Request.objects.filter(pk=flight_request.pk, status='pending', reserved_weight=reserved).update(
+                status=ACCEPTED, reserved_weight=weight, updated_at=timezone.now()):
+            raise CapacityError("Only pending requests can be accepted.")
+        if reserved is None:
+            holds.reserve(flight_request, weight)
+    flight_request.refresh_from_db()
+
+
+def close(flight_request, status):
+    """Moves an open request to `status`, giving back the weight it reserved or held."""
+    from flight_requests import holds
+
+    with transaction.atomic():
+        open_request = Request.objects.filter(
+            pk=flight_request.pk, status=flight_request.status, reserved_weight=flight_request.reserved_weight
+        )
+        if flight_request.status not in OPEN_STATUSES or not open_request.update(
+                status=status, reserved_weight=None, updated_at=timezone.now()):
+            raise CapacityError(f"Only pending or accepted requests can be {status}.")
+        if flight_request.reserved_weight is not None:
+            restore(flight_request.offer_id, flight_request.reserved_weight)
+            reindex(flight_request.offer_id)
+        holds.release(flight_request)
+    flight_request.refresh_from_db()
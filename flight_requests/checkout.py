@@ -0,0 +1,177 @@
+"""
+Stripe checkout sessions created outside the request cycle, through a
+transactional outbox.
+
+CreateRequestView commits the request, its capacity hold and a CheckoutOutbox
+row in one transaction and answers without calling Stripe. `process_outbox`,
+which the scheduler runs every CHECKOUT_OUTBOX_INTERVAL seconds, leases the
+due rows, creates their sessions and publishes each result to the requester's
+WebSocket group (see flight_requests.consumers). Clients that are not
+connected poll the checkout endpoint instead.
+
+Every attempt for a row sends the row's idempotency key, so when a response is
+lost and the attempt retried, Stripe returns the session it already created
+instead of making a second one. Failed attempts are retried with exponential
+backoff; after CHECKOUT_OUTBOX_MAX_ATTEMPTS the checkout fails and the
+capacity hold is released.
+
+Stripe only accepts sessions expiring at least 30 minutes after they are
+created. A row whose first attempt comes too late moves its expiry, and its
+hold's, a full CAPACITY_HOLD_TTL ahead. Retries must resend the parameters
+of the first attempt, so a retry that comes too late fails the checkout.
+
+A checkout paid after its hold lapsed and its weight was sold is refunded
+(see `refund`).
+"""
+import logging
+from datetime import timedelta
+
+import stripe
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from flight_requests import capacity, holds
+from flight_requests.models.request import CheckoutOutbox
+from flight_requests.serializers import CheckoutSerializer
+
+logger = logging.getLogger(__name__)
+
+SUCCESS_URL = 'https://ugogo-test.azurewebsites.net/payment-success?session_id={CHECKOUT_SESSION_ID}'
+CANCEL_URL = 'https://ugogo-test.azurewebsites.net/payment-error'
+
+# Longer than a Stripe call can take, so a leased row is never processed by two workers at once.
+LEASE = timedelta(minutes=5)
+MAX_BACKOFF = timedelta(minutes=5)
+# Stripe's minimum session lifetime of 30 minutes, plus a margin for the call itself.
+MIN_SESSION_LIFETIME = timedelta(minutes=31)
+
+
+def group_name(user_id):
+    return f'checkout_{user_id}'
+
+
+def enqueue(flight_request, hold):
+    """Queues the checkout session of a new request, to expire with its capacity hold."""
+    return CheckoutOutbox.objects.create(request=flight_request, expires_at=hold.expires_at)
+
+
+def session_params(entry):
+    offer = entry.request.offer
+    flight = offer.user_flight.flight
+    return {
+        'payment_method_types': ['card'],
+        'line_items': [{
+            'price_data': {
+                'currency': 'usd',
+                'product_data': {
+                    'name': f'Flight Offer #{flight}',
+                    'description': f'{flight}',
+                },
+                'unit_amount': int(offer.price * 100),  # integer in cents
+            },
+            'quantity': 1,
+        }],
+        'mode': 'payment',
+        'metadata': {'request_id': str(entry.request_id)},
+        'expires_at': int(entry.expires_at.timestamp()),
+        'success_url': SUCCESS_URL,
+        'cancel_url': CANCEL_URL,
+    }
+
+
+def claim(now, batch_size):
+    """Leases up to `batch_size` due rows to this worker and returns them."""
+    with transaction.atomic():
+        ids = list(
+            CheckoutOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now).order_by('next_attempt_at')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        CheckoutOutbox.objects.filter(pk__in=ids).update(next_attempt_at=now + LEASE)
+    return list(CheckoutOutbox.objects.filter(pk__in=ids).select_related(
+        'request__offer__user_flight__flight__from_airport',
+        'request__offer__user_flight__flight__to_airport',
+    ))
+
+
+def publish(entry):
+    """Sends the checkout's state to the requester's open WebSockets; polling still works if this fails."""
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    try:
+        async_to_sync(layer.group_send)(group_name(entry.request.requester_id), {
+            'type': 'checkout.update',
+            'checkout': CheckoutSerializer(entry).data,
+        })
+    except Exception:
+        logger.exception("Could not publish the checkout of request %s", entry.request_id)
+
+
+def prepare_expiry(entry, now, first_attempt):
+    """Makes the session expire late enough for Stripe, if it still can. Returns whether it does."""
+    if entry.expires_at >= now + MIN_SESSION_LIFETIME:
+        return True
+    if not first_attempt:
+        return False
+    expires_at = now + holds.ttl()
+    # Accepted requests have reserved their weight and hold nothing; pending ones without a hold lost it.
+    if not holds.extend(entry.request, expires_at) and entry.request.reserved_weight is None:
+        return False
+    entry.expires_at = expires_at
+    return True
+
+
+def process(entry, now):
+    first_attempt = entry.attempts == 0
+    entry.attempts += 1
+    if entry.request.status not in capacity.OPEN_STATUSES:
+        entry.status, entry.last_error = 'failed', "The request is no longer open."
+    elif not prepare_expiry(entry, now, first_attempt):
+        entry.status, entry.last_error = 'failed', "The checkout expired before its session could be created."
+        holds.release(entry.request)
+    else:
+        try:
+            session = stripe.checkout.Session.create(**session_params(entry),
+                                                     idempotency_key=str(entry.idempotency_key))
+        except Exception as e:
+            entry.last_error = str(e)
+            if entry.attempts >= getattr(settings, 'CHECKOUT_OUTBOX_MAX_ATTEMPTS', 5):
+                entry.status = 'failed'
+                holds.release(entry.request)
+            else:
+                entry.next_attempt_at = now + min(timedelta(seconds=2 ** entry.attempts), MAX_BACKOFF)
+        else:
+            entry.status, entry.session_id, entry.checkout_url, entry.last_error = 'ready', session.id, session.url, ''
+    entry.save(update_fields=['status', 'attempts', 'next_attempt_at', 'expires_at', 'session_id', 'checkout_url',
+                              'last_error', 'updated_at'])
+    if entry.status != 'pending':
+        publish(entry)
+
+
+def process_outbox(now=None, batch_size=20):
+    """Creates the sessions of the due checkouts and returns how many rows were processed."""
+    now = now or timezone.now()
+    total = 0
+    while entries := claim(now, batch_size):
+        for entry in entries:
+            process(entry, now)
+        total += len(entries)
+    return total
+
+
+def refund(flight_request, payment):
+    """
+    Refunds the payment of a request that could not get its weight any more,
+    records it and cancels the request.
+    """
+    stripe.Refund.create(payment_intent=payment.payment_id, idempotency_key=f'refund-{payment.payment_id}')
+    payment.status = 'refunded'
+    payment.save(update_fields=['status', 'updated_at'])
+    try:
+        capacity.close(flight_request, 'cancelled')
+    except capacity.CapacityError:
+        pass  # Closed meanwhile.
@@ -0,0 +1,23 @@
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from flight_requests.checkout import group_name
+
+
+class CheckoutConsumer(AsyncJsonWebsocketConsumer):
+    """Pushes the connected user's checkout sessions as the outbox worker creates them."""
+
+    async def connect(self):
+        user = self.scope.get("user")
+        if not user or not getattr(user, "is_authenticated", False):
+            await self.close(code=4401)
+            return
+        self.group_name = group_name(user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, "group_name"):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def checkout_update(self, event):
+        await self.send_json(event["checkout"])
@@ -0,0 +1,139 @@
+"""
+Short-lived capacity holds taken while a sender pays for a request.
+
+Creating a request holds its item's weight on the offer for CAPACITY_HOLD_TTL
+seconds, and the Stripe checkout session expires with the hold. The weight is
+added to the offer's `held_weight` with a conditional UPDATE that only matches
+while the offer has that much weight neither reserved nor held, so two senders
+can not pay for the same last kilogram. The search index counts held weight as
+unavailable, so searches account for holds without locking anything.
+
+A paid checkout converts the hold into the request's reservation (see
+flight_requests.capacity). Holds that expire unpaid are released in batches by
+`release_expired`, which the scheduler runs every CAPACITY_HOLD_REAP_INTERVAL
+seconds, once CAPACITY_HOLD_GRACE seconds have passed: a sender can pay at the
+last moment of the checkout session, and the confirmation comes after.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from flight_requests import capacity
+from flight_requests.models.request import CapacityHold, Request
+from offers import search_index
+from offers.models import Offer
+from offers.signals import invalidate_after_commit
+
+
+def ttl():
+    return timedelta(seconds=getattr(settings, 'CAPACITY_HOLD_TTL', 2100))
+
+
+def grace():
+    return timedelta(seconds=getattr(settings, 'CAPACITY_HOLD_GRACE', 600))
+
+
+def place(flight_request, now=None):
+    """Holds the request's item weight on its offer and returns the hold."""
+    weight = flight_request.item.weight
+    with transaction.atomic():
+        if not Offer.objects.filter(
+            Q(available_weight__isnull=True) | Q(available_weight__gte=F('held_weight') + weight),
+            pk=flight_request.offer_id,
+            status='available',
+        ).update(held_weight=F('held_weight') + weight):
+            raise capacity.CapacityError("The offer does not have enough capacity left for this item.")
+        hold = CapacityHold.objects.create(request=flight_request, offer_id=flight_request.offer_id, weight=weight,
+                                           expires_at=(now or timezone.now()) + ttl())
+        capacity.reindex(flight_request.offer_id)
+    return hold
+
+
+def extend(flight_request, expires_at):
+    """Moves the request's hold to expire at `expires_at`. Returns whether the request still had a hold."""
+    return bool(CapacityHold.objects.filter(request_id=flight_request.pk).update(expires_at=expires_at))
+
+
+def take_hold(flight_request):
+    """Deletes the request's hold and returns it, or None when it has none or another process took it first."""
+    hold = CapacityHold.objects.filter(request_id=flight_request.pk).first()
+    if hold is None or not CapacityHold.objects.filter(pk=hold.pk).delete()[0]:
+        return None
+    return hold
+
+
+def release(flight_request):
+    """Drops the request's hold, if it has one, giving the weight back."""
+    with transaction.atomic():
+        hold = take_hold(flight_request)
+        if hold is not None:
+            Offer.objects.filter(pk=hold.offer_id).update(held_weight=F('held_weight') - hold.weight)
+            capacity.reindex(hold.offer_id)
+
+
+def reserve(flight_request, weight):
+    """
+    Reserves `weight` for the request on its offer, out of the request's hold
+    when it still has one, in which case the request reserves the held weight.
+    """
+    hold = take_hold(flight_request)
+    if hold is not None:
+        Offer.objects.filter(pk=hold.offer_id).update(**capacity.take(hold.weight, held=hold.weight))
+        if hold.weight != weight:
+            # The item's weight changed since checkout; the request reserves what was held, and gives that back.
+            Request.objects.filter(pk=flight_request.pk).update(reserved_weight=hold.weight)
+    elif not capacity.reserve(flight_request.offer_id, weight):
+        raise capacity.CapacityError("The offer does not have enough capacity left for this item.")
+    capacity.reindex(flight_request.offer_id)
+
+
+def convert(flight_request):
+    """
+    Turns the request's hold into its reservation once it is paid for. A hold
+    that has already been released is replaced by a new reservation, which
+    fails with CapacityError if the weight has been taken since.
+    """
+    with transaction.atomic():
+        hold = CapacityHold.objects.filter(request_id=flight_request.pk).first()
+        weight = hold.weight if hold is not None else flight_request.item.weight
+        if not Request.objects.filter(
+            pk=flight_request.pk, status__in=capacity.OPEN_STATUSES, reserved_weight__isnull=True
+        ).update(reserved_weight=weight, updated_at=timezone.now()):
+            # Confirmed twice, accepted before it was paid for, or closed meanwhile.
+            release(flight_request)
+            return
+        reserve(flight_request, weight)
+    flight_request.refresh_from_db()
+
+
+def release_expired(now=None, batch_size=500):
+    """
+    Releases the holds that expired a grace period before `now` (by default,
+    the current time) and returns how many. Holds of paid requests are left
+    for their confirmation to convert.
+    """
+    cutoff = (now or timezone.now()) - grace()
+    total = 0
+    while True:
+        with transaction.atomic():
+            # Holds being converted or released right now are skipped; they are gone by the next run.
+            holds = list(
+                CapacityHold.objects.select_for_update(skip_locked=True, of=('self',))
+                .filter(expires_at__lte=cutoff).exclude(request__payment__status='paid').order_by('expires_at')
+                .values_list('pk', 'offer_id', 'weight')[:batch_size]
+            )
+            if not holds:
+                return total
+            CapacityHold.objects.filter(pk__in=[pk for pk, _, _ in holds]).delete()
+            released = defaultdict(Decimal)
+            for _, offer_id, weight in holds:
+                released[offer_id] += weight
+            for offer_id, weight in released.items():
+                Offer.objects.filter(pk=offer_id).update(held_weight=F('held_weight') - weight)
+            invalidate_after_commit(search_index.sync_offers(released), released)
+        total += len(holds)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from flight_requests import checkout
+
+
+class Command(BaseCommand):
+    help = "Create the Stripe checkout sessions queued in the checkout outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20, help="Number of checkouts leased per batch")
+
+    def handle(self, *args, **kwargs):
+        total = checkout.process_outbox(batch_size=kwargs['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} checkouts."))
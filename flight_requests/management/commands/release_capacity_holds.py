@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from flight_requests import holds
+
+
+class Command(BaseCommand):
+    help = "Release the capacity holds of checkouts that expired unpaid"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Number of holds released per batch")
+
+    def handle(self, *args, **kwargs):
+        total = holds.release_expired(batch_size=kwargs['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Released {total} holds."))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight_requests', '0005_request_verification_code'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='request',
+            name='status',
+            field=models.CharField(choices=[('completed', 'Completed'), ('pending', 'Pending'), ('rejected', 'Rejected'), ('in_process', 'In_process'), ('expired', 'Expired')], default='pending', max_length=20),
+        ),
+    ]
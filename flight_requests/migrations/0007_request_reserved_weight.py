@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight_requests', '0006_alter_request_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='request',
+            name='reserved_weight',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AlterField(
+            model_name='request',
+            name='status',
+            field=models.CharField(choices=[('completed', 'Completed'), ('pending', 'Pending'), ('rejected', 'Rejected'), ('in_process', 'In_process'), ('cancelled', 'Cancelled'), ('expired', 'Expired')], default='pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight_requests', '0007_request_reserved_weight'),
+        ('offers', '0023_offer_held_weight'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CapacityHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weight', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('offer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='capacity_holds', to='offers.offer')),
+                ('request', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='capacity_hold', to='flight_requests.request')),
+            ],
+        ),
+    ]
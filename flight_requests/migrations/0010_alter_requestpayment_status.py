@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight_requests', '0009_checkoutoutbox'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='requestpayment',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('paid', 'Paid'), ('failed', 'Failed'), ('refunded', 'Refunded')], default='pending', max_length=20),
+        ),
+    ]
@@ -1,5 +1,8 @@
+import uuid
+
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 from items.models.items import Item
 from offers.models import Offer
@@ -11,6 +14,9 @@ class Request(models.Model):
         ('pending', 'Pending'),
         ('rejected', 'Rejected'),
         ('in_process', 'In_process'),
+        ('cancelled', 'Cancelled'),
+        # Pending requests on an offer whose flight departed (see offers.lifecycle).
+        ('expired', 'Expired'),
     ]
 
     item = models.ForeignKey(
@@ -31,6 +37,8 @@ class Request(models.Model):
 
     comments = models.TextField(blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    # Weight taken off the offer while the request is accepted (see flight_requests.capacity).
+    reserved_weight = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -58,6 +66,8 @@ class RequestPayment(models.Model):
         ('pending', 'Pending'),
         ('paid', 'Paid'),
         ('failed', 'Failed'),
+        # Charged after the request's weight was sold to someone else (see checkout.refund).
+        ('refunded', 'Refunded'),
     ]
     request = models.OneToOneField(
         Request,
@@ -71,3 +81,53 @@ class RequestPayment(models.Model):
 
     def __str__(self):
         return f"Payment for Request #{self.request.pk} (Status: {self.status})"
+
+
+class CapacityHold(models.Model):
+    """
+    Weight set aside on an offer while the sender pays for a request, until
+    `expires_at`. Maintained by flight_requests.holds; the offer's
+    `held_weight` is the sum of its holds.
+    """
+    request = models.OneToOneField(Request, related_name='capacity_hold', on_delete=models.CASCADE)
+    offer = models.ForeignKey(Offer, related_name='capacity_holds', on_delete=models.CASCADE)
+    weight = models.DecimalField(max_digits=10, decimal_places=2)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Hold of {self.weight} on Offer #{self.offer_id} for Request #{self.request_id}"
+
+
+class CheckoutOutbox(models.Model):
+    """
+    The Stripe checkout session to create for a request, committed together
+    with the request and created by flight_requests.checkout.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+
+    request = models.OneToOneField(Request, related_name='checkout', on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    # Sent with every attempt, so Stripe creates one session however often a lost response is retried.
+    idempotency_key = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    # When the session expires; fixed up front because retries must send the same parameters.
+    expires_at = models.DateTimeField()
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    session_id = models.CharField(max_length=255, blank=True)
+    checkout_url = models.TextField(blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['next_attempt_at'], condition=models.Q(status='pending'),
+                         name='checkout_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Checkout for Request #{self.request_id} (Status: {self.status})"
@@ -5,7 +5,7 @@ from offers.serializer.offer_serializer import OfferSerializer
 from ugogo.settings import STRIPE_SECRET_KEY
 from rest_framework import serializers
 
-from flight_requests.models.request import Request, RequestPayment
+from flight_requests.models.request import CheckoutOutbox, Request, RequestPayment
 stripe.api_key = STRIPE_SECRET_KEY
 
 class RequestPaymentSerializer(serializers.ModelSerializer):
@@ -31,7 +31,7 @@ class CreateRequestSerializer(serializers.ModelSerializer):
             return None
 
         # Only show to the requester (creator)
-        if obj.requester == request.user:
+        if obj.requester_id == request.user.id:
             return obj.verification_code
 
         return None
@@ -57,16 +57,24 @@ class RequestSerializer(serializers.ModelSerializer):
             return None
 
         # Show to requester (sender)
-        if obj.requester == request.user:
+        if obj.requester_id == request.user.id:
             return obj.verification_code
 
-        # Show to courier only if request is accepted
-        if (obj.status in ['accepted', 'in_process', 'completed'] and
-                obj.offer.courier == request.user):
-            return obj.verification_code
+        # Show to courier only if request is accepted. List views annotate the
+        # courier, so rendering this field does not load the offer.
+        if obj.status in ['accepted', 'in_process', 'completed']:
+            courier_id = obj.offer_courier_id if hasattr(obj, 'offer_courier_id') else obj.offer.courier_id
+            if courier_id == request.user.id:
+                return obj.verification_code
 
         return None
 
 class FlightRequestActionSerializer(serializers.Serializer):
     request_id = serializers.IntegerField()
-    action = serializers.ChoiceField(choices=['accept', 'reject'])
+    action = serializers.ChoiceField(choices=['accept', 'reject', 'cancel'])
+
+
+class CheckoutSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CheckoutOutbox
+        fields = ['request', 'status', 'checkout_url', 'last_error', 'updated_at']
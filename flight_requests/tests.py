@@ -1,3 +1,570 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+from urllib.parse import parse_qs
 
-# Create your tests here.
+import stripe
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core import scheduler
+from flight_requests import checkout, holds
+from flight_requests.consumers import CheckoutConsumer
+from flight_requests.models.request import CapacityHold, CheckoutOutbox, Request, RequestPayment
+from items.models.items import Item, ItemCategory
+from locations.models import Country, City, Airport
+from locations.registry import locations
+from offers.models import Flight, UserFlight, Offer
+from users.models import Users
+
+
+@override_settings(REFERENCE_DATA_CHECK_INTERVAL=3600)
+class RequestListQueryCountTest(APITestCase):
+    def setUp(self):
+        self.sender = Users.objects.create_user(email='sender@example.com', password='sender123')
+        self.courier = Users.objects.create_user(email='courier@example.com', password='courier123')
+
+        country = Country.objects.create(country_code='US', country_abbr='USA', country_name='United States')
+        city = City.objects.create(country=country, city_code='NYC', city_abbr='NY', city_name='New York',
+                                   timezone='America/New_York')
+        jfk = Airport.objects.create(city=city, airport_code='JFK', airport_name='John F. Kennedy Intl')
+        lax = Airport.objects.create(city=city, airport_code='LAX', airport_name='Los Angeles Intl')
+        departure = timezone.now() + timedelta(days=2)
+        self.flight = Flight.objects.create(creator=self.courier, from_airport=jfk, to_airport=lax,
+                                            departure_datetime=departure,
+                                            arrival_datetime=departure + timedelta(hours=5))
+        self.category = ItemCategory.objects.create(name="Electronics", description="Gadgets")
+        self.add_requests(1)
+
+    def add_requests(self, count):
+        for _ in range(count):
+            user_flight = UserFlight.objects.create(flight=self.flight, user=self.courier)
+            offer = Offer.objects.create(user_flight=user_flight, courier=self.courier, price='100.00',
+                                         available_weight='10.00', available_space='5.00')
+            item = Item.objects.create(user=self.sender, name='Laptop', weight='2.50', dimensions='38x25x3')
+            item.categories.add(self.category)
+            Request.objects.create(item=item, offer=offer, requester=self.sender)
+
+    def get(self, user, url_name, params=None):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(user).access_token))
+        return self.client.get(reverse(url_name), params)
+
+    def count_queries(self, user, url_name, params=None):
+        locations.get()  # Loaded once per process, not per request.
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(user, url_name, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_sent_requests_query_count_is_constant(self):
+        single = self.count_queries(self.sender, 'my-sent-requests')
+        self.add_requests(4)
+        self.assertEqual(self.count_queries(self.sender, 'my-sent-requests'), single)
+
+    def test_received_requests_query_count_is_constant(self):
+        single = self.count_queries(self.courier, 'requests-received')
+        self.add_requests(4)
+        self.assertEqual(self.count_queries(self.courier, 'requests-received'), single)
+
+    def test_lists_are_paginated_with_a_fixed_query_count(self):
+        single = self.count_queries(self.sender, 'my-sent-requests')
+        self.add_requests(14)
+        self.assertEqual(self.count_queries(self.sender, 'my-sent-requests'), single)
+
+        response = self.get(self.sender, 'my-sent-requests', {'page': 2})
+        self.assertEqual(response.data['count'], 15)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_sparse_fields(self):
+        full = self.count_queries(self.courier, 'requests-received')
+        params = {'fields': 'id,status,item.name,offer.price,offer.user_flight.flight.departure_datetime'}
+        sparse = self.count_queries(self.courier, 'requests-received', params)
+        self.assertLess(sparse, full)
+        self.add_requests(4)
+        self.assertEqual(self.count_queries(self.courier, 'requests-received', params), sparse)
+
+        request = self.get(self.courier, 'requests-received', params).data['results'][0]
+        self.assertEqual(set(request), {'id', 'status', 'item', 'offer'})
+        self.assertEqual(request['item'], {'name': 'Laptop'})
+        self.assertEqual(set(request['offer']), {'price', 'user_flight'})
+        self.assertEqual(set(request['offer']['user_flight']['flight']), {'departure_datetime'})
+
+    def test_sparse_verification_code_does_not_load_offers(self):
+        Request.objects.update(status='accepted')
+        params = {'fields': 'id,verification_code'}
+        single = self.count_queries(self.courier, 'requests-received', params)
+        self.add_requests(4)
+        Request.objects.update(status='accepted')
+        self.assertEqual(self.count_queries(self.courier, 'requests-received', params), single)
+
+        for flight_request in Request.objects.all():
+            flight_request.generate_verification_code()
+        results = self.get(self.courier, 'requests-received', params).data['results']
+        codes = dict(Request.objects.values_list('pk', 'verification_code'))
+        self.assertEqual({request['id']: request['verification_code'] for request in results}, codes)
+
+    def test_unknown_sparse_field(self):
+        response = self.get(self.sender, 'my-sent-requests', {'fields': 'id,offer.colour,status.code'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CapacityFixtureMixin:
+    def setUp(self):
+        self.sender = Users.objects.create_user(email='sender@example.com', password='sender123')
+        self.courier = Users.objects.create_user(email='courier@example.com', password='courier123')
+        country = Country.objects.create(country_code='US', country_abbr='USA', country_name='United States')
+        city = City.objects.create(country=country, city_code='NYC', city_abbr='NY', city_name='New York',
+                                   timezone='America/New_York')
+        jfk = Airport.objects.create(city=city, airport_code='JFK', airport_name='John F. Kennedy Intl')
+        lax = Airport.objects.create(city=city, airport_code='LAX', airport_name='Los Angeles Intl')
+        departure = timezone.now() + timedelta(days=2)
+        flight = Flight.objects.create(creator=self.courier, from_airport=jfk, to_airport=lax,
+                                       departure_datetime=departure, arrival_datetime=departure + timedelta(hours=5))
+        user_flight = UserFlight.objects.create(flight=flight, user=self.courier)
+        self.offer = Offer.objects.create(user_flight=user_flight, courier=self.courier, price='100.00',
+                                          available_weight='10.00', available_space='5.00')
+
+    def add_request(self, weight):
+        item = Item.objects.create(user=self.sender, name='Laptop', weight=weight, dimensions='38x25x3')
+        return Request.objects.create(item=item, offer=self.offer, requester=self.sender)
+
+    def act(self, user, flight_request, action, client=None):
+        client = client or self.client
+        client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(user).access_token))
+        return client.post(reverse('request-update'), {'request_id': flight_request.pk, 'action': action},
+                           format='json')
+
+    def offer_state(self):
+        offer = Offer.objects.select_related('search_index').get(pk=self.offer.pk)
+        self.assertEqual((offer.search_index.available_weight, offer.search_index.status),
+                         (offer.available_weight, offer.status))
+        return offer.available_weight, offer.status
+
+
+class RequestCapacityTest(CapacityFixtureMixin, APITestCase):
+    def test_accepting_reserves_the_item_weight(self):
+        flight_request = self.add_request('4.00')
+        response = self.act(self.courier, flight_request, 'accept')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['request']['status'], 'in_process')
+        self.assertEqual(self.offer_state(), (Decimal('6.00'), 'available'))
+
+        response = self.act(self.courier, flight_request, 'accept')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.offer_state(), (Decimal('6.00'), 'available'))
+
+    def test_full_offer_is_taken_until_capacity_is_restored(self):
+        first, second = self.add_request('6.00'), self.add_request('4.00')
+        self.act(self.courier, first, 'accept')
+        self.act(self.courier, second, 'accept')
+        self.assertEqual(self.offer_state(), (Decimal('0.00'), 'taken'))
+
+        response = self.act(self.sender, second, 'cancel')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.offer_state(), (Decimal('4.00'), 'available'))
+
+        self.act(self.courier, first, 'reject')
+        self.assertEqual(self.offer_state(), (Decimal('10.00'), 'available'))
+        self.assertEqual(Request.objects.get(pk=first.pk).reserved_weight, None)
+
+    def test_oversized_item_is_refused(self):
+        flight_request = self.add_request('12.00')
+        response = self.act(self.courier, flight_request, 'accept')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Request.objects.get(pk=flight_request.pk).status, 'pending')
+        self.assertEqual(self.offer_state(), (Decimal('10.00'), 'available'))
+
+    def test_rejecting_a_pending_request_keeps_the_capacity(self):
+        flight_request = self.add_request('4.00')
+        self.assertEqual(self.act(self.courier, flight_request, 'reject').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.offer_state(), (Decimal('10.00'), 'available'))
+
+    def test_only_the_courier_accepts(self):
+        flight_request = self.add_request('4.00')
+        self.assertEqual(self.act(self.sender, flight_request, 'accept').status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ConcurrentAcceptTest(CapacityFixtureMixin, TransactionTestCase):
+    def test_parallel_accepts_never_oversell(self):
+        requests = [self.add_request('3.00') for _ in range(8)]
+        barrier = threading.Barrier(len(requests))
+        responses = []
+
+        def accept(flight_request):
+            client = APIClient()
+            barrier.wait()
+            try:
+                for _ in range(50):
+                    try:
+                        responses.append(self.act(self.courier, flight_request, 'accept', client).status_code)
+                        return
+                    except OperationalError:
+                        # SQLite allows one writer at a time and reports the others as locked.
+                        time.sleep(0.01)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=accept, args=(flight_request,)) for flight_request in requests]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # A retry after a lock reported once the accept had committed answers 409, so count the rows, not the 200s.
+        self.assertLessEqual(set(responses), {200, 409})
+        self.assertLessEqual(responses.count(200), 3)
+        accepted = Request.objects.filter(status='in_process')
+        self.assertEqual(accepted.count(), 3)
+        self.assertEqual(sum(accepted.values_list('reserved_weight', flat=True)), Decimal('9.00'))
+        self.assertEqual(self.offer_state(), (Decimal('1.00'), 'available'))
+
+
+class CapacityHoldTest(CapacityFixtureMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.sender.passport_verification_status = 'verified'
+        self.sender.save()
+
+    def create_request(self, weight):
+        item = Item.objects.create(user=self.sender, name='Camera', weight=weight, dimensions='20x15x10')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.sender).access_token))
+        return self.client.post(reverse('request-create'), {'item': item.pk, 'offer': self.offer.pk}, format='json')
+
+    def confirm(self, flight_request):
+        session = SimpleNamespace(payment_status='paid', payment_intent='pi_1',
+                                  metadata=SimpleNamespace(request_id=str(flight_request.pk)))
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.sender).access_token))
+        with mock.patch('stripe.checkout.Session.retrieve', return_value=session):
+            return self.client.post(reverse('confirm-stripe-session'), {'session_id': 'cs_1'}, format='json')
+
+    def offer_holds(self):
+        offer = Offer.objects.select_related('search_index').get(pk=self.offer.pk)
+        return offer.available_weight, offer.held_weight, offer.search_index.available_weight
+
+    def test_checkout_holds_the_weight_until_paid(self):
+        response = self.create_request('4.00')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        hold = CapacityHold.objects.get(request_id=response.data['id'])
+        self.assertEqual(CheckoutOutbox.objects.get(request_id=response.data['id']).expires_at, hold.expires_at)
+        self.assertEqual(self.offer_holds(), (Decimal('10.00'), Decimal('4.00'), Decimal('6.00')))
+
+        flight_request = Request.objects.get(pk=response.data['id'])
+        self.assertEqual(self.confirm(flight_request).status_code, status.HTTP_200_OK)
+        self.assertFalse(CapacityHold.objects.exists())
+        self.assertEqual(Request.objects.get(pk=flight_request.pk).reserved_weight, Decimal('4.00'))
+        self.assertEqual(self.offer_holds(), (Decimal('6.00'), Decimal('0.00'), Decimal('6.00')))
+
+        # Paid requests are not reserved twice, by a second confirmation or by the courier.
+        self.confirm(flight_request)
+        self.assertEqual(self.act(self.courier, flight_request, 'accept').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.offer_holds(), (Decimal('6.00'), Decimal('0.00'), Decimal('6.00')))
+
+    def test_held_weight_can_not_be_sold_twice(self):
+        self.create_request('7.00')
+        response = self.create_request('4.00')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Request.objects.count(), 1)
+        self.assertEqual(self.offer_holds(), (Decimal('10.00'), Decimal('7.00'), Decimal('3.00')))
+
+    def test_expired_holds_are_released(self):
+        first = Request.objects.get(pk=self.create_request('4.00').data['id'])
+        self.create_request('3.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            released = holds.release_expired(now=timezone.now() + timedelta(hours=1), batch_size=1)
+        self.assertEqual(released, 2)
+        self.assertEqual(self.offer_holds(), (Decimal('10.00'), Decimal('0.00'), Decimal('10.00')))
+
+        # Paying after the hold lapsed reserves the weight again while it is still free.
+        self.assertEqual(self.confirm(first).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.offer_holds(), (Decimal('6.00'), Decimal('0.00'), Decimal('6.00')))
+
+    def test_reaper_waits_for_late_payments(self):
+        first = Request.objects.get(pk=self.create_request('4.00').data['id'])
+        self.create_request('3.00')
+        expires_at = CapacityHold.objects.get(request=first).expires_at
+        # Within the grace period, a payment made at the last moment can still be confirmed.
+        self.assertEqual(holds.release_expired(now=expires_at + timedelta(minutes=1)), 0)
+
+        RequestPayment.objects.create(request=first, payment_id='pi_1', status='paid')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(holds.release_expired(now=timezone.now() + timedelta(hours=1)), 1)
+        self.assertEqual(self.offer_holds(), (Decimal('10.00'), Decimal('4.00'), Decimal('6.00')))
+        self.assertEqual(self.confirm(first).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.offer_holds(), (Decimal('6.00'), Decimal('0.00'), Decimal('6.00')))
+
+    def test_payment_for_weight_sold_meanwhile_is_refunded(self):
+        first = Request.objects.get(pk=self.create_request('7.00').data['id'])
+        with self.captureOnCommitCallbacks(execute=True):
+            holds.release_expired(now=timezone.now() + timedelta(hours=1))
+        self.assertEqual(self.create_request('7.00').status_code, status.HTTP_201_CREATED)
+
+        with mock.patch('stripe.Refund.create') as refund:
+            self.assertEqual(self.confirm(first).status_code, status.HTTP_409_CONFLICT)
+            self.assertEqual(self.confirm(first).status_code, status.HTTP_409_CONFLICT)
+        refund.assert_called_once_with(payment_intent='pi_1', idempotency_key='refund-pi_1')
+        self.assertEqual(RequestPayment.objects.get(request=first).status, 'refunded')
+        self.assertEqual(Request.objects.get(pk=first.pk).status, 'cancelled')
+        self.assertEqual(self.offer_holds(), (Decimal('10.00'), Decimal('7.00'), Decimal('3.00')))
+
+    def test_converting_a_hold_keeps_a_closed_offer_closed(self):
+        flight_request = Request.objects.get(pk=self.create_request('10.00').data['id'])
+        Offer.objects.filter(pk=self.offer.pk).update(status='expired')
+        self.assertEqual(self.confirm(flight_request).status_code, status.HTTP_200_OK)
+        self.assertEqual(Offer.objects.get(pk=self.offer.pk).status, 'expired')
+
+    def test_accepting_reserves_the_held_weight(self):
+        flight_request = Request.objects.get(pk=self.create_request('4.00').data['id'])
+        Item.objects.filter(pk=flight_request.item_id).update(weight='5.00')
+        flight_request = Request.objects.get(pk=flight_request.pk)
+        self.assertEqual(self.act(self.courier, flight_request, 'accept').status_code, status.HTTP_200_OK)
+        self.assertEqual(Request.objects.get(pk=flight_request.pk).reserved_weight, Decimal('4.00'))
+        self.assertEqual(self.offer_holds(), (Decimal('6.00'), Decimal('0.00'), Decimal('6.00')))
+
+        self.assertEqual(self.act(self.courier, flight_request, 'cancel').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.offer_holds(), (Decimal('10.00'), Decimal('0.00'), Decimal('10.00')))
+
+    def test_cancelling_releases_the_hold(self):
+        flight_request = Request.objects.get(pk=self.create_request('4.00').data['id'])
+        self.assertEqual(self.act(self.sender, flight_request, 'cancel').status_code, status.HTTP_200_OK)
+        self.assertFalse(CapacityHold.objects.exists())
+        self.assertEqual(self.offer_holds(), (Decimal('10.00'), Decimal('0.00'), Decimal('10.00')))
+
+    def test_reaper_is_scheduled_and_has_a_command(self):
+        self.assertIn('release_capacity_holds', {job.name for job in scheduler.jobs()})
+        out = StringIO()
+        call_command('release_capacity_holds', stdout=out)
+        self.assertIn('Released 0 holds.', out.getvalue())
+
+
+class FakeStripe:
+    """
+    A local stand-in for the Stripe API's checkout session endpoints. It
+    replays the response of a repeated idempotency key like Stripe does, and
+    can fail the next calls or lose their responses after creating the session.
+    """
+
+    def __init__(self):
+        self.sessions = {}
+        self.by_idempotency_key = {}
+        self.calls = []
+        self.failures = 0
+        self.lost_responses = 0
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                form = parse_qs(self.rfile.read(int(self.headers['Content-Length'])).decode())
+                fake.calls.append((self.headers.get('Idempotency-Key'), form))
+                fake.create(self, self.headers.get('Idempotency-Key'), form)
+
+            def do_GET(self):
+                session = fake.sessions.get(self.path.rsplit('/', 1)[-1])
+                if session is None:
+                    fake.respond(self, 404, {'error': {'type': 'invalid_request_error', 'message': 'No such session'}})
+                else:
+                    fake.respond(self, 200, session)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def respond(self, handler, code, body):
+        payload = json.dumps(body).encode()
+        handler.send_response(code)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def create(self, handler, key, form):
+        if self.failures:
+            self.failures -= 1
+            return self.respond(handler, 500, {'error': {'type': 'api_error', 'message': 'Stripe is down'}})
+        if key not in self.by_idempotency_key:
+            session_id = f'cs_test_{len(self.sessions) + 1}'
+            self.sessions[session_id] = {
+                'id': session_id,
+                'object': 'checkout.session',
+                'url': f'https://checkout.stripe.test/pay/{session_id}',
+                'payment_status': 'unpaid',
+                'payment_intent': f'pi_{session_id}',
+                'expires_at': int(form['expires_at'][0]),
+                'metadata': {'request_id': form['metadata[request_id]'][0]},
+            }
+            self.by_idempotency_key[key] = session_id
+        if self.lost_responses:
+            self.lost_responses -= 1
+            handler.close_connection = True
+            return
+        self.respond(handler, 200, self.sessions[self.by_idempotency_key[key]])
+
+
+class CheckoutOutboxTest(CapacityFixtureMixin, APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stripe = FakeStripe()
+        cls.addClassCleanup(cls.stripe.stop)
+
+    def setUp(self):
+        super().setUp()
+        self.stripe.sessions.clear()
+        self.stripe.by_idempotency_key.clear()
+        self.stripe.calls.clear()
+        self.stripe.failures = self.stripe.lost_responses = 0
+        for name, value in (('api_base', self.stripe.url), ('max_network_retries', 0)):
+            patch = mock.patch.object(stripe, name, value)
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.sender.passport_verification_status = 'verified'
+        self.sender.save()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.sender).access_token))
+
+    def create_request(self, weight='4.00'):
+        item = Item.objects.create(user=self.sender, name='Camera', weight=weight, dimensions='20x15x10')
+        response = self.client.post(reverse('request-create'), {'item': item.pk, 'offer': self.offer.pk},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Request.objects.get(pk=response.data['id']), response
+
+    def poll(self, flight_request):
+        return self.client.get(reverse('request-checkout', kwargs={'request_id': flight_request.pk}))
+
+    def test_session_is_created_after_the_request_commits(self):
+        flight_request, response = self.create_request()
+        self.assertEqual(response.data['checkout']['status'], 'pending')
+        self.assertEqual(self.stripe.calls, [])
+        self.assertEqual(self.poll(flight_request).data['status'], 'pending')
+
+        self.assertEqual(checkout.process_outbox(), 1)
+        entry = CheckoutOutbox.objects.get(request=flight_request)
+        [(key, form)] = self.stripe.calls
+        self.assertEqual(key, str(entry.idempotency_key))
+        self.assertEqual(form['metadata[request_id]'], [str(flight_request.pk)])
+        self.assertEqual(form['expires_at'], [str(int(flight_request.capacity_hold.expires_at.timestamp()))])
+
+        checkout_state = self.poll(flight_request).data
+        self.assertEqual(checkout_state['status'], 'ready')
+        self.assertEqual(checkout_state['checkout_url'], 'https://checkout.stripe.test/pay/cs_test_1')
+        self.assertEqual(checkout.process_outbox(), 0)
+
+        # The payment is confirmed against the same fake Stripe.
+        self.stripe.sessions['cs_test_1']['payment_status'] = 'paid'
+        response = self.client.post(reverse('confirm-stripe-session'), {'session_id': 'cs_test_1'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Request.objects.get(pk=flight_request.pk).reserved_weight, Decimal('4.00'))
+
+    def test_lost_response_is_retried_with_the_same_key(self):
+        flight_request, _ = self.create_request()
+        self.stripe.lost_responses = 1
+        now = timezone.now()
+        checkout.process_outbox(now)
+        entry = CheckoutOutbox.objects.get(request=flight_request)
+        self.assertEqual((entry.status, entry.attempts), ('pending', 1))
+        self.assertEqual(checkout.process_outbox(now), 0)  # Not due before its backoff.
+
+        checkout.process_outbox(now + timedelta(minutes=1))
+        entry.refresh_from_db()
+        self.assertEqual((entry.status, entry.session_id, entry.attempts), ('ready', 'cs_test_1', 2))
+        self.assertEqual(len(self.stripe.calls), 2)
+        self.assertEqual(len(self.stripe.sessions), 1)
+
+    @override_settings(CHECKOUT_OUTBOX_MAX_ATTEMPTS=2)
+    def test_checkout_fails_after_the_last_attempt(self):
+        flight_request, _ = self.create_request()
+        self.stripe.failures = 5
+        now = timezone.now()
+        checkout.process_outbox(now)
+        checkout.process_outbox(now + timedelta(minutes=1))
+
+        checkout_state = self.poll(flight_request).data
+        self.assertEqual(checkout_state['status'], 'failed')
+        self.assertIn('Stripe is down', checkout_state['last_error'])
+        self.assertFalse(CapacityHold.objects.exists())
+        self.assertEqual(Offer.objects.get(pk=self.offer.pk).held_weight, Decimal('0.00'))
+
+    @override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+    def test_checkout_url_is_pushed_over_the_websocket(self):
+        flight_request, _ = self.create_request()
+
+        async def receive_checkout():
+            communicator = ApplicationCommunicator(CheckoutConsumer.as_asgi(), {
+                'type': 'websocket', 'path': '/ws/requests/checkout/', 'user': self.sender,
+            })
+            await communicator.send_input({'type': 'websocket.connect'})
+            self.assertEqual((await communicator.receive_output())['type'], 'websocket.accept')
+            # Not database_sync_to_async: it closes the connection holding the test's transaction.
+            await sync_to_async(checkout.process_outbox)()
+            message = await communicator.receive_output()
+            await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await communicator.wait()
+            return json.loads(message['text'])
+
+        message = async_to_sync(receive_checkout)()
+        self.assertEqual((message['request'], message['status']), (flight_request.pk, 'ready'))
+        self.assertEqual(message['checkout_url'], 'https://checkout.stripe.test/pay/cs_test_1')
+
+    def test_late_first_attempt_moves_the_expiry(self):
+        flight_request, _ = self.create_request()
+        later = timezone.now() + timedelta(minutes=10)
+        checkout.process_outbox(later)
+        entry = CheckoutOutbox.objects.get(request=flight_request)
+        self.assertEqual(entry.status, 'ready')
+        self.assertEqual(entry.expires_at, later + holds.ttl())
+        self.assertEqual(CapacityHold.objects.get(request=flight_request).expires_at, entry.expires_at)
+        [(_, form)] = self.stripe.calls
+        self.assertEqual(form['expires_at'], [str(int(entry.expires_at.timestamp()))])
+
+    def test_late_retry_fails_the_checkout(self):
+        flight_request, _ = self.create_request()
+        self.stripe.failures = 1
+        now = timezone.now()
+        checkout.process_outbox(now)
+        checkout.process_outbox(now + timedelta(minutes=10))
+
+        checkout_state = self.poll(flight_request).data
+        self.assertEqual(checkout_state['status'], 'failed')
+        self.assertIn('expired', checkout_state['last_error'])
+        self.assertEqual(len(self.stripe.calls), 1)
+        self.assertFalse(CapacityHold.objects.exists())
+
+    def test_request_accepted_before_payment_gets_a_session(self):
+        flight_request, _ = self.create_request()
+        self.assertEqual(self.act(self.courier, flight_request, 'accept').status_code, status.HTTP_200_OK)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.sender).access_token))
+        checkout.process_outbox()
+        self.assertEqual(self.poll(flight_request).data['status'], 'ready')
+
+    def test_only_the_requester_polls(self):
+        flight_request, _ = self.create_request()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.courier).access_token))
+        self.assertEqual(self.poll(flight_request).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_worker_is_scheduled_and_has_a_command(self):
+        self.create_request()
+        self.assertIn('process_checkout_outbox', {job.name for job in scheduler.jobs()})
+        out = StringIO()
+        call_command('process_checkout_outbox', stdout=out)
+        self.assertIn('Processed 1 checkouts.', out.getvalue())
@@ -3,6 +3,7 @@ from .views import (
     UserRequestListView,
     CreateRequestView,
     ConfirmStripeSessionView,
+    CheckoutStatusView,
     FlightRequestActionView,
     MySentRequestsView
 )
@@ -16,4 +17,5 @@ urlpatterns = [
 
     # Stripe Payment Handling
     path('stripe/confirm-session/', ConfirmStripeSessionView.as_view(), name='confirm-stripe-session'),
+    path('stripe/checkout/<int:request_id>/', CheckoutStatusView.as_view(), name='request-checkout'),
 ]
\ No newline at end of file
@@ -1,53 +1,60 @@
 import stripe
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils.decorators import method_decorator
+from drf_yasg.utils import swagger_auto_schema
 from rest_framework.generics import ListAPIView, CreateAPIView
 
-from flight_requests.models.request import Request, RequestPayment
-from flight_requests.serializers import RequestSerializer, FlightRequestActionSerializer, CreateRequestSerializer
+from core.query_planner import QueryPlanMixin
+from core.sparse_fields import SPARSE_FIELDS_PARAMETER, SparseFieldsMixin
+from flight_requests import capacity, checkout, holds
+from flight_requests.models.request import CheckoutOutbox, Request, RequestPayment
+from flight_requests.serializers import (
+    CheckoutSerializer, CreateRequestSerializer, FlightRequestActionSerializer, RequestSerializer,
+)
+from offers.views.pegination_view import StandardResultsSetPagination
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 
-class MySentRequestsView(ListAPIView):
-    """Requests that I sent (as a sender)"""
+@method_decorator(swagger_auto_schema(manual_parameters=[SPARSE_FIELDS_PARAMETER]), name='get')
+class RequestListView(SparseFieldsMixin, QueryPlanMixin, ListAPIView):
+    """Paginated requests, with `?fields=` for screens that only need a summary."""
     serializer_class = RequestSerializer
     permission_classes = [IsAuthenticated]
-
-    def get_queryset(self):
-        return Request.objects.select_related('item', 'offer').filter(requester=self.request.user)
+    pagination_class = StandardResultsSetPagination
 
     def get_serializer_context(self):
+        """Pass request to serializer for verification code logic"""
         context = super().get_serializer_context()
         context['request'] = self.request
         return context
 
+    def filter_queryset(self, queryset):
+        # verification_code needs the offer's courier, which a sparse fieldset may not fetch.
+        return super().filter_queryset(queryset).annotate(offer_courier_id=F('offer__courier_id'))
 
-class MyReceivedRequestsView(ListAPIView):
-    """Requests that I received (as a courier)"""
-    serializer_class = RequestSerializer
-    permission_classes = [IsAuthenticated]
+
+class MySentRequestsView(RequestListView):
+    """Requests that I sent (as a sender)"""
 
     def get_queryset(self):
-        return Request.objects.select_related('item', 'offer').filter(offer__courier=self.request.user)
+        return Request.objects.filter(requester=self.request.user)
 
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        context['request'] = self.request
-        return context
 
-class UserRequestListView(ListAPIView):
-    serializer_class = RequestSerializer
-    permission_classes = [IsAuthenticated]
+class MyReceivedRequestsView(RequestListView):
+    """Requests that I received (as a courier)"""
 
     def get_queryset(self):
-        return Request.objects.select_related('item', 'offer').filter(offer__courier=self.request.user)
+        return Request.objects.filter(offer__courier=self.request.user)
+
+
+class UserRequestListView(RequestListView):
+    def get_queryset(self):
+        return Request.objects.filter(offer__courier=self.request.user)
 
-    def get_serializer_context(self):
-        """Pass request to serializer for verification code logic"""
-        context = super().get_serializer_context()
-        context['request'] = self.request
-        return context
 
 class CreateRequestView(CreateAPIView):
     serializer_class = CreateRequestSerializer
@@ -63,41 +70,42 @@ class CreateRequestView(CreateAPIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        flight_request = serializer.save(requester=request.user)
+        # The item's weight is held on the offer while the sender pays. The
+        # checkout session is created by the outbox worker once this commits.
+        try:
+            with transaction.atomic():
+                flight_request = serializer.save(requester=request.user)
+                flight_request.generate_verification_code()
+                entry = checkout.enqueue(flight_request, holds.place(flight_request))
+        except capacity.CapacityError as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+
+        # The checkout URL arrives over the checkout WebSocket or from the checkout endpoint.
+        response_data = self.get_serializer(flight_request).data
+        response_data['checkout'] = CheckoutSerializer(entry).data
 
-        flight_request.generate_verification_code()
+        return Response(response_data, status=status.HTTP_201_CREATED)
 
-        offer = flight_request.offer
 
+class CheckoutStatusView(APIView):
+    permission_classes = [IsAuthenticated]
 
+    @swagger_auto_schema(
+        operation_description="Poll the Stripe checkout session of a request until its URL is ready.",
+        responses={
+            200: "The checkout is pending, ready (with checkout_url) or failed.",
+            404: "Request not found."
+        }
+    )
+    def get(self, request, request_id):
         try:
-            session = stripe.checkout.Session.create(
-                payment_method_types=['card'],
-                line_items=[{
-                    'price_data': {
-                        'currency': 'usd',
-                        'product_data': {
-                            'name': f'Flight Offer #{str(offer.user_flight.flight)}',
-                            'description': f'{offer.user_flight.flight}',
-                        },
-                        'unit_amount': int(offer.price * 100),  # integer in cents
-                    },
-                    'quantity': 1,
-                }],
-                mode='payment',
-                metadata={'request_id': str(flight_request.id)},
-                success_url='https://ugogo-test.azurewebsites.net/payment-success?session_id={CHECKOUT_SESSION_ID}',
-                cancel_url='https://ugogo-test.azurewebsites.net/payment-error'
-            )
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            entry = CheckoutOutbox.objects.get(request_id=request_id, request__requester=request.user)
+        except CheckoutOutbox.DoesNotExist:
+            return Response({"error": "Request not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(CheckoutSerializer(entry).data, status=status.HTTP_200_OK)
 
-        # Return both the request data and the Stripe checkout URL
-        response_serializer = self.get_serializer(flight_request)
-        response_data = response_serializer.data
-        response_data['checkout_url'] = session.url  # Add stripe URL if needed
+REFUNDED_MESSAGE = "The offer no longer has capacity for this item; the payment was refunded."
 
-        return Response(response_data, status=status.HTTP_201_CREATED)
 
 class ConfirmStripeSessionView(APIView):
     permission_classes = [IsAuthenticated]
@@ -111,20 +119,28 @@ class ConfirmStripeSessionView(APIView):
         try:
             session = stripe.checkout.Session.retrieve(session_id)
             if session.payment_status == "paid":
-                request_id = session.metadata.get('request_id')
+                # Attribute access: newer versions of the Stripe library no longer make objects dicts.
+                request_id = getattr(session.metadata, 'request_id', None)
                 if request_id:
                     try:
                         flight_request = Request.objects.get(id=request_id, requester=request.user)
-                        RequestPayment.objects.update_or_create(
-                            request=flight_request,
-                            defaults={
-                                "payment_id": session.payment_intent,
-                                "status": "paid"
-                            }
-                        )
-                        flight_request.save()
                     except Request.DoesNotExist:
                         return Response({"error": "Request not found"}, status=404)
+                    if RequestPayment.objects.filter(request=flight_request, status='refunded').exists():
+                        return Response({"error": REFUNDED_MESSAGE}, status=status.HTTP_409_CONFLICT)
+                    payment, _ = RequestPayment.objects.update_or_create(
+                        request=flight_request,
+                        defaults={
+                            "payment_id": session.payment_intent,
+                            "status": "paid"
+                        }
+                    )
+                    try:
+                        holds.convert(flight_request)
+                    except capacity.CapacityError:
+                        # Paid after the hold lapsed and the weight was sold: the charge must not stand.
+                        checkout.refund(flight_request, payment)
+                        return Response({"error": REFUNDED_MESSAGE}, status=status.HTTP_409_CONFLICT)
 
                 return Response({"status": "success", "message": "Payment confirmed"})
             else:
@@ -144,27 +160,30 @@ class FlightRequestActionView(APIView):
         request_id = serializer.validated_data['request_id']
         action = serializer.validated_data['action']
 
+        # Couriers accept and reject the requests on their offers; either side can cancel.
+        allowed = Q(offer__user_flight__user=request.user)
+        if action == "cancel":
+            allowed |= Q(requester=request.user)
         try:
-            # Fix: Use the correct field path to get the courier
-            flight_request = Request.objects.get(
-                id=request_id,
-                offer__user_flight__user=request.user  # This is the correct path
-            )
+            flight_request = Request.objects.select_related('item').get(allowed, id=request_id)
         except Request.DoesNotExist:
             return Response(
                 {"error": "Request not found or you don't have permission to modify it"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        if action == "accept":
-            flight_request.status = 'in_process'  # or 'accepted' based on your STATUS_CHOICES
-        elif action == "reject":
-            flight_request.status = "rejected"
-
-        flight_request.save()
+        try:
+            if action == "accept":
+                capacity.accept(flight_request)
+            elif action == "reject":
+                capacity.close(flight_request, 'rejected')
+            else:
+                capacity.close(flight_request, 'cancelled')
+        except capacity.CapacityError as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
 
         return Response({
             "status": action,
             "message": f"Request has been {action}ed",
             "request": RequestSerializer(flight_request, context={'request': request}).data
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+        }, status=status.HTTP_200_OK)
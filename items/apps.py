@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ItemsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'items'
+
+    def ready(self):
+        from core import sync
+        from items.models.items import ItemCategory
+        from items.registry import categories
+        categories.connect()
+
+        sync.register('categories', ItemCategory, ['id', 'name', 'icon_path', 'description'])
@@ -1,8 +1,11 @@
+from django.utils.decorators import method_decorator
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework.views import APIView
 
+from core.conditional import conditional_get
+from core.query_planner import QueryPlanMixin
 from items.models.items import Item, ItemCategory
 from flight_requests.models.request import Request
 from items.serializers import (
@@ -20,7 +23,7 @@ class StandardResultsSetPagination(PageNumberPagination):
     max_page_size = 100
 
 
-class ItemListCreateAPIView(generics.ListCreateAPIView):
+class ItemListCreateAPIView(QueryPlanMixin, generics.ListCreateAPIView):
     """
     GET: List user's own items
     POST: Create a new item (owned by the request.user)
@@ -30,7 +33,7 @@ class ItemListCreateAPIView(generics.ListCreateAPIView):
     pagination_class = StandardResultsSetPagination
 
     def get_queryset(self):
-        return Item.objects.filter(user=self.request.user).prefetch_related('categories', 'pictures')
+        return Item.objects.filter(user=self.request.user)
 
     @swagger_auto_schema(operation_description="List all items belonging to the current user.")
     def get(self, request, *args, **kwargs):
@@ -54,6 +57,7 @@ class ItemDestroyAPIView(generics.DestroyAPIView):
         return super().delete(request, *args, **kwargs)
 
 
+@method_decorator(conditional_get(ItemCategory), name='get')
 class GetAllCategoriesView(APIView):
     operation_description="Retrieve a list of all available categories."
 
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:43
+
+from django.db import migrations, models
+
+from core.dimensions import dimension_columns
+
+
+def populate_dimension_columns(apps, schema_editor):
+    Item = apps.get_model('items', 'Item')
+    batch = []
+    for row in Item.objects.only('id', 'dimensions').iterator(chunk_size=1000):
+        row.dim_large, row.dim_medium, row.dim_small, row.volume = dimension_columns(row.dimensions)
+        batch.append(row)
+        if len(batch) >= 1000:
+            Item.objects.bulk_update(batch, ['dim_large', 'dim_medium', 'dim_small', 'volume'])
+            batch = []
+    if batch:
+        Item.objects.bulk_update(batch, ['dim_large', 'dim_medium', 'dim_small', 'volume'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0013_alter_itempicture_image_alter_itempicture_item_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='dim_large',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='dim_medium',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='dim_small',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='volume',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(populate_dimension_columns, migrations.RunPython.noop),
+    ]
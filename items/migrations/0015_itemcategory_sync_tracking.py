@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0014_item_dimension_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemcategory',
+            name='sync_version',
+            field=models.PositiveBigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='itemcategory',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
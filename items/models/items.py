@@ -4,9 +4,11 @@ from django.conf import settings
 
 from azure_storage_handler.storages import AzureItemImageStorage
 from azure_storage_handler.utils import item_picture_upload_path
+from core.dimensions import dimension_columns
+from core.models import SyncTrackedModel
 
 
-class ItemCategory(models.Model):
+class ItemCategory(SyncTrackedModel):
     name = models.CharField(max_length=255)
     icon_path = models.CharField(max_length=255, null=False, default='default_icon.svg')
     description = models.TextField()
@@ -46,6 +48,11 @@ class Item(models.Model):
     description = models.TextField(blank=True, null=True)
     weight = models.DecimalField(max_digits=10, decimal_places=2)
     dimensions = models.CharField(max_length=100)
+    # Parsed from dimensions on save, largest side first, for matching against offers.
+    dim_large = models.FloatField(null=True, blank=True, editable=False)
+    dim_medium = models.FloatField(null=True, blank=True, editable=False)
+    dim_small = models.FloatField(null=True, blank=True, editable=False)
+    volume = models.FloatField(null=True, blank=True, editable=False)
     is_pictures_uploaded = models.BooleanField(default=False)
     verified = models.CharField(
         max_length=20,
@@ -72,9 +79,18 @@ class Item(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    DIMENSION_FIELDS = ('dim_large', 'dim_medium', 'dim_small', 'volume')
+
     def __str__(self):
         return f"{self.name} (Owner: {self.user.email})"
 
+    def save(self, *args, **kwargs):
+        self.dim_large, self.dim_medium, self.dim_small, self.volume = dimension_columns(self.dimensions)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'dimensions' in update_fields:
+            kwargs['update_fields'] = {*update_fields, *self.DIMENSION_FIELDS}
+        super().save(*args, **kwargs)
+
     @classmethod
     def get_item_by_id(cls, item_id):
         try:
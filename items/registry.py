@@ -0,0 +1,27 @@
+from core.registry import Registry
+from items.models.items import ItemCategory
+
+
+class CategorySnapshot:
+    def __init__(self, categories):
+        self.categories = {category.pk: category for category in categories}
+        self.categories_by_name = {category.name: category for category in categories}
+
+
+class CategoryRegistry(Registry):
+    models = (ItemCategory,)
+
+    def build(self):
+        return CategorySnapshot(list(ItemCategory.objects.all()))
+
+    def category(self, pk):
+        return self.get().categories.get(pk)
+
+    def category_by_name(self, name):
+        return self.get().categories_by_name.get(name)
+
+    def ids(self):
+        return self.get().categories.keys()
+
+
+categories = CategoryRegistry()
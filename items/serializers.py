@@ -2,7 +2,9 @@ import re
 from rest_framework import serializers
 from decimal import Decimal
 
+from core.fields import PrimaryKeyListField
 from items.models.items import Item, ItemCategory, ItemPicture
+from items.registry import categories as category_registry
 from flight_requests.models.request import Request
 from offers.models import Offer
 from offers.serializer.offer_serializer import OfferCreateSerializer
@@ -29,10 +31,10 @@ class ItemSerializer(serializers.ModelSerializer):
         required=True
     )
     categories = ItemCategorySerializer(many=True, read_only=True)
-    category_ids = serializers.PrimaryKeyRelatedField(
-        many=True,
+    category_ids = PrimaryKeyListField(
         write_only=True,
         queryset=ItemCategory.objects.all(),
+        cached_ids=category_registry.ids,
         required=False,
         allow_null=True
     )
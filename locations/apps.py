@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class LocationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'locations'
+
+    def ready(self):
+        from core import sync
+        from locations.models import Country, City, Airport, CityPolicy
+        from locations.registry import locations
+        locations.connect()
+
+        sync.register('countries', Country, ['id', 'country_code', 'country_abbr', 'country_name'])
+        sync.register('cities', City, ['id', 'country_id', 'city_code', 'city_abbr', 'city_name', 'timezone'])
+        sync.register('airports', Airport, ['id', 'city_id', 'airport_code', 'airport_name', 'airport_picture_url',
+                                            'latitude', 'longitude', 'utc_offset', 'timezone'])
+        sync.register('city_policies', CityPolicy,
+                      ['id', 'city_id', 'policy_type', 'policy_status', 'policy_description'])
@@ -0,0 +1,147 @@
+"""
+Autocomplete over airports and cities.
+
+The index is built from a location registry snapshot the first time it is
+searched and lives as long as the snapshot, so it is rebuilt whenever the
+locations data version changes. Each searchable field is kept as a sorted list
+of the normalized text and every word-suffix of it, so a prefix lookup is a
+bisection followed by a scan of the matches only. Queries of three or more
+characters that match inside a word fall back to a trigram index.
+
+Results are ranked by the first rule they match:
+
+1. the query is the airport's IATA code;
+2. the code starts with the query;
+3. the city name, 4. the airport name, 5. the country name has a word
+   starting with the query;
+6. any of them contains the query.
+"""
+import re
+import unicodedata
+from bisect import bisect_left
+
+SEPARATORS = re.compile(r'[^\w]+')
+
+
+def normalize(text):
+    """Lower-cased text without accents, with punctuation and runs of spaces collapsed to one space."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return SEPARATORS.sub(' ', text.casefold()).strip()
+
+
+def word_suffixes(text):
+    words = text.split()
+    return [' '.join(words[start:]) for start in range(len(words))]
+
+
+def trigrams(text):
+    return {text[start:start + 3] for start in range(len(text) - 2)}
+
+
+class PrefixIndex:
+    def __init__(self, entries):
+        """`entries` is an iterable of (text, ref) pairs."""
+        pairs = sorted(
+            (suffix, ref)
+            for text, ref in entries
+            for suffix in word_suffixes(normalize(text))
+        )
+        self.tokens = [token for token, _ in pairs]
+        self.refs = [ref for _, ref in pairs]
+
+    def matches(self, prefix):
+        """Refs of the entries with a word starting with `prefix`, in token order."""
+        for position in range(bisect_left(self.tokens, prefix), len(self.tokens)):
+            if not self.tokens[position].startswith(prefix):
+                break
+            yield self.refs[position]
+
+
+class TrigramIndex:
+    def __init__(self, entries, order):
+        """`entries` is an iterable of (text, ref) pairs; matches come out sorted by `order[ref]`."""
+        self.texts = {}
+        refs_by_trigram = {}
+        for text, ref in entries:
+            text = normalize(text)
+            self.texts.setdefault(ref, []).append(text)
+            for trigram in trigrams(text):
+                refs_by_trigram.setdefault(trigram, set()).add(ref)
+        self.refs_by_trigram = refs_by_trigram
+        self.ordered = {trigram: sorted(refs, key=order.__getitem__) for trigram, refs in refs_by_trigram.items()}
+
+    def matches(self, query):
+        """
+        Refs of the entries containing `query`, which must be at least three
+        characters long. Scans the rarest trigram's refs in order, so callers
+        that stop early only pay for the refs they take.
+        """
+        needed = sorted(trigrams(query), key=lambda trigram: len(self.refs_by_trigram.get(trigram, ())))
+        if not self.refs_by_trigram.get(needed[0]):
+            return
+        others = [self.refs_by_trigram.get(trigram, set()) for trigram in needed[1:]]
+        for ref in self.ordered[needed[0]]:
+            if all(ref in refs for refs in others) and any(query in text for text in self.texts[ref]):
+                yield ref
+
+
+class Ranking:
+    """The rules for one kind of location: exact codes, then prefix fields in rank order, then substrings."""
+
+    def __init__(self, items, code, fields, sort_key):
+        self.items = items
+        self.by_code = {normalize(code(item)): pk for pk, item in items.items() if code(item)}
+        self.prefixes = [PrefixIndex((field(item), pk) for pk, item in items.items()) for field in [code, *fields]]
+        order = {pk: rank for rank, pk in enumerate(sorted(items, key=lambda pk: sort_key(items[pk])))}
+        self.substrings = TrigramIndex(
+            ((field(item), pk) for pk, item in items.items() for field in [code, *fields]), order
+        )
+
+    def search(self, query, limit):
+        found = {}
+        if query in self.by_code:
+            found[self.by_code[query]] = None
+        for index in self.prefixes:
+            if len(found) >= limit:
+                break
+            for pk in index.matches(query):
+                found.setdefault(pk)
+                if len(found) >= limit:
+                    break
+        if len(found) < limit and len(query) >= 3:
+            for pk in self.substrings.matches(query):
+                found.setdefault(pk)
+                if len(found) >= limit:
+                    break
+        return [self.items[pk] for pk in found]
+
+
+class AutocompleteIndex:
+    def __init__(self, snapshot):
+        self.airports = Ranking(
+            snapshot.airports,
+            code=lambda airport: airport.airport_code,
+            fields=[
+                lambda airport: airport.city.city_name,
+                lambda airport: airport.airport_name,
+                lambda airport: airport.city.country.country_name,
+            ],
+            sort_key=lambda airport: airport.airport_name,
+        )
+        self.cities = Ranking(
+            snapshot.cities,
+            code=lambda city: city.city_code,
+            fields=[
+                lambda city: city.city_name,
+                lambda city: city.country.country_name,
+            ],
+            sort_key=lambda city: city.city_name,
+        )
+
+    def search(self, query, limit=10):
+        """The best matching airports and cities for `query`, at most `limit` of each."""
+        query = normalize(query)
+        if not query:
+            return [], []
+        return self.airports.search(query, limit), self.cities.search(query, limit)
@@ -0,0 +1,163 @@
+"""
+Bulk import of airports from an OpenFlights `airports.dat` style CSV.
+
+Rows are read lazily and written in chunks. Countries and cities are resolved
+through in-memory maps loaded once, so a chunk costs a handful of queries
+whatever its size: one insert for new countries, one for new cities, and one
+upsert (`bulk_create(update_conflicts=True)`) keyed on the airport code.
+
+Bulk writes send no signals, so every chunk stamps its rows with a sync
+version and bumps the location version stamps itself.
+"""
+import csv
+from itertools import islice
+
+from django.db import transaction
+
+from core import sync, versioning
+from locations.models import Country, City, Airport
+
+COLUMNS = [
+    'source_id', 'airport_name', 'city_name', 'country_name', 'airport_code', 'icao_code',
+    'latitude', 'longitude', 'elevation', 'utc_offset', 'daylight_saving', 'timezone', 'airport_type', 'source',
+]
+
+AIRPORT_UPDATE_FIELDS = [
+    'airport_name', 'city', 'latitude', 'longitude', 'utc_offset', 'timezone', 'sync_version', 'updated_at',
+]
+
+# OpenFlights writes missing values as \N.
+NULL = '\\N'
+
+
+def clean(value):
+    value = (value or '').strip()
+    return None if value in ('', NULL) else value
+
+
+def to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def read_rows(file, skip_header=False):
+    """Yields the CSV rows of `file` as dicts keyed by COLUMNS, skipping short rows."""
+    reader = csv.reader(file)
+    if skip_header:
+        next(reader, None)
+    for row in reader:
+        if len(row) >= len(COLUMNS):
+            yield {name: clean(value) for name, value in zip(COLUMNS, row)}
+
+
+class AirportImporter:
+    def __init__(self, batch_size=2000, progress=None):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.countries = dict(Country.objects.values_list('country_name', 'pk'))
+        self.country_codes = set(Country.objects.values_list('country_code', flat=True))
+        self.country_codes.update(Country.objects.values_list('country_abbr', flat=True))
+        self.cities = {name: (pk, country_id) for name, pk, country_id in
+                       City.objects.values_list('city_name', 'pk', 'country_id')}
+        self.city_codes = set(City.objects.exclude(city_code=None).values_list('city_code', flat=True))
+        self.city_abbrs = set(City.objects.exclude(city_abbr=None).values_list('city_abbr', flat=True))
+        self.stats = {'rows': 0, 'airports': 0, 'countries': 0, 'cities': 0, 'skipped': 0}
+
+    def run(self, rows):
+        rows = iter(rows)
+        while chunk := list(islice(rows, self.batch_size)):
+            with transaction.atomic():
+                self.import_chunk(chunk)
+                for model in (Country, City, Airport):
+                    versioning.bump(versioning.key_for(model))
+            if self.progress:
+                self.progress(self.stats)
+        return self.stats
+
+    def unique_code(self, name, taken):
+        base = ''.join(char for char in name.upper() if char.isalnum())[:3] or 'XXX'
+        code, suffix = base, 1
+        while code in taken:
+            suffix += 1
+            code = f'{base}{suffix}'
+        taken.add(code)
+        return code
+
+    def city_name(self, row, new_cities):
+        """The city's name, qualified with the country when another country already has a city of that name."""
+        name, country_id = row['city_name'] or row['airport_name'], self.countries[row['country_name']]
+        if name in new_cities:
+            known_country_id = new_cities[name].country_id
+        else:
+            known_country_id = self.cities.get(name, (None, country_id))[1]
+        if known_country_id != country_id:
+            name = f"{name} ({row['country_name']})"[:255]
+        return name
+
+    def import_chunk(self, chunk):
+        version = sync.next_version()
+        self.stats['rows'] += len(chunk)
+        rows = []
+        for row in chunk:
+            if row['airport_code'] is None or row['country_name'] is None:
+                self.stats['skipped'] += 1
+            else:
+                rows.append(row)
+
+        new_countries = {}
+        for row in rows:
+            name = row['country_name']
+            if name not in self.countries and name not in new_countries:
+                code = self.unique_code(name, self.country_codes)
+                new_countries[name] = Country(country_name=name, country_code=code, country_abbr=code,
+                                              sync_version=version)
+        if new_countries:
+            Country.objects.bulk_create(new_countries.values())
+            self.countries.update(Country.objects.filter(country_name__in=new_countries).values_list(
+                'country_name', 'pk'))
+            self.stats['countries'] += len(new_countries)
+
+        new_cities = {}
+        for row in rows:
+            name = row['city_name'] = self.city_name(row, new_cities)
+            if name not in self.cities and name not in new_cities:
+                abbr = name[:3].upper()
+                code = row['icao_code'] if row['icao_code'] not in self.city_codes else None
+                new_cities[name] = City(
+                    country_id=self.countries[row['country_name']],
+                    city_name=name,
+                    city_code=code,
+                    city_abbr=abbr if abbr not in self.city_abbrs else None,
+                    timezone=row['timezone'] or '',
+                    sync_version=version,
+                )
+                self.city_codes.add(code)
+                self.city_abbrs.add(abbr)
+        if new_cities:
+            City.objects.bulk_create(new_cities.values())
+            self.cities.update((name, (pk, country_id)) for name, pk, country_id in City.objects.filter(
+                city_name__in=new_cities).values_list('city_name', 'pk', 'country_id'))
+            self.stats['cities'] += len(new_cities)
+
+        # A code listed twice in one chunk would hit the same row twice in one upsert; the last row wins.
+        airports = {}
+        for row in rows:
+            airports[row['airport_code']] = Airport(
+                airport_code=row['airport_code'],
+                airport_name=row['airport_name'] or row['airport_code'],
+                city_id=self.cities[row['city_name']][0],
+                latitude=to_float(row['latitude']),
+                longitude=to_float(row['longitude']),
+                utc_offset=to_float(row['utc_offset']),
+                timezone=row['timezone'] or '',
+                sync_version=version,
+            )
+        Airport.objects.bulk_create(
+            airports.values(),
+            update_conflicts=True,
+            unique_fields=['airport_code'],
+            update_fields=AIRPORT_UPDATE_FIELDS,
+        )
+        self.stats['airports'] += len(airports)
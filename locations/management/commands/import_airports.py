@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from locations.importer import AirportImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = "Import or update airports, cities and countries from an OpenFlights airports.dat CSV file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('file_path', type=str, help="Path to the CSV file")
+        parser.add_argument('--batch-size', type=int, default=2000, help="Number of rows written per chunk")
+        parser.add_argument('--skip-header', action='store_true', help="Skip the first line of the file")
+
+    def handle(self, *args, **kwargs):
+        started = time.monotonic()
+
+        def progress(stats):
+            self.stdout.write(f"{stats['rows']} rows read, {stats['airports']} airports written "
+                              f"({time.monotonic() - started:.1f}s)")
+
+        importer = AirportImporter(batch_size=kwargs['batch_size'], progress=progress)
+        with open(kwargs['file_path'], mode='r', encoding='utf-8', newline='') as file:
+            stats = importer.run(read_rows(file, skip_header=kwargs['skip_header']))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['airports']} airports, {stats['cities']} new cities and "
+            f"{stats['countries']} new countries in {time.monotonic() - started:.1f}s "
+            f"({stats['skipped']} rows without an airport code skipped)."
+        ))
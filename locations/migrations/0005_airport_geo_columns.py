@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0004_sync_tracking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='airport',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='airport',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='airport',
+            name='timezone',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='airport',
+            name='utc_offset',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
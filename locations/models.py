@@ -2,7 +2,10 @@
 
 from django.db import models
 
-class Country(models.Model):
+from core.models import SyncTrackedModel
+from locations.timezones import local_date
+
+class Country(SyncTrackedModel):
     country_code = models.CharField(max_length=10, unique=True)
     country_abbr = models.CharField(max_length=10, unique=True)
     country_name = models.CharField(max_length=255, unique=True)
@@ -11,7 +14,7 @@ class Country(models.Model):
         return self.country_name
 
 
-class City(models.Model):
+class City(SyncTrackedModel):
     country = models.ForeignKey(Country, on_delete=models.CASCADE, related_name='cities')
     city_code = models.CharField(max_length=10, unique=True, null=True, blank=True)
     city_abbr = models.CharField(max_length=10, unique=True, null=True, blank=True)
@@ -21,18 +24,26 @@ class City(models.Model):
     def __str__(self):
         return self.city_name
 
+    def local_date(self, moment):
+        return local_date(moment, self.timezone)
+
 
-class Airport(models.Model):
+class Airport(SyncTrackedModel):
     city = models.ForeignKey(City, on_delete=models.CASCADE, related_name='airports')
     airport_code = models.CharField(max_length=10, unique=True)
     airport_name = models.CharField(max_length=255)
     airport_picture_url = models.URLField(null=True, default='https://ugogostorageaccount.blob.core.windows.net/airportimage/ZTZ')
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    # Hours from UTC outside daylight saving time, as published by OpenFlights.
+    utc_offset = models.FloatField(null=True, blank=True)
+    timezone = models.CharField(max_length=50, blank=True, default='')
 
     def __str__(self):
         return f"{self.airport_name} ({self.airport_code})"
 
 
-class CityPolicy(models.Model):
+class CityPolicy(SyncTrackedModel):
     POLICY_TYPE_CHOICES = [
         ('allowed_categories', 'Allowed Categories'),
         ('restricted_items', 'Restricted Items'),
@@ -0,0 +1,85 @@
+from collections import defaultdict
+from functools import cached_property
+
+from core.registry import Registry
+from locations.autocomplete import AutocompleteIndex
+from locations.models import Country, City, Airport
+
+
+class LocationSnapshot:
+    """
+    Countries, cities and airports with their relations wired up in memory.
+    The instances are shared between requests and must not be modified.
+    """
+
+    def __init__(self, countries, cities, airports):
+        self.countries = {country.pk: country for country in countries}
+        self.cities = {city.pk: city for city in cities}
+        self.airports = {airport.pk: airport for airport in airports}
+        self.countries_by_code = {country.country_code: country for country in countries}
+        self.cities_by_code = {city.city_code: city for city in cities if city.city_code}
+        self.airports_by_code = {airport.airport_code: airport for airport in airports}
+
+        self.airport_ids_by_city = defaultdict(list)
+        self.airport_ids_by_country = defaultdict(list)
+        for city in cities:
+            city.country = self.countries[city.country_id]
+        for airport in airports:
+            airport.city = self.cities[airport.city_id]
+            self.airport_ids_by_city[airport.city_id].append(airport.pk)
+            self.airport_ids_by_country[airport.city.country_id].append(airport.pk)
+
+        self.representations = {}
+
+    def representation(self, serializer_class, instance):
+        """The cached `serializer_class(instance).data`. The result is shared and must not be modified."""
+        key = (serializer_class, instance.pk)
+        data = self.representations.get(key)
+        if data is None:
+            data = self.representations[key] = serializer_class(instance).data
+        return data
+
+    @cached_property
+    def autocomplete(self):
+        return AutocompleteIndex(self)
+
+
+class LocationRegistry(Registry):
+    models = (Country, City, Airport)
+
+    def build(self):
+        return LocationSnapshot(
+            list(Country.objects.all()),
+            list(City.objects.all()),
+            list(Airport.objects.all()),
+        )
+
+    def airport(self, pk):
+        return self.get().airports.get(pk)
+
+    def airport_by_code(self, code):
+        return self.get().airports_by_code.get(code)
+
+    def city(self, pk):
+        return self.get().cities.get(pk)
+
+    def country(self, pk):
+        return self.get().countries.get(pk)
+
+    def airport_ids(self, city_ids=(), country_ids=()):
+        """Ids of every airport in the given cities and countries."""
+        snapshot = self.get()
+        ids = set()
+        for city_id in city_ids:
+            ids.update(snapshot.airport_ids_by_city.get(city_id, ()))
+        for country_id in country_ids:
+            ids.update(snapshot.airport_ids_by_country.get(country_id, ()))
+        return ids
+
+    def city_ids_matching(self, name):
+        """Ids of the cities whose name contains `name`, ignoring case."""
+        name = name.casefold()
+        return {pk for pk, city in self.get().cities.items() if name in city.city_name.casefold()}
+
+
+locations = LocationRegistry()
@@ -1,5 +1,31 @@
 from rest_framework import serializers
 from .models import Country, City, Airport, CityPolicy
+from .registry import locations
+
+
+class RegistryRelatedField(serializers.RelatedField):
+    """
+    Read-only nested representation of a location served from the registry.
+    Only the foreign key is read from the row, so query plans need no join.
+    """
+    serializer_class = None
+    lookup = None
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def use_pk_only_optimization(self):
+        return True
+
+    def to_representation(self, value):
+        instance = getattr(locations, self.lookup)(value.pk)
+        if instance is None:
+            # Written after the snapshot was taken in another process.
+            instance = self.serializer_class.Meta.model.objects.get(pk=value.pk)
+            return self.serializer_class(instance).data
+        return locations.get().representation(self.serializer_class, instance)
+
 
 class CountrySerializer(serializers.ModelSerializer):
     class Meta:
@@ -7,8 +33,13 @@ class CountrySerializer(serializers.ModelSerializer):
         fields = ['id', 'country_code', 'country_abbr', 'country_name']
 
 
+class CountryField(RegistryRelatedField):
+    serializer_class = CountrySerializer
+    lookup = 'country'
+
+
 class CitySerializer(serializers.ModelSerializer):
-    country = CountrySerializer(read_only=True)
+    country = CountryField()
     country_id = serializers.PrimaryKeyRelatedField(queryset=Country.objects.all(), source='country', write_only=True)
 
     class Meta:
@@ -16,19 +47,35 @@ class CitySerializer(serializers.ModelSerializer):
         fields = ['id', 'country', 'country_id', 'city_code', 'city_abbr', 'city_name', 'timezone']
 
 
+class CityField(RegistryRelatedField):
+    serializer_class = CitySerializer
+    lookup = 'city'
+
+
 class AirportSerializer(serializers.ModelSerializer):
-    city = CitySerializer(read_only=True)
+    city = CityField()
     city_id = serializers.PrimaryKeyRelatedField(queryset=City.objects.all(), source='city', write_only=True)
 
     class Meta:
         model = Airport
-        fields = ['id', 'city', 'city_id', 'airport_code', 'airport_name', 'airport_picture_url']
+        fields = ['id', 'city', 'city_id', 'airport_code', 'airport_name', 'airport_picture_url',
+                  'latitude', 'longitude', 'utc_offset', 'timezone']
+
+
+class AirportField(RegistryRelatedField):
+    serializer_class = AirportSerializer
+    lookup = 'airport'
 
 
 class CityPolicySerializer(serializers.ModelSerializer):
-    city = CitySerializer(read_only=True)
+    city = CityField()
     city_id = serializers.PrimaryKeyRelatedField(queryset=City.objects.all(), source='city', write_only=True)
 
     class Meta:
         model = CityPolicy
         fields = ['id', 'city', 'city_id', 'policy_type', 'policy_status', 'policy_description']
+
+
+class AutocompleteQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=100, required=True)
+    limit = serializers.IntegerField(required=False, default=10, min_value=1, max_value=50)
@@ -1,9 +1,25 @@
 # locations/tests.py
 
+import csv
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
+from core import sync
+from core.models import DataVersion
 from .models import Country, City, Airport, CityPolicy
+from .autocomplete import AutocompleteIndex
+from .registry import LocationSnapshot, locations
+from .serializers import AirportSerializer
 from users.models import Users
 
 
@@ -339,3 +355,197 @@ class CityPolicyTests(LocationAPITestCase):
         response = self.client.delete(url, format='json')
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(CityPolicy.objects.count(), 0)
+
+
+
+@override_settings(REFERENCE_DATA_CHECK_INTERVAL=3600)
+class LocationRegistryTest(TestCase):
+    def setUp(self):
+        self.country = Country.objects.create(country_code='AM', country_abbr='ARM', country_name='Armenia')
+        self.city = City.objects.create(country=self.country, city_code='EVN', city_abbr='EV',
+                                        city_name='Yerevan', timezone='Asia/Yerevan')
+        self.airport = Airport.objects.create(city=self.city, airport_code='EVN', airport_name='Zvartnots')
+
+    def test_lookups_are_served_from_memory(self):
+        locations.get()
+        with self.assertNumQueries(0):
+            self.assertEqual(locations.airport(self.airport.pk).airport_code, 'EVN')
+            self.assertEqual(locations.airport_by_code('EVN').city.country.country_name, 'Armenia')
+            self.assertEqual(locations.get().airport_ids_by_country[self.country.pk], [self.airport.pk])
+            self.assertIsNone(locations.airport_by_code('XXX'))
+
+    def test_local_writes_are_visible_immediately(self):
+        locations.get()
+        Airport.objects.create(city=self.city, airport_code='LWN', airport_name='Gyumri')
+        self.assertIsNotNone(locations.airport_by_code('LWN'))
+
+    def test_reloads_when_another_process_bumps_the_version(self):
+        locations.get()
+        # Simulates a write in another process: no local signal, only the stamp moves.
+        Airport.objects.filter(pk=self.airport.pk).update(airport_name='Renamed')
+        DataVersion.objects.filter(key='locations.airport').update(version=1000)
+        self.assertEqual(locations.airport(self.airport.pk).airport_name, 'Zvartnots')
+        with override_settings(REFERENCE_DATA_CHECK_INTERVAL=0):
+            self.assertEqual(locations.airport(self.airport.pk).airport_name, 'Renamed')
+
+    def test_nested_representation_needs_no_queries(self):
+        airport = Airport.objects.get(pk=self.airport.pk)
+        locations.get()
+        with self.assertNumQueries(0):
+            data = AirportSerializer(airport).data
+        self.assertEqual(data['city']['country']['country_code'], 'AM')
+        self.assertEqual(data['city']['city_name'], 'Yerevan')
+
+
+class LocationAutocompleteTest(TestCase):
+    def setUp(self):
+        uk = Country.objects.create(country_code='GB', country_abbr='GBR', country_name='United Kingdom')
+        armenia = Country.objects.create(country_code='AM', country_abbr='ARM', country_name='Armenia')
+        london = City.objects.create(country=uk, city_code='LON', city_abbr='LO', city_name='London')
+        yerevan = City.objects.create(country=armenia, city_code='EVN', city_abbr='EV', city_name='Yerevan')
+        self.lhr = Airport.objects.create(city=london, airport_code='LHR', airport_name='Heathrow')
+        self.lcy = Airport.objects.create(city=london, airport_code='LCY', airport_name='London City')
+        self.evn = Airport.objects.create(city=yerevan, airport_code='EVN', airport_name='Zvartnots')
+        self.lwn = Airport.objects.create(city=yerevan, airport_code='LWN', airport_name='Leninakan Heathrow Annex')
+
+    def search(self, q, **params):
+        response = self.client.get(reverse('location-autocomplete'), {'q': q, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_exact_code_ranks_first(self):
+        data = self.search('lhr')
+        self.assertEqual(data['airports'][0]['airport_code'], 'LHR')
+        self.assertEqual(data['airports'][0]['city']['city_name'], 'London')
+
+    def test_ranking_by_field(self):
+        codes = [airport['airport_code'] for airport in self.search('l')['airports']]
+        # Code prefixes first, then city names.
+        self.assertEqual(codes[:3], ['LCY', 'LHR', 'LWN'])
+
+        codes = [airport['airport_code'] for airport in self.search('heathrow')['airports']]
+        self.assertEqual(codes, ['LHR', 'LWN'])
+
+    def test_matches_words_countries_and_substrings(self):
+        self.assertCountEqual([a['airport_code'] for a in self.search('kingdom')['airports']], ['LCY', 'LHR'])
+        self.assertEqual([a['airport_code'] for a in self.search('vartno')['airports']], ['EVN'])
+        self.assertEqual([c['city_name'] for c in self.search('yere')['cities']], ['Yerevan'])
+        self.assertEqual(self.search('zzz'), {'airports': [], 'cities': []})
+
+    def test_limit_and_validation(self):
+        self.assertEqual(len(self.search('l', limit=1)['airports']), 1)
+        response = self.client.get(reverse('location-autocomplete'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(REFERENCE_DATA_CHECK_INTERVAL=3600)
+    def test_served_from_memory_and_rebuilt_on_change(self):
+        self.search('lhr')
+        with self.assertNumQueries(0):
+            self.search('london')
+        Airport.objects.create(city=self.lhr.city, airport_code='STN', airport_name='Stansted')
+        self.assertEqual([a['airport_code'] for a in self.search('stan')['airports']], ['STN'])
+
+    def test_search_latency_for_ten_thousand_airports(self):
+        countries = [Country(pk=pk, country_code=f'C{pk}', country_name=f'Country {pk}') for pk in range(200)]
+        cities = [City(pk=pk, country_id=pk % 200, city_code=f'T{pk}', city_name=f'Town {pk} Springs')
+                  for pk in range(2000)]
+        airports = [Airport(pk=pk, city_id=pk % 2000, airport_code=f'{pk:04d}'[::-1],
+                            airport_name=f'Airport {pk} International')
+                    for pk in range(10000)]
+        index = AutocompleteIndex(LocationSnapshot(countries, cities, airports))
+
+        durations = []
+        for query in ['0', '12', 'town', 'town 19', 'count', 'spri', 'national', 'airport 99', 'ing', 'zzz'] * 20:
+            started = time.perf_counter()
+            index.search(query)
+            durations.append(time.perf_counter() - started)
+        durations.sort()
+        self.assertLess(durations[int(len(durations) * 0.99)], 0.005)
+
+
+class LocationConditionalGetTest(TestCase):
+    def setUp(self):
+        country = Country.objects.create(country_code='AM', country_abbr='ARM', country_name='Armenia')
+        self.city = City.objects.create(country=country, city_code='EVN', city_abbr='EV', city_name='Yerevan')
+        Airport.objects.create(city=self.city, airport_code='EVN', airport_name='Zvartnots')
+
+    def test_airport_list_revalidates_on_related_changes(self):
+        url = reverse('airport-list-create')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Airports embed their city, so renaming the city changes the list.
+        self.city.city_name = 'Erebuni'
+        self.city.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_city_policies_are_tracked(self):
+        url = reverse('citypolicy-list-create')
+        etag = self.client.get(url)['ETag']
+        CityPolicy.objects.create(city=self.city, policy_type='import', policy_status='allowed',
+                                  policy_description='Anything')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+
+class ImportAirportsTest(TestCase):
+    def write_csv(self, rows):
+        path = os.path.join(self.tmp, 'airports.dat')
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            csv.writer(file).writerows(rows)
+        return path
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def row(self, pk, name, city, country, iata, icao, lat='40.1', lon='44.4', offset='4', tz='Asia/Yerevan'):
+        return [pk, name, city, country, iata, icao, lat, lon, '3000', offset, 'E', tz, 'airport', 'OurAirports']
+
+    def test_import_upserts_and_keeps_geo_columns(self):
+        Country.objects.create(country_code='AM', country_abbr='ARM', country_name='Armenia')
+        path = self.write_csv([
+            self.row(1, 'Zvartnots', 'Yerevan', 'Armenia', 'EVN', 'UDYZ'),
+            self.row(2, 'Shirak', 'Gyumri', 'Armenia', 'LWN', 'UDSG'),
+            self.row(3, 'Paris Airport', 'Paris', 'United States', 'PRX', 'KPRX', tz='America/Chicago'),
+            self.row(4, 'Charles de Gaulle', 'Paris', 'France', 'CDG', 'LFPG', tz='Europe/Paris'),
+            self.row(5, 'Nowhere Strip', 'Nowhere', 'United Kingdom', '\\N', '\\N'),
+            self.row(6, 'United Field', 'Unity', 'United Arab Emirates', 'UAE', 'OMUA'),
+        ])
+        out = StringIO()
+        call_command('import_airports', path, '--batch-size', '2', stdout=out)
+        self.assertIn('Imported 5 airports', out.getvalue())
+        self.assertIn('1 rows without an airport code skipped', out.getvalue())
+
+        evn = Airport.objects.get(airport_code='EVN')
+        self.assertEqual((evn.latitude, evn.longitude, evn.utc_offset, evn.timezone),
+                         (40.1, 44.4, 4.0, 'Asia/Yerevan'))
+        self.assertEqual(evn.city.country.country_code, 'AM')
+        self.assertEqual(Airport.objects.get(airport_code='CDG').city.city_name, 'Paris (France)')
+        self.assertEqual(Country.objects.get(country_name='United Arab Emirates').country_code, 'UNI2')
+
+        # Re-importing updates rows in place.
+        path = self.write_csv([self.row(1, 'Zvartnots International', 'Yerevan', 'Armenia', 'EVN', 'UDYZ')])
+        call_command('import_airports', path, stdout=StringIO())
+        self.assertEqual(Airport.objects.filter(airport_code='EVN').get().airport_name, 'Zvartnots International')
+        self.assertEqual(Airport.objects.count(), 5)
+
+    def test_registry_and_sync_see_bulk_writes(self):
+        locations.get()
+        version = sync.current_version()
+        call_command('import_airports', self.write_csv([self.row(1, 'Zvartnots', 'Yerevan', 'Armenia', 'EVN', 'UDYZ')]),
+                     stdout=StringIO())
+        self.assertIsNotNone(locations.airport_by_code('EVN'))
+        self.assertGreater(Airport.objects.get(airport_code='EVN').sync_version, version)
+
+    def test_ten_thousand_airports_in_chunks(self):
+        path = self.write_csv([
+            self.row(pk, f'Airport {pk}', f'City {pk // 3}', f'Country {pk // 50}', f'A{pk:04d}', f'I{pk:04d}')
+            for pk in range(10000)
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            call_command('import_airports', path, stdout=StringIO())
+        self.assertEqual(Airport.objects.count(), 10000)
+        # Writes are chunked: the query count does not grow with the number of rows.
+        self.assertLess(len(queries), 10000 // 20)
@@ -0,0 +1,17 @@
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.utils import timezone
+
+
+@lru_cache(maxsize=None)
+def zone(name):
+    """The named IANA zone, or the project's default zone when `name` is not a valid zone name."""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        return timezone.get_default_timezone()
+
+
+def local_date(moment, zone_name):
+    return moment.astimezone(zone(zone_name)).date()
@@ -5,7 +5,8 @@ from .views import (
     CountryListCreateView, CountryDetailView,
     CityListCreateView, CityDetailView,
     AirportListCreateView, AirportDetailView,
-    CityPolicyListCreateView, CityPolicyDetailView
+    CityPolicyListCreateView, CityPolicyDetailView,
+    LocationAutocompleteView
 )
 
 urlpatterns = [
@@ -21,6 +22,9 @@ urlpatterns = [
     path('airports/', AirportListCreateView.as_view(), name='airport-list-create'),
     path('airports/<int:pk>/', AirportDetailView.as_view(), name='airport-detail'),
 
+    # Autocomplete
+    path('autocomplete/', LocationAutocompleteView.as_view(), name='location-autocomplete'),
+
     # CityPolicy Endpoints
     path('city-policies/', CityPolicyListCreateView.as_view(), name='citypolicy-list-create'),
     path('city-policies/<int:pk>/', CityPolicyDetailView.as_view(), name='citypolicy-detail'),
@@ -1,10 +1,16 @@
-from rest_framework import generics, permissions
+from django.utils.decorators import method_decorator
+from rest_framework import generics, permissions, status
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from core.conditional import conditional_get
 from .models import Country, City, Airport, CityPolicy
-from .serializers import CountrySerializer, CitySerializer, AirportSerializer, CityPolicySerializer
+from .registry import locations
+from .serializers import CountrySerializer, CitySerializer, AirportSerializer, CityPolicySerializer, \
+    AutocompleteQuerySerializer
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -12,6 +18,7 @@ class StandardResultsSetPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+@method_decorator(conditional_get(Country), name='get')
 class CountryListCreateView(generics.ListCreateAPIView):
     queryset = Country.objects.all()
     serializer_class = CountrySerializer
@@ -95,6 +102,7 @@ class CountryDetailView(generics.RetrieveUpdateDestroyAPIView):
         return super().delete(request, *args, **kwargs)
 
 
+@method_decorator(conditional_get(City, Country), name='get')
 class CityListCreateView(generics.ListCreateAPIView):
     queryset = City.objects.all()
     serializer_class = CitySerializer
@@ -177,6 +185,7 @@ class CityDetailView(generics.RetrieveUpdateDestroyAPIView):
         return super().delete(request, *args, **kwargs)
 
 
+@method_decorator(conditional_get(Airport, City, Country), name='get')
 class AirportListCreateView(generics.ListCreateAPIView):
     queryset = Airport.objects.all()
     serializer_class = AirportSerializer
@@ -259,6 +268,7 @@ class AirportDetailView(generics.RetrieveUpdateDestroyAPIView):
         return super().delete(request, *args, **kwargs)
 
 
+@method_decorator(conditional_get(CityPolicy, City, Country), name='get')
 class CityPolicyListCreateView(generics.ListCreateAPIView):
     queryset = CityPolicy.objects.all()
     serializer_class = CityPolicySerializer
@@ -339,3 +349,30 @@ class CityPolicyDetailView(generics.RetrieveUpdateDestroyAPIView):
     )
     def delete(self, request, *args, **kwargs):
         return super().delete(request, *args, **kwargs)
+
+
+class LocationAutocompleteView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    @swagger_auto_schema(
+        query_serializer=AutocompleteQuerySerializer,
+        operation_description="Airports and cities matching a search term, served from memory. "
+                              "Exact IATA codes rank first, then code, city, airport and country "
+                              "name prefixes, then names containing the term.",
+        responses={
+            200: "Returned the matching airports and cities.",
+            400: "Bad Request",
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        serializer = AutocompleteQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        snapshot = locations.get()
+        airports, cities = snapshot.autocomplete.search(serializer.validated_data['q'],
+                                                        serializer.validated_data['limit'])
+        return Response({
+            'airports': [snapshot.representation(AirportSerializer, airport) for airport in airports],
+            'cities': [snapshot.representation(CitySerializer, city) for city in cities],
+        }, status=status.HTTP_200_OK)
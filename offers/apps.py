@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class OffersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'offers'
+
+    def ready(self):
+        from django.conf import settings
+
+        from core import scheduler
+        from offers import lifecycle, signals  # noqa: F401
+
+        scheduler.register('expire_offers', getattr(settings, 'OFFER_EXPIRY_INTERVAL', 300), lifecycle.expire_offers)
@@ -0,0 +1,89 @@
+"""
+Compact, side-loaded offer payloads.
+
+Every offer in the default payload repeats its airports' nested city and
+country objects and the courier's user object. In the compact format each
+offer references those by id, and one de-duplicated `included` dictionary is
+emitted per response.
+"""
+from drf_yasg import openapi
+from rest_framework.renderers import JSONRenderer
+
+from locations.models import Airport
+from locations.registry import locations
+from offers.serializer.compact_offer_serializer import (
+    CompactOfferSerializer, IncludedAirportSerializer, IncludedCitySerializer, IncludedCountrySerializer,
+)
+from offers.serializer.offer_serializer import OfferSerializer
+from offers.views.pegination_view import render_list
+from users.models import Users
+from users.serializers.serializers import CustomUserSerializer
+
+COMPACT_MEDIA_TYPE = 'application/vnd.ugogo.compact+json'
+
+COMPACT_FORMAT_PARAMETER = openapi.Parameter(
+    'format', openapi.IN_QUERY,
+    description="Set to 'compact' to reference airports, cities, countries and users by id "
+                "and return them once in 'included'",
+    type=openapi.TYPE_STRING,
+)
+
+
+class CompactJSONRenderer(JSONRenderer):
+    """Selected with `?format=compact` or `Accept: application/vnd.ugogo.compact+json`."""
+    media_type = COMPACT_MEDIA_TYPE
+    format = 'compact'
+
+
+def is_compact(request):
+    renderer = getattr(request, 'accepted_renderer', None)
+    return renderer is not None and renderer.format == CompactJSONRenderer.format
+
+
+def format_params(request):
+    """The response format as a query fragment, for building cache keys."""
+    return {'format': CompactJSONRenderer.format} if is_compact(request) else {}
+
+
+def _by_id(serializer_class, instances):
+    return {str(row['id']): row for row in serializer_class(instances, many=True).data}
+
+
+def included_for(offers):
+    """Builds the `included` section for serialized compact offers."""
+    airport_ids, user_ids = set(), set()
+    for offer in offers:
+        flight = offer['user_flight']['flight']
+        airport_ids.update((flight['from_airport'], flight['to_airport']))
+        user_ids.update((offer['user_flight']['user'], offer['courier_id']))
+
+    snapshot = locations.get()
+    airports = [snapshot.airports[pk] for pk in airport_ids if pk in snapshot.airports]
+    missing = airport_ids - snapshot.airports.keys()
+    if missing:
+        airports += Airport.objects.filter(pk__in=missing).select_related('city__country')
+    cities = {airport.city_id: airport.city for airport in airports}
+    countries = {city.country_id: city.country for city in cities.values()}
+    users = Users.objects.filter(pk__in=user_ids)
+
+    return {
+        'airports': _by_id(IncludedAirportSerializer, airports),
+        'cities': _by_id(IncludedCitySerializer, cities.values()),
+        'countries': _by_id(IncludedCountrySerializer, countries.values()),
+        'users': _by_id(CustomUserSerializer, users),
+    }
+
+
+def render_offers(request, queryset):
+    """
+    `render_list` for offers that honours the compact format. Compact
+    responses are always an object with `results` and `included`, plus `next`
+    when a keyset page was requested.
+    """
+    if not is_compact(request):
+        return render_list(request, queryset, OfferSerializer)
+    data = render_list(request, queryset, CompactOfferSerializer)
+    if isinstance(data, list):
+        data = {'results': data}
+    data['included'] = included_for(data['results'])
+    return data
@@ -0,0 +1,165 @@
+"""
+Bulk creation of courier offers.
+
+`create_offers` writes the Flights, UserFlights, Offers and OfferCategory rows
+of many trips with one `bulk_create` per table inside a single transaction.
+Airline flights are canonical: trips on a flight number, origin and local
+departure date that already has a Flight row reuse it (see `canonical_flights`),
+provided they agree on its destination and times.
+`bulk_create` skips `Model.save()` and sends no signals, so this module does
+by hand what they would do: it fills the offers' dimension columns, indexes
+the offers (which also refreshes the price calendar) and, once the
+transaction commits, invalidates the search cache and the route graph.
+"""
+from datetime import timedelta, timezone as dt_timezone
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Q
+
+from core.dimensions import dimension_columns
+from items.models.items import ItemCategory
+from items.registry import categories as category_registry
+from locations.registry import locations
+from locations.timezones import zone
+from offers import search_index
+from offers.matching import FRAGILE_CATEGORY_NAME
+from offers.models import Flight, UserFlight, Offer, OfferCategory
+from offers.signals import invalidate_after_commit
+
+RECURRENCE_STEPS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+}
+
+
+def fragile_category_id():
+    """The id of the "Fragile" category, created on first use."""
+    fragile = category_registry.category_by_name(FRAGILE_CATEGORY_NAME)
+    if fragile is None:
+        fragile, _ = ItemCategory.objects.get_or_create(
+            name=FRAGILE_CATEGORY_NAME,
+            defaults={"description": "Fragile items that need special care"}
+        )
+    return fragile.pk
+
+
+def recurring_trips(trip, frequency, count, interval=1):
+    """
+    `count` copies of `trip`, each departing `interval` steps of `frequency`
+    after the previous at the same local time of the origin airport, with the
+    same flight duration.
+    """
+    step = RECURRENCE_STEPS[frequency] * interval
+    departure = trip['departure_datetime'].astimezone(zone(locations.airport(trip['from_airport_id']).city.timezone))
+    duration = trip['arrival_datetime'] - trip['departure_datetime']
+    trips = []
+    for occurrence in range(count):
+        # Aware arithmetic on a zoneinfo datetime is wall-clock arithmetic, so DST changes keep the local time.
+        local_departure = departure + step * occurrence
+        trips.append({
+            **trip,
+            'departure_datetime': local_departure,
+            'arrival_datetime': local_departure.astimezone(dt_timezone.utc) + duration,
+        })
+    return trips
+
+
+class FlightConflict(Exception):
+    """Raised for trips whose airline flight already exists with another destination or other times."""
+
+    def __init__(self, indexes):
+        super().__init__("This flight number already departs from this airport on this day "
+                         "to another destination or at other times.")
+        self.indexes = indexes
+
+
+def canonical_flights(flights):
+    """
+    Saves the unsaved `flights`, replacing each airline flight with the
+    existing row of its canonical key, and returns them in order. New airline
+    flights are inserted with ON CONFLICT DO NOTHING, so concurrent requests
+    for the same flight converge on one row. Raises FlightConflict, with the
+    indexes of the offending flights, when that row has another schedule.
+    """
+    for flight in flights:
+        flight.departure_date = flight.local_departure_date()
+    keyed = {flight.canonical_key(): flight for flight in flights if flight.canonical_key() is not None}
+    if keyed:
+        Flight.objects.bulk_create(keyed.values(), ignore_conflicts=True)
+        existing = {
+            flight.canonical_key(): flight
+            for flight in Flight.objects.filter(publisher='airline').filter(reduce(or_, (
+                Q(flight_number=number, from_airport_id=airport_id, departure_date=day)
+                for number, airport_id, day in keyed
+            )))
+        }
+        canonical = [existing.get(flight.canonical_key(), flight) for flight in flights]
+        conflicts = [
+            index for index, (flight, row) in enumerate(zip(flights, canonical))
+            if row.schedule() != flight.schedule()
+        ]
+        if conflicts:
+            raise FlightConflict(conflicts)
+        flights = canonical
+    Flight.objects.bulk_create([flight for flight in flights if flight.pk is None])
+    return flights
+
+
+def create_offers(user, trips):
+    """
+    Creates a flight, a user flight and an offer for each validated trip (see
+    UnifiedOfferCreationSerializer) and returns the offers, in trip order.
+    Creates nothing and raises FlightConflict if a trip's airline flight
+    exists with another schedule.
+    """
+    if not trips:
+        return []
+    fragile_id = fragile_category_id() if any(trip.get('allow_fragile') for trip in trips) else None
+
+    with transaction.atomic():
+        flights = canonical_flights([
+            Flight(
+                creator=user,
+                flight_number=trip['flight_number'],
+                publisher=trip.get('publisher', 'airline'),
+                from_airport_id=trip['from_airport_id'],
+                to_airport_id=trip['to_airport_id'],
+                departure_datetime=trip['departure_datetime'],
+                arrival_datetime=trip['arrival_datetime'],
+                details=trip.get('flight_details', ''),
+            )
+            for trip in trips
+        ])
+        user_flights = UserFlight.objects.bulk_create([UserFlight(flight=flight, user=user) for flight in flights])
+
+        offers = []
+        for trip, user_flight in zip(trips, user_flights):
+            offer = Offer(
+                user_flight=user_flight,
+                courier=user,
+                allow_fragile=trip.get('allow_fragile', False),
+                available_dimensions=trip.get('available_dimensions', ''),
+                available_weight=trip['available_weight'],
+                available_space=trip['available_space'],
+                price=trip['price'],
+                notes=trip.get('notes', ''),
+            )
+            offer.dim_large, offer.dim_medium, offer.dim_small, offer.volume = dimension_columns(
+                offer.available_dimensions
+            )
+            offers.append(offer)
+        Offer.objects.bulk_create(offers)
+
+        offer_categories = []
+        for trip, offer in zip(trips, offers):
+            category_ids = list(trip.get('category_ids', []))
+            if offer.allow_fragile and fragile_id not in category_ids:
+                category_ids.append(fragile_id)
+            offer_categories.extend(OfferCategory(offer=offer, category_id=pk) for pk in category_ids)
+        OfferCategory.objects.bulk_create(offer_categories)
+
+        offer_ids = [offer.pk for offer in offers]
+        invalidate_after_commit(search_index.sync_offers(offer_ids), offer_ids)
+    return offers
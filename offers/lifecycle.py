@@ -0,0 +1,49 @@
+"""
+Expiry of offers whose flight has departed.
+
+`expire_offers` moves available offers past their departure to 'expired' and
+their pending requests along with them. It works in batches of ids read from
+the partial index over available offers, with `update()` on each table, so no
+model instance is loaded and a batch costs the same whatever its offers hold.
+`update()` sends no signals, so every batch refreshes the search index rows,
+the price calendar cells and, once committed, the search cache and the route
+graph itself.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from flight_requests.models.request import Request
+from offers import price_calendar
+from offers.models import Offer, OfferSearchIndex
+from offers.signals import invalidate_after_commit
+
+EXPIRED = 'expired'
+
+
+def expire_batch(now, batch_size):
+    """Expires at most `batch_size` offers departed before `now` and returns how many."""
+    with transaction.atomic():
+        rows = list(
+            OfferSearchIndex.objects.filter(status='available', departure_datetime__lt=now)
+            .order_by('departure_datetime')
+            .values_list('offer_id', 'from_airport_code', 'to_airport_code', *price_calendar.CELL_FIELDS)
+            [:batch_size]
+        )
+        if not rows:
+            return 0
+        offer_ids = [row[0] for row in rows]
+        Offer.objects.filter(pk__in=offer_ids, status='available').update(status=EXPIRED)
+        OfferSearchIndex.objects.filter(offer_id__in=offer_ids).update(status=EXPIRED)
+        Request.objects.filter(offer_id__in=offer_ids, status='pending').update(status=EXPIRED, updated_at=now)
+        price_calendar.refresh_cells({row[3:] for row in rows})
+        invalidate_after_commit({row[1:3] for row in rows}, offer_ids)
+    return len(offer_ids)
+
+
+def expire_offers(now=None, batch_size=1000):
+    """Expires every available offer departed before `now` (by default, the current time) and returns how many."""
+    now = now or timezone.now()
+    total = 0
+    while expired := expire_batch(now, batch_size):
+        total += expired
+    return total
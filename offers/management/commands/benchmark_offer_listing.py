@@ -0,0 +1,143 @@
+import json
+import os
+import resource
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from locations.models import Airport
+from offers.models import Flight, UserFlight, Offer
+from users.models import Users
+
+BENCHMARK_EMAIL = 'benchmark-offer-listing@ugogo.local'
+
+MODES = {
+    'buffered': ({}, {}),
+    'stream-json': ({'stream': 'true'}, {}),
+    'stream-ndjson': ({}, {'HTTP_ACCEPT': 'application/x-ndjson'}),
+}
+
+
+def _max_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _measure(mode):
+    params, headers = MODES[mode]
+    client = Client(HTTP_HOST='localhost')
+    rss_before = _max_rss_mb()
+    started = time.perf_counter()
+    response = client.get(reverse('get-all-offers'), params, **headers)
+    if response.streaming:
+        # The opening '[' of a JSON array goes out immediately; time the first row instead.
+        chunks = iter(response.streaming_content)
+        size = 0
+        for chunk in chunks:
+            size += len(chunk)
+            if len(chunk) > 1:
+                break
+        ttfb = time.perf_counter() - started
+        size += sum(len(chunk) for chunk in chunks)
+    else:
+        ttfb = time.perf_counter() - started
+        size = len(response.content)
+    return {
+        'ttfb': ttfb,
+        'total': time.perf_counter() - started,
+        'peak_rss_mb': _max_rss_mb() - rss_before,
+        'bytes': size,
+    }
+
+
+def _measure_in_child(mode):
+    """
+    Runs one measurement in a forked child so every mode starts from the same
+    memory baseline and the peak RSS of one mode cannot hide another's.
+    """
+    connections.close_all()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            result = _measure(mode)
+        except Exception as exc:
+            result = {'error': repr(exc)}
+        with os.fdopen(write_fd, 'w') as pipe:
+            json.dump(result, pipe)
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        result = json.load(pipe)
+    os.waitpid(pid, 0)
+    if 'error' in result:
+        raise CommandError(f"{mode} failed: {result['error']}")
+    return result
+
+
+class Command(BaseCommand):
+    help = ("Compare peak RSS and time to first byte of get_all_offers in buffered and streaming mode. "
+            "Seeds throw-away offers owned by a dedicated benchmark courier and removes them afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                            help="Offer counts to benchmark")
+        parser.add_argument('--batch-size', type=int, default=10000, help="Rows inserted per bulk_create")
+        parser.add_argument('--keep', action='store_true', help="Keep the seeded offers")
+
+    def handle(self, *args, **kwargs):
+        if not hasattr(os, 'fork'):
+            raise CommandError("The benchmark needs os.fork to isolate the measurements.")
+        if Offer.objects.exclude(courier__email=BENCHMARK_EMAIL).exists():
+            self.stdout.write(self.style.WARNING("Existing offers are included in every measurement."))
+
+        airports = list(Airport.objects.all()[:2])
+        if len(airports) < 2:
+            raise CommandError("At least two airports are needed to seed benchmark flights.")
+
+        courier, _ = Users.objects.get_or_create(email=BENCHMARK_EMAIL, defaults={'full_name': 'Benchmark'})
+        departure = timezone.now() + timedelta(days=30)
+        flight = Flight.objects.create(creator=courier, from_airport=airports[0], to_airport=airports[1],
+                                       departure_datetime=departure, arrival_datetime=departure + timedelta(hours=4))
+        user_flight = UserFlight.objects.create(flight=flight, user=courier)
+
+        self.stdout.write(f"{'offers':>9} {'mode':<14} {'ttfb ms':>9} {'total s':>9} {'peak rss MB':>12} {'MB sent':>9}")
+        try:
+            seeded = 0
+            for size in sorted(kwargs['sizes']):
+                seeded = self._seed(user_flight, courier, seeded, size, kwargs['batch_size'])
+                for mode in MODES:
+                    result = _measure_in_child(mode)
+                    self.stdout.write(
+                        f"{size:>9} {mode:<14} {result['ttfb'] * 1000:>9.1f} {result['total']:>9.2f} "
+                        f"{result['peak_rss_mb']:>12.1f} {result['bytes'] / 1024 / 1024:>9.1f}"
+                    )
+        finally:
+            if not kwargs['keep']:
+                self._cleanup(courier)
+
+        self.stdout.write(self.style.SUCCESS("Benchmark completed."))
+
+    def _seed(self, user_flight, courier, seeded, size, batch_size):
+        while seeded < size:
+            count = min(batch_size, size - seeded)
+            Offer.objects.bulk_create([
+                Offer(user_flight=user_flight, courier=courier, price='50.00',
+                      available_weight='10.00', available_space='1.00')
+                for _ in range(count)
+            ])
+            seeded += count
+        return seeded
+
+    def _cleanup(self, courier):
+        # A raw delete avoids loading a million Offer instances for the cascade collector.
+        connections.close_all()
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {Offer._meta.db_table} WHERE courier_id = %s", [courier.pk])
+        courier.delete()
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from offers import lifecycle
+
+
+class Command(BaseCommand):
+    help = "Expire available offers whose flight has departed, with their pending requests"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Number of offers expired per batch")
+
+    def handle(self, *args, **kwargs):
+        total = lifecycle.expire_offers(batch_size=kwargs['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Expired {total} offers."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from offers import search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized offer search index from scratch"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Number of offers indexed per batch")
+
+    def handle(self, *args, **kwargs):
+        total = search_index.rebuild(batch_size=kwargs['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} offers."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from offers import price_calendar
+
+
+class Command(BaseCommand):
+    help = "Rebuild the route price calendar from the offer search index"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Number of cells written per batch")
+
+    def handle(self, *args, **kwargs):
+        total = price_calendar.rebuild(batch_size=kwargs['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {total} calendar cells."))
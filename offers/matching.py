@@ -0,0 +1,62 @@
+"""
+Finds the offers that can physically carry an item.
+
+Every constraint is a SQL condition on indexed columns, so the database does
+the matching for all offers at once:
+
+- weight: the offer's available weight covers the item's weight;
+- dimensions: the item fits in some axis-aligned orientation, i.e. its sides
+  sorted from largest to smallest are each no larger than the offer's sorted
+  sides, and its volume is no larger. Offers without dimensions are not
+  limited by size;
+- categories: offers that list categories must list every category of the
+  item; offers without categories accept anything;
+- fragile: fragile items only match offers that allow fragile items.
+"""
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from items.registry import categories as category_registry
+from offers.models import Offer
+
+FRAGILE_CATEGORY_NAME = 'Fragile'
+
+
+def is_fragile(category_ids):
+    fragile = category_registry.category_by_name(FRAGILE_CATEGORY_NAME)
+    return fragile is not None and fragile.pk in category_ids
+
+
+def fits(item):
+    """The Q object matching offers whose capacity fits `item`."""
+    condition = Q(search_index__available_weight__gte=item.weight)
+    if item.dim_large is not None:
+        condition &= Q(dim_large__isnull=True) | Q(
+            dim_large__gte=item.dim_large,
+            dim_medium__gte=item.dim_medium,
+            dim_small__gte=item.dim_small,
+            volume__gte=item.volume,
+        )
+    return condition
+
+
+def matching_offers(item, queryset=None):
+    """Available, future offers of verified couriers that can carry `item`."""
+    if queryset is None:
+        queryset = Offer.objects.all()
+    offers = queryset.filter(
+        fits(item),
+        search_index__status='available',
+        search_index__courier_verified=True,
+        search_index__departure_datetime__gt=timezone.now(),
+    ).exclude(courier_id=item.user_id)
+
+    category_ids = set(item.categories.values_list('pk', flat=True))
+    if is_fragile(category_ids):
+        offers = offers.filter(allow_fragile=True)
+    if category_ids:
+        offers = offers.alias(
+            category_count=Count('categories', distinct=True),
+            matched_categories=Count('categories', filter=Q(categories__in=category_ids), distinct=True),
+        ).filter(Q(category_count=0) | Q(matched_categories=len(category_ids)))
+    return offers
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_search_index(apps, schema_editor):
+    Offer = apps.get_model('offers', 'Offer')
+    OfferCategory = apps.get_model('offers', 'OfferCategory')
+    OfferSearchIndex = apps.get_model('offers', 'OfferSearchIndex')
+
+    categories = {}
+    for offer_id, category_id in OfferCategory.objects.values_list('offer_id', 'category_id'):
+        if category_id < 63:
+            categories[offer_id] = categories.get(offer_id, 0) | (1 << category_id)
+
+    offers = Offer.objects.select_related(
+        'courier', 'user_flight__flight__from_airport', 'user_flight__flight__to_airport'
+    )
+    rows = []
+    for offer in offers.iterator(chunk_size=1000):
+        flight = offer.user_flight.flight
+        rows.append(OfferSearchIndex(
+            offer_id=offer.id,
+            from_airport_id=flight.from_airport_id,
+            to_airport_id=flight.to_airport_id,
+            from_airport_code=flight.from_airport.airport_code,
+            to_airport_code=flight.to_airport.airport_code,
+            from_city_id=flight.from_airport.city_id,
+            to_city_id=flight.to_airport.city_id,
+            departure_datetime=flight.departure_datetime,
+            arrival_datetime=flight.arrival_datetime,
+            price=offer.price,
+            available_weight=offer.available_weight,
+            available_space=offer.available_space,
+            courier_verified=offer.courier.passport_verification_status == 'verified',
+            status=offer.status,
+            category_bitmap=categories.get(offer.id, 0),
+        ))
+    OfferSearchIndex.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0003_airport_airport_picture_url'),
+        ('offers', '0015_offer_categories'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfferSearchIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_airport_code', models.CharField(max_length=10)),
+                ('to_airport_code', models.CharField(max_length=10)),
+                ('departure_datetime', models.DateTimeField()),
+                ('arrival_datetime', models.DateTimeField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('available_weight', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('available_space', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('courier_verified', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('available', 'Available'), ('taken', 'Taken'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('category_bitmap', models.BigIntegerField(default=0)),
+                ('from_airport', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='locations.airport')),
+                ('from_city', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='locations.city')),
+                ('offer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='search_index', to='offers.offer')),
+                ('to_airport', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='locations.airport')),
+                ('to_city', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='locations.city')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['from_airport_code', 'to_airport_code', 'departure_datetime'], name='offer_search_route_idx'), models.Index(fields=['from_city', 'to_city', 'departure_datetime'], name='offer_search_city_route_idx'), models.Index(fields=['status', 'courier_verified', 'price', 'departure_datetime'], name='offer_search_price_idx')],
+            },
+        ),
+        migrations.RunPython(populate_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+from core.dimensions import dimension_columns
+
+
+def populate_dimension_columns(apps, schema_editor):
+    Offer = apps.get_model('offers', 'Offer')
+    batch = []
+    for row in Offer.objects.only('id', 'available_dimensions').iterator(chunk_size=1000):
+        row.dim_large, row.dim_medium, row.dim_small, row.volume = dimension_columns(row.available_dimensions)
+        batch.append(row)
+        if len(batch) >= 1000:
+            Offer.objects.bulk_update(batch, ['dim_large', 'dim_medium', 'dim_small', 'volume'])
+            batch = []
+    if batch:
+        Offer.objects.bulk_update(batch, ['dim_large', 'dim_medium', 'dim_small', 'volume'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0014_item_dimension_columns'),
+        ('offers', '0016_offersearchindex'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='offer',
+            name='dim_large',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='offer',
+            name='dim_medium',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='offer',
+            name='dim_small',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='offer',
+            name='volume',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(fields=['dim_large', 'dim_medium', 'dim_small'], name='offer_dimensions_idx'),
+        ),
+        migrations.RunPython(populate_dimension_columns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0003_airport_airport_picture_url'),
+        ('offers', '0017_offer_dimension_columns'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='offersearchindex',
+            index=models.Index(fields=['from_airport', 'to_airport', 'departure_datetime'], name='offer_search_airport_idx'),
+        ),
+    ]
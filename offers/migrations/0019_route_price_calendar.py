@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:56
+
+import django.db.models.deletion
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum, Value
+from django.db.models.functions import Coalesce
+
+from locations.timezones import local_date
+
+
+def populate_route_price_calendar(apps, schema_editor):
+    OfferSearchIndex = apps.get_model('offers', 'OfferSearchIndex')
+    RoutePriceCalendar = apps.get_model('offers', 'RoutePriceCalendar')
+
+    batch = []
+    for row in OfferSearchIndex.objects.select_related('from_city').iterator(chunk_size=1000):
+        row.departure_local_date = local_date(row.departure_datetime, row.from_city.timezone)
+        batch.append(row)
+        if len(batch) >= 1000:
+            OfferSearchIndex.objects.bulk_update(batch, ['departure_local_date'])
+            batch = []
+    if batch:
+        OfferSearchIndex.objects.bulk_update(batch, ['departure_local_date'])
+
+    summaries = OfferSearchIndex.objects.filter(status='available').values(
+        'from_airport_id', 'to_airport_id', 'departure_local_date'
+    ).annotate(
+        min_price=Min('price'),
+        offer_count=Count('id'),
+        total_available_weight=Coalesce(
+            Sum('available_weight'), Value(Decimal('0')), output_field=models.DecimalField(max_digits=12, decimal_places=2)
+        ),
+    ).order_by()
+    RoutePriceCalendar.objects.bulk_create([
+        RoutePriceCalendar(
+            from_airport_id=row['from_airport_id'],
+            to_airport_id=row['to_airport_id'],
+            departure_date=row['departure_local_date'],
+            min_price=row['min_price'],
+            offer_count=row['offer_count'],
+            total_available_weight=row['total_available_weight'],
+        )
+        for row in summaries
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0003_airport_airport_picture_url'),
+        ('offers', '0018_offersearchindex_offer_search_airport_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoutePriceCalendar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('departure_date', models.DateField()),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('offer_count', models.PositiveIntegerField()),
+                ('total_available_weight', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='offersearchindex',
+            name='departure_local_date',
+            field=models.DateField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='offersearchindex',
+            index=models.Index(fields=['from_airport', 'to_airport', 'departure_local_date'], name='offer_search_local_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='routepricecalendar',
+            name='from_airport',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='locations.airport'),
+        ),
+        migrations.AddField(
+            model_name='routepricecalendar',
+            name='to_airport',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='locations.airport'),
+        ),
+        migrations.AddConstraint(
+            model_name='routepricecalendar',
+            constraint=models.UniqueConstraint(fields=('from_airport', 'to_airport', 'departure_date'), name='route_price_calendar_cell'),
+        ),
+        migrations.RunPython(populate_route_price_calendar, migrations.RunPython.noop),
+    ]
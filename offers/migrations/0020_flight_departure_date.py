@@ -0,0 +1,110 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:21
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+
+from locations.timezones import local_date
+
+PLACEHOLDER_FLIGHT_NUMBERS = ('', 'airline')
+
+
+def schedule(flight):
+    """Like Flight.schedule(), which historical models do not have."""
+    return flight.to_airport_id, flight.departure_datetime, flight.arrival_datetime
+
+
+def refresh_calendar_cells(apps, cells):
+    """Recomputes the given (from airport id, to airport id, local date) price calendar cells."""
+    OfferSearchIndex = apps.get_model('offers', 'OfferSearchIndex')
+    RoutePriceCalendar = apps.get_model('offers', 'RoutePriceCalendar')
+    for origin, destination, day in cells:
+        if day is None:
+            continue
+        cell = dict(from_airport_id=origin, to_airport_id=destination)
+        summary = OfferSearchIndex.objects.filter(status='available', departure_local_date=day, **cell).aggregate(
+            min_price=models.Min('price'),
+            offer_count=models.Count('id'),
+            total_available_weight=models.Sum('available_weight'),
+        )
+        if not summary['offer_count']:
+            RoutePriceCalendar.objects.filter(departure_date=day, **cell).delete()
+            continue
+        summary['total_available_weight'] = summary['total_available_weight'] or Decimal('0')
+        RoutePriceCalendar.objects.update_or_create(departure_date=day, defaults=summary, **cell)
+
+
+def merge_duplicate_flights(apps, schema_editor):
+    """
+    Fills departure_date and folds airline flights sharing a flight number,
+    origin, local departure date, destination and times into the oldest of
+    them. A flight whose number, origin and day match an older flight with
+    another destination or other times is not the same airline flight; it
+    becomes a custom flight, so its offers keep their trip.
+    """
+    Flight = apps.get_model('offers', 'Flight')
+    UserFlight = apps.get_model('offers', 'UserFlight')
+    OfferSearchIndex = apps.get_model('offers', 'OfferSearchIndex')
+
+    keepers = {}
+    duplicates = defaultdict(list)
+    conflicting = []
+    batch = []
+    flights = Flight.objects.select_related('from_airport__city', 'to_airport').order_by('pk')
+    for flight in flights.iterator(chunk_size=1000):
+        flight.departure_date = local_date(flight.departure_datetime, flight.from_airport.city.timezone)
+        batch.append(flight)
+        if len(batch) >= 1000:
+            Flight.objects.bulk_update(batch, ['departure_date'])
+            batch = []
+        if flight.publisher == 'airline' and flight.flight_number not in PLACEHOLDER_FLIGHT_NUMBERS:
+            keeper = keepers.setdefault((flight.flight_number, flight.from_airport_id, flight.departure_date), flight)
+            if keeper is flight:
+                continue
+            if schedule(keeper) == schedule(flight):
+                duplicates[keeper].append(flight.pk)
+            else:
+                conflicting.append(flight.pk)
+    if batch:
+        Flight.objects.bulk_update(batch, ['departure_date'])
+    if conflicting:
+        Flight.objects.filter(pk__in=conflicting).update(publisher='custom')
+
+    # The live search_index.sync_offers reads columns added by later migrations,
+    # so the moved offers' index rows and calendar cells are recomputed here.
+    cells = set()
+    for keeper, duplicate_ids in duplicates.items():
+        UserFlight.objects.filter(flight_id__in=duplicate_ids).update(flight=keeper)
+        moved = OfferSearchIndex.objects.filter(offer__user_flight__flight=keeper)
+        cells.update(moved.values_list('from_airport_id', 'to_airport_id', 'departure_local_date'))
+        moved.update(
+            to_airport_id=keeper.to_airport_id,
+            to_airport_code=keeper.to_airport.airport_code,
+            to_city_id=keeper.to_airport.city_id,
+            departure_datetime=keeper.departure_datetime,
+            departure_local_date=keeper.departure_date,
+            arrival_datetime=keeper.arrival_datetime,
+        )
+        cells.add((keeper.from_airport_id, keeper.to_airport_id, keeper.departure_date))
+        Flight.objects.filter(pk__in=duplicate_ids).delete()
+    refresh_calendar_cells(apps, cells)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0005_airport_geo_columns'),
+        ('offers', '0019_route_price_calendar'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='departure_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(merge_duplicate_flights, migrations.RunPython.noop),
+    ]
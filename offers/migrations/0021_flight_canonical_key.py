@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Separate from 0020: PostgreSQL refuses to alter a table with pending trigger events from the data migration.
+
+    dependencies = [
+        ('offers', '0020_flight_departure_date'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='flight',
+            constraint=models.UniqueConstraint(condition=models.Q(('publisher', 'airline'), models.Q(('flight_number__in', ('', 'airline')), _negated=True)), fields=('flight_number', 'from_airport', 'departure_date'), name='flight_canonical_key'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0005_airport_geo_columns'),
+        ('offers', '0021_flight_canonical_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='offer',
+            name='status',
+            field=models.CharField(choices=[('available', 'Available'), ('taken', 'Taken'), ('completed', 'Completed'), ('cancelled', 'Cancelled'), ('expired', 'Expired')], default='available', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='offersearchindex',
+            name='status',
+            field=models.CharField(choices=[('available', 'Available'), ('taken', 'Taken'), ('completed', 'Completed'), ('cancelled', 'Cancelled'), ('expired', 'Expired')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='offersearchindex',
+            index=models.Index(condition=models.Q(('status', 'available')), fields=['from_airport_code', 'to_airport_code', 'departure_datetime'], name='offer_search_active_route_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offersearchindex',
+            index=models.Index(condition=models.Q(('status', 'available')), fields=['departure_datetime'], name='offer_search_active_dep_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0022_offer_expiry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='offer',
+            name='held_weight',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+    ]
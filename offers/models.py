@@ -1,10 +1,16 @@
 # offers/models.py
 
 from django.db import models
+
+from core.dimensions import dimension_columns
 from users.models import Users
-from locations.models import Airport
+from locations.models import Airport, City
+from locations.registry import locations
 from items.models.items import ItemCategory
 
+# Flight numbers that do not name an actual flight (the field's default).
+PLACEHOLDER_FLIGHT_NUMBERS = ('', 'airline')
+
 
 class Flight(models.Model):
     PUBLISHER_CHOICES = [
@@ -20,10 +26,42 @@ class Flight(models.Model):
     arrival_datetime = models.DateTimeField()
     flight_number = models.CharField(max_length=50, choices=PUBLISHER_CHOICES, default='airline')
     details = models.TextField(null=True, blank=True)
+    # Departure date in the origin city's timezone; with the flight number and origin it identifies an airline flight.
+    departure_date = models.DateField(null=True, blank=True, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['flight_number', 'from_airport', 'departure_date'],
+                condition=models.Q(publisher='airline') & ~models.Q(flight_number__in=PLACEHOLDER_FLIGHT_NUMBERS),
+                name='flight_canonical_key',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.publisher.capitalize()} Flight from {self.from_airport} to {self.to_airport}"
 
+    def save(self, *args, **kwargs):
+        self.departure_date = self.local_departure_date()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'departure_datetime', 'from_airport'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'departure_date'}
+        super().save(*args, **kwargs)
+
+    def local_departure_date(self):
+        airport = locations.airport(self.from_airport_id) or self.from_airport
+        return airport.city.local_date(self.departure_datetime)
+
+    def canonical_key(self):
+        """(flight number, origin airport id, local departure date) of an airline flight, None for other flights."""
+        if self.publisher != 'airline' or self.flight_number in PLACEHOLDER_FLIGHT_NUMBERS:
+            return None
+        return self.flight_number, self.from_airport_id, self.departure_date
+
+    def schedule(self):
+        """(destination airport id, departure, arrival); airline flights sharing a canonical key must agree on it."""
+        return self.to_airport_id, self.departure_datetime, self.arrival_datetime
+
 
 class UserFlight(models.Model):
     flight = models.ForeignKey(Flight, related_name='user_flights', on_delete=models.CASCADE)
@@ -40,6 +78,8 @@ class Offer(models.Model):
         ('taken', 'Taken'),
         ('completed', 'Completed'),
         ('cancelled', 'Cancelled'),
+        # Set by offers.lifecycle once the flight has departed.
+        ('expired', 'Expired'),
     ]
 
     user_flight = models.ForeignKey(UserFlight, related_name='offers', on_delete=models.CASCADE)
@@ -48,15 +88,141 @@ class Offer(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     allow_fragile = models.BooleanField(default=False)
     available_dimensions = models.CharField(max_length=50, default='0x0x0')
+    # Parsed from available_dimensions on save, largest side first; null when no dimensions were given.
+    dim_large = models.FloatField(null=True, blank=True, editable=False)
+    dim_medium = models.FloatField(null=True, blank=True, editable=False)
+    dim_small = models.FloatField(null=True, blank=True, editable=False)
+    volume = models.FloatField(null=True, blank=True, editable=False)
     available_weight = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     available_space = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # Weight held for requests whose payment is in progress (see flight_requests.holds).
+    held_weight = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
     categories = models.ManyToManyField(ItemCategory, related_name='offers', blank=True, through='OfferCategory')
     notes = models.TextField(blank=True, null=True)
 
 
+    # Fields whose changes alter what the offer search returns.
+    SEARCH_FIELDS = ('status', 'price', 'available_weight', 'available_space')
+    DIMENSION_FIELDS = ('dim_large', 'dim_medium', 'dim_small', 'volume')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['dim_large', 'dim_medium', 'dim_small'], name='offer_dimensions_idx'),
+        ]
+
     def __str__(self):
         return f"Offer {self.id} by {self.courier.email} - Status: {self.status}"
 
+    def save(self, *args, **kwargs):
+        self.dim_large, self.dim_medium, self.dim_small, self.volume = dimension_columns(self.available_dimensions)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'available_dimensions' in update_fields:
+            kwargs['update_fields'] = {*update_fields, *self.DIMENSION_FIELDS}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_search_values = {
+            name: value for name, value in zip(field_names, values) if name in cls.SEARCH_FIELDS
+        }
+        return instance
+
+    def search_fields_changed(self):
+        loaded = getattr(self, '_loaded_search_values', None)
+        if loaded is None or len(loaded) != len(self.SEARCH_FIELDS):
+            return True
+        return any(getattr(self, name) != loaded[name] for name in self.SEARCH_FIELDS)
+
 class OfferCategory(models.Model):
     offer = models.ForeignKey('Offer', on_delete=models.CASCADE)
-    category = models.ForeignKey(ItemCategory, on_delete=models.CASCADE)
\ No newline at end of file
+    category = models.ForeignKey(ItemCategory, on_delete=models.CASCADE)
+
+
+class OfferSearchIndex(models.Model):
+    """
+    Flat, denormalized copy of the columns the offer search filters and orders on.
+    Kept in sync by offers.signals and rebuilt by `manage.py rebuild_offer_search_index`.
+    """
+    offer = models.OneToOneField(Offer, related_name='search_index', on_delete=models.CASCADE)
+    from_airport = models.ForeignKey(Airport, related_name='+', on_delete=models.CASCADE)
+    to_airport = models.ForeignKey(Airport, related_name='+', on_delete=models.CASCADE)
+    from_airport_code = models.CharField(max_length=10)
+    to_airport_code = models.CharField(max_length=10)
+    from_city = models.ForeignKey(City, related_name='+', on_delete=models.CASCADE)
+    to_city = models.ForeignKey(City, related_name='+', on_delete=models.CASCADE)
+    departure_datetime = models.DateTimeField()
+    # Departure date in the origin city's timezone.
+    departure_local_date = models.DateField(null=True)
+    arrival_datetime = models.DateTimeField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    # The offer's available weight less its held weight.
+    available_weight = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    available_space = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    courier_verified = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=Offer.STATUS_CHOICES)
+    category_bitmap = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['from_airport_code', 'to_airport_code', 'departure_datetime'],
+                name='offer_search_route_idx',
+            ),
+            models.Index(
+                fields=['from_city', 'to_city', 'departure_datetime'],
+                name='offer_search_city_route_idx',
+            ),
+            models.Index(
+                fields=['from_airport', 'to_airport', 'departure_datetime'],
+                name='offer_search_airport_idx',
+            ),
+            models.Index(
+                fields=['status', 'courier_verified', 'price', 'departure_datetime'],
+                name='offer_search_price_idx',
+            ),
+            models.Index(
+                fields=['from_airport', 'to_airport', 'departure_local_date'],
+                name='offer_search_local_date_idx',
+            ),
+            # Partial indexes over the available offers only, which stay few as expired offers pile up.
+            models.Index(
+                fields=['from_airport_code', 'to_airport_code', 'departure_datetime'],
+                condition=models.Q(status='available'),
+                name='offer_search_active_route_idx',
+            ),
+            models.Index(
+                fields=['departure_datetime'],
+                condition=models.Q(status='available'),
+                name='offer_search_active_dep_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Search index for offer {self.offer_id} ({self.from_airport_code} -> {self.to_airport_code})"
+
+
+class RoutePriceCalendar(models.Model):
+    """
+    One cell per route and local departure date, summarizing the available
+    offers. Maintained by offers.price_calendar whenever the search index
+    changes and rebuilt by `manage.py rebuild_route_price_calendar`.
+    """
+    from_airport = models.ForeignKey(Airport, related_name='+', on_delete=models.CASCADE)
+    to_airport = models.ForeignKey(Airport, related_name='+', on_delete=models.CASCADE)
+    departure_date = models.DateField()
+    min_price = models.DecimalField(max_digits=10, decimal_places=2)
+    offer_count = models.PositiveIntegerField()
+    total_available_weight = models.DecimalField(max_digits=12, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['from_airport', 'to_airport', 'departure_date'],
+                name='route_price_calendar_cell',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.from_airport_id} -> {self.to_airport_id} on {self.departure_date}"
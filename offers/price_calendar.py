@@ -0,0 +1,101 @@
+"""
+Maintenance of RoutePriceCalendar, the per-route, per-local-day summary of
+available offers.
+
+Cells are recomputed from OfferSearchIndex with one GROUP BY over the cells a
+change touched, so a write costs one aggregate and one upsert regardless of
+how many offers the route has. Writers lock the cells they recompute until
+they commit, so concurrent writes to one cell do not lose each other's rows.
+"""
+import hashlib
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from offers.models import OfferSearchIndex, RoutePriceCalendar
+
+CELL_FIELDS = ('from_airport_id', 'to_airport_id', 'departure_local_date')
+SUMMARY_FIELDS = ['min_price', 'offer_count', 'total_available_weight']
+
+
+def _summaries(queryset):
+    return queryset.filter(status='available', departure_local_date__isnull=False).values(
+        *CELL_FIELDS
+    ).annotate(
+        min_price=Min('price'),
+        offer_count=Count('id'),
+        total_available_weight=Coalesce(
+            Sum('available_weight'), Value(Decimal('0')), output_field=DecimalField(max_digits=12, decimal_places=2)
+        ),
+    ).order_by()
+
+
+def _cell(row):
+    return RoutePriceCalendar(
+        from_airport_id=row['from_airport_id'],
+        to_airport_id=row['to_airport_id'],
+        departure_date=row['departure_local_date'],
+        **{name: row[name] for name in SUMMARY_FIELDS},
+    )
+
+
+def _upsert(cells):
+    RoutePriceCalendar.objects.bulk_create(
+        cells,
+        update_conflicts=True,
+        unique_fields=['from_airport', 'to_airport', 'departure_date'],
+        update_fields=SUMMARY_FIELDS + ['updated_at'],
+    )
+
+
+def lock_cells(cells):
+    """
+    Takes a transaction-level advisory lock per cell, in a fixed order. A
+    writer that aggregates a cell after another then sees its committed rows,
+    instead of overwriting its result with a summary that misses them.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    keys = sorted({
+        int.from_bytes(hashlib.blake2b(repr(cell).encode(), digest_size=8).digest(), 'big', signed=True)
+        for cell in cells
+    })
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT pg_advisory_xact_lock(key) FROM (SELECT unnest(%s::bigint[]) AS key ORDER BY key) AS keys',
+            [keys],
+        )
+
+
+def refresh_cells(cells):
+    """Recomputes the given (from airport id, to airport id, local date) cells."""
+    cells = {cell for cell in cells if None not in cell}
+    if not cells:
+        return
+    index_match = reduce(or_, (Q(**dict(zip(CELL_FIELDS, cell))) for cell in cells))
+
+    with transaction.atomic():
+        lock_cells(cells)
+        rows = list(_summaries(OfferSearchIndex.objects.filter(index_match)))
+        found = {tuple(row[name] for name in CELL_FIELDS) for row in rows}
+        empty = cells - found
+        if empty:
+            RoutePriceCalendar.objects.filter(reduce(or_, (
+                Q(from_airport_id=origin, to_airport_id=destination, departure_date=day)
+                for origin, destination, day in empty
+            ))).delete()
+        if rows:
+            _upsert([_cell(row) for row in rows])
+
+
+def rebuild(batch_size=1000):
+    """Re-creates every cell from the search index. Returns the number of cells."""
+    cells = [_cell(row) for row in _summaries(OfferSearchIndex.objects.all())]
+    with transaction.atomic():
+        RoutePriceCalendar.objects.all().delete()
+        RoutePriceCalendar.objects.bulk_create(cells, batch_size=batch_size)
+    return len(cells)
@@ -0,0 +1,208 @@
+"""
+Connection search over courier offers.
+
+Available offers of verified couriers form a graph whose edges are flights
+between airports, carrying departure/arrival times, price and remaining
+capacity. The graph is kept in memory in one bucket per departure day, built
+from OfferSearchIndex the first time a day is searched:
+
+- writes in this process patch the affected buckets in place
+  (`RouteGraph.refresh`, called by offers.signals after commit);
+- every patched day bumps a `offers.routes.<date>` version stamp, and other
+  processes re-load a bucket when its stamp moved, checking at most every
+  REFERENCE_DATA_CHECK_INTERVAL seconds.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict, namedtuple, OrderedDict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from core import versioning
+from offers.models import OfferSearchIndex
+
+Edge = namedtuple('Edge', [
+    'offer_id', 'from_code', 'to_code', 'departure', 'arrival', 'available_weight', 'price',
+])
+
+EDGE_FIELDS = [
+    'offer_id', 'from_airport_code', 'to_airport_code',
+    'departure_datetime', 'arrival_datetime', 'available_weight', 'price',
+]
+
+
+def version_key(day):
+    return f'offers.routes.{day.isoformat()}'
+
+
+def day_range(day):
+    start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+    return start, timezone.make_aware(datetime.combine(day + timedelta(days=1), datetime.min.time()))
+
+
+def routable(queryset):
+    return queryset.filter(status='available', courier_verified=True)
+
+
+class DayBucket:
+    """The edges departing on one day, per origin airport, sorted by departure."""
+
+    def __init__(self, day, edges, version):
+        self.day = day
+        self.version = version
+        self.checked_at = time.monotonic()
+        self.by_origin = defaultdict(list)
+        for edge in edges:
+            self.add(edge)
+
+    def add(self, edge):
+        edges = self.by_origin[edge.from_code]
+        edges.insert(bisect_left(edges, edge.departure, key=lambda e: e.departure), edge)
+
+    def remove(self, offer_id):
+        for origin, edges in self.by_origin.items():
+            for position, edge in enumerate(edges):
+                if edge.offer_id == offer_id:
+                    del edges[position]
+                    return
+
+    def departing(self, origin, earliest, latest):
+        edges = self.by_origin.get(origin, ())
+        start = bisect_left(edges, earliest, key=lambda e: e.departure)
+        for edge in edges[start:]:
+            if edge.departure > latest:
+                break
+            yield edge
+
+
+class RouteGraph:
+    max_buckets = 62
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._buckets = OrderedDict()
+        self._offer_days = {}
+
+    @property
+    def check_interval(self):
+        return getattr(settings, 'REFERENCE_DATA_CHECK_INTERVAL', 5)
+
+    def _load(self, day, version):
+        start, end = day_range(day)
+        rows = routable(OfferSearchIndex.objects.filter(
+            departure_datetime__gte=start, departure_datetime__lt=end,
+        )).values_list(*EDGE_FIELDS)
+        edges = [Edge(*row) for row in rows]
+        for edge in edges:
+            self._offer_days[edge.offer_id] = day
+        return DayBucket(day, edges, version)
+
+    def buckets(self, days):
+        """Returns the buckets of `days`, loading missing ones and re-loading stale ones."""
+        days = list(days)
+        now = time.monotonic()
+        with self._lock:
+            due = [day for day in days
+                   if day not in self._buckets or now - self._buckets[day].checked_at >= self.check_interval]
+            if due:
+                versions = dict(zip(due, versioning.current_many([version_key(day) for day in due])))
+                for day in due:
+                    bucket = self._buckets.get(day)
+                    if bucket is None or bucket.version != versions[day]:
+                        self._buckets[day] = self._load(day, versions[day])
+                    else:
+                        bucket.checked_at = now
+            for day in days:
+                self._buckets.move_to_end(day)
+            while len(self._buckets) > self.max_buckets:
+                evicted, _ = self._buckets.popitem(last=False)
+                self._offer_days = {pk: day for pk, day in self._offer_days.items() if day != evicted}
+            return [self._buckets[day] for day in days]
+
+    def refresh(self, offer_ids):
+        """
+        Patches loaded buckets with the current index rows of `offer_ids` and
+        bumps the version of every day whose edges changed.
+        """
+        offer_ids = set(offer_ids)
+        if not offer_ids:
+            return
+        rows = routable(OfferSearchIndex.objects.filter(offer_id__in=offer_ids)).values_list(*EDGE_FIELDS)
+        edges = [Edge(*row) for row in rows]
+        with self._lock:
+            changed_days = set()
+            for offer_id in offer_ids:
+                day = self._offer_days.pop(offer_id, None)
+                if day is not None and day in self._buckets:
+                    self._buckets[day].remove(offer_id)
+                    changed_days.add(day)
+            for edge in edges:
+                day = timezone.localdate(edge.departure)
+                changed_days.add(day)
+                if day in self._buckets:
+                    self._buckets[day].add(edge)
+                    self._offer_days[edge.offer_id] = day
+            for day in changed_days:
+                version = versioning.bump(version_key(day))
+                bucket = self._buckets.get(day)
+                # The patched bucket stays current unless another process bumped the day meanwhile.
+                if bucket is not None and bucket.version == version - 1:
+                    bucket.version = version
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._offer_days.clear()
+
+    def itineraries(self, origin, destination, day, weight=None, max_stops=2,
+                    min_connection=None, max_layover=None, limit=20):
+        """
+        Itineraries with 1 to `max_stops` stops leaving `origin` on `day`, each
+        a list of edges. Every leg must carry `weight`, leave at least
+        `min_connection` after the previous leg lands and at most
+        `max_layover` after it, and never revisit an airport.
+        """
+        if min_connection is None:
+            min_connection = timedelta(minutes=getattr(settings, 'ROUTE_MIN_CONNECTION_MINUTES', 60))
+        if max_layover is None:
+            max_layover = timedelta(hours=getattr(settings, 'ROUTE_MAX_LAYOVER_HOURS', 24))
+
+        def carries(edge):
+            return weight is None or (edge.available_weight is not None and edge.available_weight >= weight)
+
+        def departing(origin_code, earliest, latest):
+            first, last = timezone.localdate(earliest), timezone.localdate(latest)
+            days = [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+            for bucket in self.buckets(days):
+                yield from bucket.departing(origin_code, earliest, latest)
+
+        start, end = day_range(day)
+        results = []
+
+        def extend(path, visited):
+            last = path[-1]
+            if last.to_code == destination and len(path) > 1:
+                results.append(list(path))
+                return
+            if len(path) > max_stops or last.to_code == destination:
+                return
+            for edge in departing(last.to_code, last.arrival + min_connection, last.arrival + max_layover):
+                if edge.to_code not in visited and carries(edge):
+                    path.append(edge)
+                    visited.add(edge.to_code)
+                    extend(path, visited)
+                    visited.discard(edge.to_code)
+                    path.pop()
+
+        for edge in departing(origin, start, end - timedelta(microseconds=1)):
+            if edge.to_code != origin and carries(edge):
+                extend([edge], {origin, edge.to_code})
+
+        results.sort(key=lambda legs: (legs[-1].arrival, sum(leg.price for leg in legs)))
+        return results[:limit]
+
+
+graph = RouteGraph()
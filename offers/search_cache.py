@@ -0,0 +1,151 @@
+"""
+Result cache for the public offer search endpoints.
+
+Entries are keyed on the normalized validated query plus a per-route version.
+Writes that change an offer on a route bump that route's version, which
+orphans every cached entry for it. Concurrent misses on the same key are
+coalesced with a lock taken through `cache.add`, which is atomic on both the
+local-memory and the Redis backends.
+"""
+import hashlib
+import json
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+
+ANY_AIRPORT = '*'
+LOCK_TIMEOUT = 10
+WAIT_INTERVAL = 0.05
+
+HITS_KEY = 'stats:hits'
+MISSES_KEY = 'stats:misses'
+
+
+def _cache():
+    return caches['offer_search']
+
+
+def _normalize(value):
+    if isinstance(value, dict):
+        return {key: _normalize(val) for key, val in value.items() if val is not None}
+    if isinstance(value, (list, tuple, set)):
+        return sorted(_normalize(val) for val in value)
+    if isinstance(value, Decimal):
+        return str(value.normalize())
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _route_key(origin, destination):
+    return f'route:{origin or ANY_AIRPORT}:{destination or ANY_AIRPORT}'
+
+
+def _incr(key):
+    cache = _cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # The counter expired or was evicted. Restart it from the clock so that
+        # a restarted route version can never collide with an older one.
+        value = time.time_ns()
+        cache.set(key, value, timeout=None)
+        return value
+
+
+def _count(key):
+    cache = _cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def _route_version(origin, destination):
+    key = _route_key(origin, destination)
+    version = _cache().get(key)
+    if version is None:
+        version = _incr(key)
+    return version
+
+
+def make_key(kind, query):
+    origin = query.get('origin_airport')
+    destination = query.get('destination_airport')
+    payload = json.dumps(_normalize(query), sort_keys=True)
+    digest = hashlib.sha1(payload.encode()).hexdigest()
+    return f'{kind}:{_route_version(origin, destination)}:{digest}'
+
+
+def get_or_compute(kind, query, compute):
+    """
+    Returns the cached result for the query, calling `compute` on a miss.
+    Only one caller per key computes at a time; the others wait for its result.
+    """
+    cache = _cache()
+    key = make_key(kind, query)
+
+    value = cache.get(key)
+    if value is not None:
+        _count(HITS_KEY)
+        return value
+
+    lock_key = f'{key}:lock'
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        time.sleep(WAIT_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            _count(HITS_KEY)
+            return value
+        if time.monotonic() > deadline:
+            # The lock holder is stuck or gone; answer this request without caching.
+            _count(MISSES_KEY)
+            return compute()
+
+    try:
+        value = cache.get(key)
+        if value is not None:
+            _count(HITS_KEY)
+            return value
+        value = compute()
+        cache.set(key, value, settings.OFFER_SEARCH_CACHE_TIMEOUT)
+        _count(MISSES_KEY)
+        return value
+    finally:
+        cache.delete(lock_key)
+
+
+def invalidate_routes(routes):
+    """
+    Orphans cached results for the given (origin code, destination code) routes,
+    including searches that left the origin or the destination open.
+    """
+    keys = set()
+    for origin, destination in routes:
+        keys.update({
+            _route_key(origin, destination),
+            _route_key(origin, None),
+            _route_key(None, destination),
+            _route_key(None, None),
+        })
+    for key in keys:
+        _incr(key)
+
+
+def stats():
+    cache = _cache()
+    counters = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits = counters.get(HITS_KEY, 0)
+    misses = counters.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        'backend': settings.OFFER_SEARCH_CACHE_BACKEND,
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / lookups, 4) if lookups else None,
+    }
@@ -0,0 +1,123 @@
+from collections import defaultdict
+
+from django.db import transaction
+
+from offers import price_calendar
+from offers.models import Offer, OfferCategory, OfferSearchIndex
+
+# Category ids are packed into a signed 64-bit column, so only ids below 63 fit the bitmap.
+CATEGORY_BITMAP_SIZE = 63
+
+INDEXED_FIELDS = [
+    'from_airport', 'to_airport', 'from_airport_code', 'to_airport_code',
+    'from_city', 'to_city', 'departure_datetime', 'departure_local_date', 'arrival_datetime',
+    'price', 'available_weight', 'available_space',
+    'courier_verified', 'status', 'category_bitmap',
+]
+
+
+def category_mask(category_ids):
+    """
+    Returns the bitmap for the given category ids, or None when one of them
+    does not fit in the bitmap and the caller has to fall back to a join.
+    """
+    mask = 0
+    for category_id in category_ids:
+        if not 0 <= category_id < CATEGORY_BITMAP_SIZE:
+            return None
+        mask |= 1 << category_id
+    return mask
+
+
+def build_index_row(offer, category_ids):
+    flight = offer.user_flight.flight
+    return OfferSearchIndex(
+        offer=offer,
+        from_airport_id=flight.from_airport_id,
+        to_airport_id=flight.to_airport_id,
+        from_airport_code=flight.from_airport.airport_code,
+        to_airport_code=flight.to_airport.airport_code,
+        from_city_id=flight.from_airport.city_id,
+        to_city_id=flight.to_airport.city_id,
+        departure_datetime=flight.departure_datetime,
+        departure_local_date=flight.from_airport.city.local_date(flight.departure_datetime),
+        arrival_datetime=flight.arrival_datetime,
+        price=offer.price,
+        available_weight=offer.available_weight - offer.held_weight if offer.available_weight is not None else None,
+        available_space=offer.available_space,
+        courier_verified=offer.courier.passport_verification_status == 'verified',
+        status=offer.status,
+        category_bitmap=category_mask(
+            [cid for cid in category_ids if cid < CATEGORY_BITMAP_SIZE]
+        ),
+    )
+
+
+def sync_offers(offer_ids):
+    """
+    Re-computes the index rows of the given offers, dropping rows whose offer
+    no longer exists, and the price calendar cells they were and now are in.
+    Returns the (origin code, destination code) routes the offers were and now
+    are on, so callers can invalidate what depends on them.
+    """
+    offer_ids = set(offer_ids)
+    if not offer_ids:
+        return set()
+
+    routes, cells = set(), set()
+    for row in OfferSearchIndex.objects.filter(offer_id__in=offer_ids).values_list(
+            'from_airport_code', 'to_airport_code', *price_calendar.CELL_FIELDS):
+        routes.add(row[:2])
+        cells.add(row[2:])
+
+    offers = Offer.objects.filter(pk__in=offer_ids).select_related(
+        'courier',
+        'user_flight__flight__from_airport__city',
+        'user_flight__flight__to_airport',
+    )
+
+    categories = defaultdict(list)
+    for offer_id, category_id in OfferCategory.objects.filter(
+            offer_id__in=offer_ids).values_list('offer_id', 'category_id'):
+        categories[offer_id].append(category_id)
+
+    rows = [build_index_row(offer, categories[offer.id]) for offer in offers]
+    missing = offer_ids - {row.offer_id for row in rows}
+
+    with transaction.atomic():
+        if missing:
+            OfferSearchIndex.objects.filter(offer_id__in=missing).delete()
+        if rows:
+            OfferSearchIndex.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['offer'],
+                update_fields=INDEXED_FIELDS,
+            )
+        cells.update((row.from_airport_id, row.to_airport_id, row.departure_local_date) for row in rows)
+        price_calendar.refresh_cells(cells)
+
+    routes.update((row.from_airport_code, row.to_airport_code) for row in rows)
+    return routes
+
+
+def rebuild(batch_size=1000):
+    """
+    Drops and re-creates the whole index. Returns the number of indexed offers.
+    """
+    total = 0
+    with transaction.atomic():
+        OfferSearchIndex.objects.all().delete()
+        offer_ids = Offer.objects.order_by('pk').values_list('pk', flat=True)
+        batch = []
+        for offer_id in offer_ids.iterator(chunk_size=batch_size):
+            batch.append(offer_id)
+            if len(batch) >= batch_size:
+                sync_offers(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            sync_offers(batch)
+            total += len(batch)
+        price_calendar.rebuild()
+    return total
@@ -1,6 +1,10 @@
+from django.db.models import F
 from rest_framework import serializers
 from offers.models import Offer
+from offers.search_index import category_mask
+from core.fields import PrimaryKeyListField
 from items.models.items import ItemCategory
+from items.registry import categories as category_registry
 
 class AdvancedOfferSearchSerializer(serializers.Serializer):
     origin_airport = serializers.CharField(max_length=40, required=False)
@@ -14,38 +18,32 @@ class AdvancedOfferSearchSerializer(serializers.Serializer):
     arrival_after = serializers.DateTimeField(required=False)
     arrival_before = serializers.DateTimeField(required=False)
 
-    categories = serializers.ListField(
-        child=serializers.IntegerField(), required=False, allow_empty=True
+    categories = PrimaryKeyListField(
+        queryset=ItemCategory.objects.all(), cached_ids=category_registry.ids, required=False, allow_empty=True
     )
 
     weight = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
     space = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
 
-    def validate_categories(self, value):
-        for cat_id in value:
-            if not ItemCategory.objects.filter(pk=cat_id).exists():
-                raise serializers.ValidationError(f"Invalid category id {cat_id}")
-        return value
-
     def search_offers(self):
         data = self.validated_data
 
         offers = Offer.objects.filter(
-            status='available',
-            courier__passport_verification_status='verified'
+            search_index__status='available',
+            search_index__courier_verified=True
         )
 
         filter_map = {
-            'origin_airport': 'user_flight__flight__from_airport__airport_code',
-            'destination_airport': 'user_flight__flight__to_airport__airport_code',
-            'min_price': 'price__gte',
-            'max_price': 'price__lte',
-            'departure_after': 'user_flight__flight__departure_datetime__gte',
-            'departure_before': 'user_flight__flight__departure_datetime__lte',
-            'arrival_after': 'user_flight__flight__arrival_datetime__gte',
-            'arrival_before': 'user_flight__flight__arrival_datetime__lte',
-            'weight': 'available_weight__gte',
-            'space': 'available_space__gte',
+            'origin_airport': 'search_index__from_airport_code',
+            'destination_airport': 'search_index__to_airport_code',
+            'min_price': 'search_index__price__gte',
+            'max_price': 'search_index__price__lte',
+            'departure_after': 'search_index__departure_datetime__gte',
+            'departure_before': 'search_index__departure_datetime__lte',
+            'arrival_after': 'search_index__arrival_datetime__gte',
+            'arrival_before': 'search_index__arrival_datetime__lte',
+            'weight': 'search_index__available_weight__gte',
+            'space': 'search_index__available_space__gte',
         }
 
         filter_kwargs = {
@@ -57,6 +55,12 @@ class AdvancedOfferSearchSerializer(serializers.Serializer):
         offers = offers.filter(**filter_kwargs)
 
         if data.get('categories'):
-            offers = offers.filter(categories__in=data['categories']).distinct()
+            mask = category_mask(data['categories'])
+            if mask is None:
+                offers = offers.filter(categories__in=data['categories']).distinct()
+            else:
+                offers = offers.alias(
+                    category_hits=F('search_index__category_bitmap').bitand(mask)
+                ).exclude(category_hits=0)
 
-        return offers.order_by('price', 'user_flight__flight__departure_datetime')
\ No newline at end of file
+        return offers.order_by('search_index__price', 'search_index__departure_datetime')
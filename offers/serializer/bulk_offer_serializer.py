@@ -0,0 +1,61 @@
+from rest_framework import serializers
+
+from offers.creation import RECURRENCE_STEPS, FlightConflict, create_offers, recurring_trips
+from offers.serializer.offer_unified_serializer import UnifiedOfferCreationSerializer
+
+MAX_BULK_OFFERS = 100
+
+
+class RecurrenceSerializer(serializers.Serializer):
+    frequency = serializers.ChoiceField(choices=list(RECURRENCE_STEPS))
+    interval = serializers.IntegerField(required=False, default=1, min_value=1, max_value=12)
+    count = serializers.IntegerField(min_value=1, max_value=MAX_BULK_OFFERS)
+
+
+class BulkOfferCreationSerializer(serializers.Serializer):
+    """
+    Either a list of `trips`, or one `trip` repeated by a `recurrence` rule.
+    Every trip is validated like a single offer creation; nothing is created
+    unless all of them are valid.
+    """
+    trips = UnifiedOfferCreationSerializer(many=True, required=False, min_length=1, max_length=MAX_BULK_OFFERS)
+    trip = UnifiedOfferCreationSerializer(required=False)
+    recurrence = RecurrenceSerializer(required=False)
+
+    def validate(self, attrs):
+        if ('trips' in attrs) == ('trip' in attrs):
+            raise serializers.ValidationError("Provide either trips or trip with a recurrence.")
+        if ('trip' in attrs) != ('recurrence' in attrs):
+            raise serializers.ValidationError({'recurrence': "A recurrence is required with trip, and only with it."})
+        return attrs
+
+    @property
+    def errors(self):
+        # DRF reports the errors of list items either as a list with {} for valid
+        # items or, since 3.18 by default, as {index: errors}; answer with the list.
+        # Errors of the list itself (empty, too long, not a list) are left as they are.
+        errors = super().errors
+        trip_errors = errors.get('trips')
+        trips = self.initial_data.get('trips')
+        if (isinstance(trip_errors, dict) and isinstance(trips, list)
+                and all(str(index).isdigit() for index in trip_errors)):
+            trip_errors = {int(index): error for index, error in trip_errors.items()}
+            errors['trips'] = [trip_errors.get(index, {}) for index in range(len(trips))]
+        return errors
+
+    def expanded_trips(self):
+        data = self.validated_data
+        if 'trips' in data:
+            return data['trips']
+        return recurring_trips(data['trip'], **data['recurrence'])
+
+    def create(self, validated_data):
+        trips = self.expanded_trips()
+        try:
+            return create_offers(self.context['request'].user, trips)
+        except FlightConflict as e:
+            if 'trip' in validated_data:
+                raise serializers.ValidationError({'trip': {'flight_number': [str(e)]}})
+            raise serializers.ValidationError({'trips': [
+                {'flight_number': [str(e)]} if index in e.indexes else {} for index in range(len(trips))
+            ]})
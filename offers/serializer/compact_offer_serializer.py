@@ -0,0 +1,66 @@
+from rest_framework import serializers
+
+from locations.models import Country, City, Airport
+from offers.models import Flight, UserFlight, Offer
+
+
+class CompactFlightSerializer(serializers.ModelSerializer):
+    publisher_display = serializers.CharField(source='get_publisher_display', read_only=True)
+    from_airport = serializers.PrimaryKeyRelatedField(read_only=True)
+    to_airport = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    class Meta:
+        model = Flight
+        fields = [
+            'id', 'publisher', 'publisher_display',
+            'from_airport', 'to_airport',
+            'departure_datetime', 'arrival_datetime'
+        ]
+
+
+class CompactUserFlightSerializer(serializers.ModelSerializer):
+    flight = CompactFlightSerializer(read_only=True)
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    class Meta:
+        model = UserFlight
+        fields = ['id', 'flight', 'user', 'publish_datetime']
+
+
+class CompactOfferSerializer(serializers.ModelSerializer):
+    """
+    Same payload as OfferSerializer, but airports and users are referenced by
+    id and rendered once in the response's `included` section.
+    """
+    user_flight = CompactUserFlightSerializer(read_only=True)
+
+    class Meta:
+        model = Offer
+        fields = [
+            'id', 'user_flight', 'courier_id',
+            'status', 'price',
+            'available_weight', 'available_space'
+        ]
+
+
+class IncludedCountrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Country
+        fields = ['id', 'country_code', 'country_abbr', 'country_name']
+
+
+class IncludedCitySerializer(serializers.ModelSerializer):
+    country = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    class Meta:
+        model = City
+        fields = ['id', 'country', 'city_code', 'city_abbr', 'city_name', 'timezone']
+
+
+class IncludedAirportSerializer(serializers.ModelSerializer):
+    city = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    class Meta:
+        model = Airport
+        fields = ['id', 'city', 'airport_code', 'airport_name', 'airport_picture_url',
+                  'latitude', 'longitude', 'utc_offset', 'timezone']
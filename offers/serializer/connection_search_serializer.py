@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+from rest_framework import serializers
+
+from core.query_planner import optimize_queryset
+from locations.registry import locations
+from offers.models import Offer
+from offers.routing import graph
+from offers.serializer.offer_serializer import OfferSerializer
+
+
+class ConnectionSearchSerializer(serializers.Serializer):
+    origin_airport = serializers.CharField(max_length=40, required=True)
+    destination_airport = serializers.CharField(max_length=40, required=True)
+    takeoff_date = serializers.DateField(required=True)
+    weight = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    max_stops = serializers.ChoiceField(choices=[1, 2], required=False, default=2)
+    min_connection_minutes = serializers.IntegerField(required=False, min_value=0)
+
+    def validate_origin_airport(self, value):
+        if locations.airport_by_code(value) is None:
+            raise serializers.ValidationError("Invalid origin airport code.")
+        return value
+
+    def validate_destination_airport(self, value):
+        if locations.airport_by_code(value) is None:
+            raise serializers.ValidationError("Invalid destination airport code.")
+        return value
+
+    def validate(self, attrs):
+        if attrs['origin_airport'] == attrs['destination_airport']:
+            raise serializers.ValidationError("Origin and destination airports cannot be the same.")
+        return attrs
+
+    def search_itineraries(self):
+        data = self.validated_data
+        min_connection = data.get('min_connection_minutes')
+        return graph.itineraries(
+            data['origin_airport'],
+            data['destination_airport'],
+            data['takeoff_date'],
+            weight=data.get('weight'),
+            max_stops=data['max_stops'],
+            min_connection=timedelta(minutes=min_connection) if min_connection is not None else None,
+        )
+
+    def render(self, itineraries):
+        offer_ids = {leg.offer_id for legs in itineraries for leg in legs}
+        offers = optimize_queryset(Offer.objects.filter(pk__in=offer_ids), OfferSerializer)
+        rendered = {row['id']: row for row in OfferSerializer(offers, many=True).data}
+        return [
+            {
+                'stops': len(legs) - 1,
+                'departure_datetime': legs[0].departure,
+                'arrival_datetime': legs[-1].arrival,
+                'total_price': sum(leg.price for leg in legs),
+                'capacity': min((leg.available_weight for leg in legs if leg.available_weight is not None),
+                                default=None),
+                'offers': [rendered[leg.offer_id] for leg in legs if leg.offer_id in rendered],
+            }
+            for legs in itineraries
+        ]
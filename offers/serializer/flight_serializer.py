@@ -1,13 +1,13 @@
 from locations.models import Airport
-from locations.serializers import AirportSerializer
+from locations.serializers import AirportField
 from offers.models import Flight
 from rest_framework import serializers
 
 
 class FlightSerializer(serializers.ModelSerializer):
     publisher_display = serializers.CharField(source='get_publisher_display', read_only=True)
-    from_airport = AirportSerializer(read_only=True)
-    to_airport = AirportSerializer(read_only=True)
+    from_airport = AirportField()
+    to_airport = AirportField()
     from_airport_id = serializers.PrimaryKeyRelatedField(
         queryset=Airport.objects.all(), source='from_airport', write_only=True
     )
@@ -0,0 +1,49 @@
+from calendar import monthrange
+from datetime import date, datetime
+
+from rest_framework import serializers
+
+from locations.registry import locations
+from offers.models import RoutePriceCalendar
+
+
+class RoutePriceCalendarSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RoutePriceCalendar
+        fields = ['departure_date', 'min_price', 'offer_count', 'total_available_weight']
+
+
+class RoutePriceCalendarQuerySerializer(serializers.Serializer):
+    origin_airport = serializers.CharField(max_length=40, required=True)
+    destination_airport = serializers.CharField(max_length=40, required=True)
+    month = serializers.CharField(required=True, help_text="YYYY-MM")
+
+    def validate_origin_airport(self, value):
+        airport = locations.airport_by_code(value)
+        if airport is None:
+            raise serializers.ValidationError("Invalid origin airport code.")
+        return airport
+
+    def validate_destination_airport(self, value):
+        airport = locations.airport_by_code(value)
+        if airport is None:
+            raise serializers.ValidationError("Invalid destination airport code.")
+        return airport
+
+    def validate_month(self, value):
+        try:
+            first = datetime.strptime(value, '%Y-%m').date()
+        except ValueError:
+            raise serializers.ValidationError("Month must be in YYYY-MM format.")
+        return first
+
+    def cells(self):
+        """The month's cells of the route, in date order, read with one indexed query."""
+        data = self.validated_data
+        first = data['month']
+        last = date(first.year, first.month, monthrange(first.year, first.month)[1])
+        return RoutePriceCalendar.objects.filter(
+            from_airport_id=data['origin_airport'].pk,
+            to_airport_id=data['destination_airport'].pk,
+            departure_date__range=(first, last),
+        ).order_by('departure_date')
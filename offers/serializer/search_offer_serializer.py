@@ -1,11 +1,34 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Max, Min
+from django.db.models.functions import TruncDate
+from django.utils import timezone
 from rest_framework import serializers
 from offers.models import Offer
-from locations.models import Airport
+from locations.registry import locations
+
+class DaySummarySerializer(serializers.Serializer):
+    date = serializers.DateField()
+    offer_count = serializers.IntegerField()
+    min_price = serializers.DecimalField(max_digits=10, decimal_places=2, allow_null=True)
+    max_available_weight = serializers.DecimalField(max_digits=10, decimal_places=2, allow_null=True)
+
 
 class OfferSearchSerializer(serializers.Serializer):
-    origin_airport = serializers.CharField(max_length=40, required=True)
-    destination_airport = serializers.CharField(max_length=40, required=True)
+    """
+    Each end of the route is given as exactly one of an airport code, a city id
+    or a country id; cities and countries cover all of their airports.
+    """
+    origin_airport = serializers.CharField(max_length=40, required=False)
+    origin_city_id = serializers.IntegerField(required=False)
+    origin_country_id = serializers.IntegerField(required=False)
+    destination_airport = serializers.CharField(max_length=40, required=False)
+    destination_city_id = serializers.IntegerField(required=False)
+    destination_country_id = serializers.IntegerField(required=False)
     takeoff_date = serializers.DateField(required=True)
+    flex_days = serializers.IntegerField(required=False, default=0, min_value=0, max_value=7)
+
+    ENDPOINTS = (('origin', 'from'), ('destination', 'to'))
 
 
     class Meta:
@@ -17,15 +40,44 @@ class OfferSearchSerializer(serializers.Serializer):
         ]
 
     def validate_origin_airport(self, value):
-        if not Airport.objects.filter(airport_code=value).exists():
+        if locations.airport_by_code(value) is None:
             raise serializers.ValidationError("Invalid origin airport code.")
         return value
 
     def validate_destination_airport(self, value):
-        if not Airport.objects.filter(airport_code=value).exists():
+        if locations.airport_by_code(value) is None:
             raise serializers.ValidationError("Invalid destination airport code.")
         return value
 
+    def validate_origin_city_id(self, value):
+        if locations.city(value) is None:
+            raise serializers.ValidationError("Invalid origin city id.")
+        return value
+
+    def validate_destination_city_id(self, value):
+        if locations.city(value) is None:
+            raise serializers.ValidationError("Invalid destination city id.")
+        return value
+
+    def validate_origin_country_id(self, value):
+        if locations.country(value) is None:
+            raise serializers.ValidationError("Invalid origin country id.")
+        return value
+
+    def validate_destination_country_id(self, value):
+        if locations.country(value) is None:
+            raise serializers.ValidationError("Invalid destination country id.")
+        return value
+
+    def validate(self, attrs):
+        for side, _ in self.ENDPOINTS:
+            names = [f'{side}_airport', f'{side}_city_id', f'{side}_country_id']
+            if sum(attrs.get(name) is not None for name in names) != 1:
+                raise serializers.ValidationError({
+                    names[0]: f"Provide exactly one of {', '.join(names)}."
+                })
+        return attrs
+
     def validate_origin_destination_mismatch(self):
         origin_airport = self.validated_data.get('origin_airport')
         destination_airport = self.validated_data.get('destination_airport')
@@ -33,18 +85,56 @@ class OfferSearchSerializer(serializers.Serializer):
             raise serializers.ValidationError("Origin and destination airports cannot be the same.")
         return destination_airport
 
+    def dates(self):
+        """The takeoff date and the `flex_days` on either side of it, in order."""
+        takeoff_date = self.validated_data['takeoff_date']
+        flex_days = self.validated_data.get('flex_days', 0)
+        return [takeoff_date + timedelta(days=offset) for offset in range(-flex_days, flex_days + 1)]
+
     def search_offers(self):
-        validated_data = self.validated_data
-        origin_airport = validated_data['origin_airport']
-        destination_airport = validated_data['destination_airport']
-        takeoff_date = validated_data['takeoff_date']
+        dates = self.dates()
+
+        # A range on the indexed column instead of a __date cast, so the composite index is usable.
+        day_start = timezone.make_aware(datetime.combine(dates[0], time.min))
+        day_end = timezone.make_aware(datetime.combine(dates[-1] + timedelta(days=1), time.min))
 
         offers = Offer.objects.filter(
-            user_flight__flight__from_airport__airport_code=origin_airport,
-            user_flight__flight__to_airport__airport_code=destination_airport,
-            user_flight__flight__departure_datetime__date=takeoff_date
+            search_index__departure_datetime__gte=day_start,
+            search_index__departure_datetime__lt=day_end,
+            search_index__status='available',
+            **self.endpoint_filters()
+        )
+        return offers.order_by('search_index__price', 'search_index__departure_datetime', 'id')
+
+    def day_summary(self):
+        """Offer count, lowest price and largest available weight per day of the window, in one query."""
+        rows = self.search_offers().order_by().annotate(
+            day=TruncDate('search_index__departure_datetime', tzinfo=timezone.get_current_timezone())
+        ).values('day').annotate(
+            offer_count=Count('id'),
+            min_price=Min('search_index__price'),
+            max_available_weight=Max('search_index__available_weight'),
         )
-        return offers
+        by_day = {row['day']: row for row in rows}
+        empty = {'offer_count': 0, 'min_price': None, 'max_available_weight': None}
+        return DaySummarySerializer(
+            [{**by_day.get(day, empty), 'date': day} for day in self.dates()], many=True
+        ).data
+
+    def endpoint_filters(self):
+        """Index lookups for both ends; cities and countries expand to their airport ids."""
+        data = self.validated_data
+        filters = {}
+        for side, prefix in self.ENDPOINTS:
+            if data.get(f'{side}_airport') is not None:
+                filters[f'search_index__{prefix}_airport_code'] = data[f'{side}_airport']
+                continue
+            city_id, country_id = data.get(f'{side}_city_id'), data.get(f'{side}_country_id')
+            filters[f'search_index__{prefix}_airport_id__in'] = sorted(locations.airport_ids(
+                city_ids=[city_id] if city_id is not None else [],
+                country_ids=[country_id] if country_id is not None else [],
+            ))
+        return filters
 
 class OfferGetAllSerializer(serializers.Serializer):
     class Meta:
@@ -0,0 +1,90 @@
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from offers import price_calendar, routing, search_cache, search_index
+from offers.models import Flight, UserFlight, Offer, OfferCategory, OfferSearchIndex
+from users.models import Users
+
+
+def invalidate_after_commit(routes, offer_ids=()):
+    """Once the transaction commits, drops cached searches on `routes` and re-reads `offer_ids` into the route graph."""
+    if routes:
+        transaction.on_commit(lambda: search_cache.invalidate_routes(routes))
+    offer_ids = list(offer_ids)
+    if offer_ids:
+        transaction.on_commit(lambda: routing.graph.refresh(offer_ids))
+
+
+@receiver(post_save, sender=Offer)
+def offer_saved(sender, instance, created, **kwargs):
+    routes = search_index.sync_offers([instance.pk])
+    if created or instance.search_fields_changed():
+        invalidate_after_commit(routes, [instance.pk])
+    instance._loaded_search_values = {name: getattr(instance, name) for name in Offer.SEARCH_FIELDS}
+
+
+@receiver(pre_delete, sender=Offer)
+def offer_deleting(sender, instance, **kwargs):
+    rows = OfferSearchIndex.objects.filter(offer=instance)
+    instance._calendar_cells = set(rows.values_list(*price_calendar.CELL_FIELDS))
+    invalidate_after_commit(set(rows.values_list('from_airport_code', 'to_airport_code')), [instance.pk])
+
+
+@receiver(post_delete, sender=Offer)
+def offer_deleted(sender, instance, **kwargs):
+    price_calendar.refresh_cells(getattr(instance, '_calendar_cells', ()))
+
+
+@receiver(post_save, sender=Flight)
+def flight_saved(sender, instance, created, **kwargs):
+    if created:
+        return
+    offer_ids = list(Offer.objects.filter(user_flight__flight=instance).values_list('pk', flat=True))
+    invalidate_after_commit(search_index.sync_offers(offer_ids), offer_ids)
+
+
+@receiver(post_save, sender=UserFlight)
+def user_flight_saved(sender, instance, created, **kwargs):
+    if created:
+        return
+    offer_ids = list(instance.offers.values_list('pk', flat=True))
+    invalidate_after_commit(search_index.sync_offers(offer_ids), offer_ids)
+
+
+@receiver(post_save, sender=Users)
+def courier_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is not None and 'passport_verification_status' not in update_fields:
+        return
+    verified = instance.passport_verification_status == 'verified'
+    stale = OfferSearchIndex.objects.filter(offer__courier=instance).exclude(courier_verified=verified)
+    rows = list(stale.values_list('offer_id', 'from_airport_code', 'to_airport_code'))
+    if rows:
+        stale.update(courier_verified=verified)
+        invalidate_after_commit({(origin, destination) for _, origin, destination in rows},
+                                 [offer_id for offer_id, _, _ in rows])
+
+
+@receiver(m2m_changed, sender=Offer.categories.through)
+def offer_categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # The affected offers are unknown once a category has been cleared.
+        instance._cleared_offer_ids = list(instance.offers.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        routes = search_index.sync_offers([instance.pk])
+    elif action == 'post_clear':
+        routes = search_index.sync_offers(getattr(instance, '_cleared_offer_ids', []))
+    else:
+        routes = search_index.sync_offers(pk_set)
+    invalidate_after_commit(routes)
+
+
+@receiver(post_save, sender=OfferCategory)
+@receiver(post_delete, sender=OfferCategory)
+def offer_category_row_changed(sender, instance, **kwargs):
+    invalidate_after_commit(search_index.sync_offers([instance.offer_id]))
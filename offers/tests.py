@@ -1,14 +1,37 @@
 # offers/tests.py
 
+import base64
+import json
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import caches
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APITestCase
-from .models import Flight, UserFlight, Offer
+from rest_framework.test import APIRequestFactory, APITestCase
+from .models import Flight, UserFlight, Offer, OfferSearchIndex, RoutePriceCalendar
+from . import routing, search_cache
+from .creation import FlightConflict, create_offers, recurring_trips
+from .lifecycle import expire_offers
+from .views.flight_views import FlightSearchAPIView
+from .views.search_offer_view import OfferGetAllView
 from users.models import Users
+from flight_requests.models.request import Request
 from locations.models import Country, City, Airport
+from locations.registry import locations
+from items.registry import categories as category_registry
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+from core import versioning
     #     self.assertEqual(flight['publisher'], 'airline')
     #     self.assertEqual(flight['from_airport']['airport_code'], 'EVN')
     #     self.assertEqual(flight['to_airport']['airport_code'], 'LDN')
@@ -91,7 +114,7 @@ from datetime import timedelta
 #         url = reverse('flight-search')
 #         params = {
 #             'origin': 'Yerevan',
-from items.models.items import ItemCategory
+from items.models.items import Item, ItemCategory
 
 # class OffersAPITestCase(APITestCase):
 #     def setUp(self):
@@ -352,4 +375,928 @@ class MultiCategoryOfferCreationTest(APITestCase):
         offer_id = response.data["offer_id"]
         offer = Offer.objects.get(pk=offer_id)
         cat_names = set(offer.categories.values_list('name', flat=True))
-        self.assertIn("Fragile", cat_names)  # auto-added
\ No newline at end of file
+        self.assertIn("Fragile", cat_names)  # auto-added
+
+class OfferSearchFixtureMixin:
+    def setUp(self):
+        caches['offer_search'].clear()
+        self.courier = Users.objects.create_user(
+            email='indexed-courier@example.com',
+            password='password123',
+            passport_verification_status='verified'
+        )
+        country = Country.objects.create(country_code='AM', country_abbr='ARM', country_name='Armenia')
+        city = City.objects.create(country=country, city_code='EVN', city_abbr='EV', city_name='Yerevan',
+                                   timezone='Asia/Yerevan')
+        self.evn = Airport.objects.create(city=city, airport_code='EVN', airport_name='Zvartnots')
+        self.lhr = Airport.objects.create(city=city, airport_code='LHR', airport_name='Heathrow')
+        self.category = ItemCategory.objects.create(name="Documents", description="Paper")
+
+        self.departure = timezone.now() + timedelta(days=3)
+        self.flight = Flight.objects.create(
+            creator=self.courier,
+            from_airport=self.evn,
+            to_airport=self.lhr,
+            departure_datetime=self.departure,
+            arrival_datetime=self.departure + timedelta(hours=5)
+        )
+        user_flight = UserFlight.objects.create(flight=self.flight, user=self.courier)
+        self.offer = Offer.objects.create(
+            user_flight=user_flight,
+            courier=self.courier,
+            price='60.00',
+            available_weight='10.00',
+            available_space='1.00'
+        )
+
+
+class OfferSearchIndexTest(OfferSearchFixtureMixin, APITestCase):
+    def test_index_row_follows_offer_and_flight_writes(self):
+        row = self.offer.search_index
+        self.assertEqual(row.from_airport_code, 'EVN')
+        self.assertEqual(row.to_airport_code, 'LHR')
+        self.assertTrue(row.courier_verified)
+
+        self.offer.price = '75.00'
+        self.offer.save()
+        self.offer.categories.add(self.category)
+        self.flight.departure_datetime = self.departure + timedelta(days=1)
+        self.flight.save()
+
+        row.refresh_from_db()
+        self.assertEqual(str(row.price), '75.00')
+        self.assertEqual(row.category_bitmap, 1 << self.category.id)
+        self.assertEqual(row.departure_datetime, self.departure + timedelta(days=1))
+
+    def test_courier_verification_is_denormalized(self):
+        self.courier.set_passport_verification_status('rejected')
+        self.assertFalse(OfferSearchIndex.objects.get(offer=self.offer).courier_verified)
+
+    def test_searches_use_index(self):
+        self.offer.categories.add(self.category)
+
+        response = self.client.get(reverse('search_offer'), {
+            'origin_airport': 'EVN',
+            'destination_airport': 'LHR',
+            'takeoff_date': timezone.localdate(self.departure).isoformat(),
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([offer['id'] for offer in response.data], [self.offer.id])
+
+        response = self.client.get(reverse('offer-advanced-search'), {
+            'origin_airport': 'EVN',
+            'categories': [self.category.id],
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([offer['id'] for offer in response.data], [self.offer.id])
+
+    def test_rebuild_command(self):
+        OfferSearchIndex.objects.all().delete()
+        call_command('rebuild_offer_search_index', stdout=StringIO())
+        self.assertTrue(OfferSearchIndex.objects.filter(offer=self.offer).exists())
+
+
+class OfferSearchCacheTest(OfferSearchFixtureMixin, APITestCase):
+    def search(self):
+        return self.client.get(reverse('search_offer'), {
+            'origin_airport': 'EVN',
+            'destination_airport': 'LHR',
+            'takeoff_date': timezone.localdate(self.departure).isoformat(),
+        })
+
+    def test_repeated_search_is_served_from_cache(self):
+        self.search()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.search()
+        self.assertFalse([query for query in queries if 'offers_' in query['sql']])
+        self.assertEqual([offer['id'] for offer in response.data], [self.offer.id])
+        self.assertEqual(search_cache.stats()['hits'], 1)
+        self.assertEqual(search_cache.stats()['misses'], 1)
+
+    def test_price_change_invalidates_route(self):
+        self.search()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.offer.price = '80.00'
+            self.offer.save()
+        response = self.search()
+        self.assertEqual(response.data[0]['price'], '80.00')
+
+    def test_unrelated_save_keeps_cache(self):
+        self.search()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.offer.notes = 'Window seat'
+            self.offer.save()
+        self.search()
+        self.assertEqual(search_cache.stats()['hits'], 1)
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return ['result']
+
+        query = {'origin_airport': 'EVN', 'destination_airport': 'LHR'}
+        threads = [
+            threading.Thread(target=search_cache.get_or_compute, args=('test', query, compute))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+
+
+@override_settings(REFERENCE_DATA_CHECK_INTERVAL=3600)
+class OfferListQueryCountTest(OfferSearchFixtureMixin, APITestCase):
+    def add_offers(self, count):
+        for _ in range(count):
+            user_flight = UserFlight.objects.create(flight=self.flight, user=self.courier)
+            Offer.objects.create(user_flight=user_flight, courier=self.courier, price='60.00',
+                                 available_weight='10.00', available_space='1.00')
+
+    def count_queries(self, url):
+        locations.get()  # Loaded once per process, not per request.
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_get_all_offers_query_count_is_constant(self):
+        url = reverse('get-all-offers')
+        single = self.count_queries(url)
+        self.add_offers(4)
+        self.assertEqual(self.count_queries(url), single)
+
+    def test_my_offers_query_count_is_constant(self):
+        token = RefreshToken.for_user(self.courier)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(token.access_token))
+        url = reverse('my-offers')
+        single = self.count_queries(url)
+        self.add_offers(4)
+        self.assertEqual(self.count_queries(url), single)
+
+
+class OfferKeysetPaginationTest(OfferSearchFixtureMixin, APITestCase):
+    def add_offer(self, price):
+        user_flight = UserFlight.objects.create(flight=self.flight, user=self.courier)
+        return Offer.objects.create(user_flight=user_flight, courier=self.courier, price=price,
+                                    available_weight='10.00', available_space='1.00')
+
+    def collect_pages(self, url, params):
+        ids = []
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+            while True:
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                ids.extend(offer['id'] for offer in response.data['results'])
+                if not response.data['next']:
+                    break
+                response = self.client.get(response.data['next'])
+        self.assertFalse([query for query in queries if 'COUNT(' in query['sql'].upper()])
+        return ids
+
+    def test_pages_follow_price_departure_id_order(self):
+        offers = [self.add_offer(price) for price in ('90.00', '50.00', '70.00', '50.00')]
+        expected = [offers[1].id, offers[3].id, self.offer.id, offers[2].id, offers[0].id]
+
+        ids = self.collect_pages(reverse('get-all-offers'), {'pagination': 'cursor', 'page_size': 2})
+        self.assertEqual(ids, expected)
+
+    def test_cursor_is_stable_under_inserts(self):
+        for price in ('70.00', '80.00', '90.00'):
+            self.add_offer(price)
+        url = reverse('get-all-offers')
+        first = self.client.get(url, {'pagination': 'cursor', 'page_size': 2})
+        self.add_offer('10.00')
+        second = self.client.get(first.data['next'])
+        self.assertEqual([offer['price'] for offer in second.data['results']], ['80.00', '90.00'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('get-all-offers'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_with_values_of_the_wrong_type(self):
+        for values in (['abc', 'x', 1], [{}, 1, 1]):
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+            response = self.client.get(reverse('get-all-offers'), {'cursor': cursor})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unpaginated_response_is_unchanged(self):
+        response = self.client.get(reverse('get-all-offers'))
+        self.assertEqual([offer['id'] for offer in response.data], [self.offer.id])
+
+
+class OfferStreamingTest(OfferSearchFixtureMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        for _ in range(4):
+            user_flight = UserFlight.objects.create(flight=self.flight, user=self.courier)
+            Offer.objects.create(user_flight=user_flight, courier=self.courier, price='60.00',
+                                 available_weight='10.00', available_space='1.00')
+
+    def streamed(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_stream_matches_buffered_list(self):
+        url = reverse('get-all-offers')
+        buffered = self.client.get(url).json()
+        body = self.streamed(self.client.get(url, {'stream': 'true'}))
+        self.assertEqual(sorted(json.loads(body), key=lambda o: o['id']),
+                         sorted(buffered, key=lambda o: o['id']))
+
+    def test_ndjson_by_accept_header_and_format(self):
+        url = reverse('get-all-offers')
+        for response in (self.client.get(url, HTTP_ACCEPT='application/x-ndjson'),
+                         self.client.get(url, {'format': 'ndjson'})):
+            self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+            lines = self.streamed(response).splitlines()
+            self.assertEqual(len(lines), Offer.objects.count())
+            self.assertEqual({json.loads(line)['id'] for line in lines},
+                             set(Offer.objects.values_list('id', flat=True)))
+
+    def test_stream_reads_in_chunks(self):
+        with mock.patch.object(OfferGetAllView, 'stream_chunk_size', 2):
+            body = self.streamed(self.client.get(reverse('get-all-offers'), {'stream': 'true'}))
+        self.assertEqual(len(json.loads(body)), 5)
+
+
+class OfferCompactFormatTest(OfferSearchFixtureMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        for _ in range(3):
+            user_flight = UserFlight.objects.create(flight=self.flight, user=self.courier)
+            Offer.objects.create(user_flight=user_flight, courier=self.courier, price='60.00',
+                                 available_weight='10.00', available_space='1.00')
+
+    def expand(self, offer, included):
+        """Re-inflates a compact offer into the default nested shape."""
+        def airport(airport_id):
+            data = dict(included['airports'][str(airport_id)])
+            city = dict(included['cities'][str(data.pop('city'))])
+            city['country'] = included['countries'][str(city['country'])]
+            return {'id': data['id'], 'city': city, **data}
+
+        flight = dict(offer['user_flight']['flight'])
+        flight['from_airport'] = airport(flight['from_airport'])
+        flight['to_airport'] = airport(flight['to_airport'])
+        user_flight = dict(offer['user_flight'], flight=flight,
+                           user=included['users'][str(offer['user_flight']['user'])])
+        return dict(offer, user_flight=user_flight)
+
+    def test_compact_payload_expands_to_default_payload(self):
+        url = reverse('get-all-offers')
+        default = json.loads(self.client.get(url).content)
+        response = self.client.get(url, {'format': 'compact'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        compact = json.loads(response.content)
+
+        self.assertEqual(len(compact['included']['airports']), 2)
+        self.assertEqual(len(compact['included']['users']), 1)
+        self.assertEqual([self.expand(offer, compact['included']) for offer in compact['results']], default)
+        self.assertLess(len(response.content), len(json.dumps(default)))
+
+    def test_accept_header_selects_compact_format(self):
+        response = self.client.get(reverse('get-all-offers'), HTTP_ACCEPT='application/vnd.ugogo.compact+json')
+        self.assertEqual(response['Content-Type'], 'application/vnd.ugogo.compact+json')
+        self.assertIn('included', response.json())
+
+    def test_search_caches_formats_separately(self):
+        params = {'origin_airport': 'EVN', 'destination_airport': 'LHR',
+                  'takeoff_date': timezone.localdate(self.departure).isoformat()}
+        default = self.client.get(reverse('search_offer'), params)
+        compact = self.client.get(reverse('search_offer'), {**params, 'format': 'compact'})
+        self.assertEqual(len(default.data), 4)
+        self.assertEqual(len(compact.data['results']), 4)
+        self.assertIn('included', compact.data)
+
+    def test_compact_keyset_page(self):
+        response = self.client.get(reverse('get-all-offers'),
+                                   {'format': 'compact', 'pagination': 'cursor', 'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+        self.assertIn('included', response.data)
+
+
+class OfferMatchingTest(OfferSearchFixtureMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.sender = Users.objects.create_user(email='matching-sender@example.com', password='password123')
+        self.fragile = ItemCategory.objects.create(name="Fragile", description="Handle with care")
+        self.item = Item.objects.create(user=self.sender, name='Vase', weight='4.00', dimensions='30x10x20')
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.sender).access_token)
+        )
+
+    def add_offer(self, dimensions='0x0x0', weight='10.00', allow_fragile=False, categories=()):
+        user_flight = UserFlight.objects.create(flight=self.flight, user=self.courier)
+        offer = Offer.objects.create(user_flight=user_flight, courier=self.courier, price='60.00',
+                                     available_weight=weight, available_space='1.00',
+                                     available_dimensions=dimensions, allow_fragile=allow_fragile)
+        offer.categories.set(categories)
+        return offer
+
+    def matches(self):
+        response = self.client.get(reverse('item-matching-offers', kwargs={'item_id': self.item.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {offer['id'] for offer in response.data}
+
+    def test_dimensions_are_parsed_sorted(self):
+        self.assertEqual((self.item.dim_large, self.item.dim_medium, self.item.dim_small, self.item.volume),
+                         (30.0, 20.0, 10.0, 6000.0))
+        self.assertIsNone(self.offer.dim_large)
+
+    def test_fits_in_any_orientation(self):
+        rotated = self.add_offer('10x35x25')
+        too_thin = self.add_offer('40x40x5')
+        too_heavy = self.add_offer('50x50x50', weight='3.00')
+        ids = self.matches()
+        self.assertIn(rotated.id, ids)
+        self.assertIn(self.offer.id, ids)  # no dimensions given: not limited by size
+        self.assertNotIn(too_thin.id, ids)
+        self.assertNotIn(too_heavy.id, ids)
+
+    def test_categories_and_fragile(self):
+        self.item.categories.set([self.category])
+        documents_only = self.add_offer(categories=[self.category])
+        other_only = self.add_offer(categories=[self.fragile])
+        self.assertEqual(self.matches(), {self.offer.id, documents_only.id})
+
+        self.item.categories.add(self.fragile)
+        fragile_ok = self.add_offer(allow_fragile=True, categories=[self.category, self.fragile])
+        self.assertEqual(self.matches(), {fragile_ok.id})
+        self.assertNotIn(other_only.id, self.matches())
+
+    def test_other_users_items_are_not_found(self):
+        self.item.user = self.courier
+        self.item.save()
+        response = self.client.get(reverse('item-matching-offers', kwargs={'item_id': self.item.pk}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(REFERENCE_DATA_CHECK_INTERVAL=3600, ROUTE_MIN_CONNECTION_MINUTES=60)
+class OfferConnectionSearchTest(OfferSearchFixtureMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        routing.graph.clear()
+        self.day = timezone.localdate() + timedelta(days=10)
+        self.cdg = Airport.objects.create(city=self.evn.city, airport_code='CDG', airport_name='Charles de Gaulle')
+        self.fra = Airport.objects.create(city=self.evn.city, airport_code='FRA', airport_name='Frankfurt')
+
+    def at(self, hour, minute=0, days=0):
+        return timezone.make_aware(datetime.combine(self.day + timedelta(days=days), dt_time(hour, minute)))
+
+    def leg(self, origin, destination, departure, arrival, weight='10.00'):
+        flight = Flight.objects.create(creator=self.courier, from_airport=origin, to_airport=destination,
+                                       departure_datetime=departure, arrival_datetime=arrival)
+        user_flight = UserFlight.objects.create(flight=flight, user=self.courier)
+        return Offer.objects.create(user_flight=user_flight, courier=self.courier, price='40.00',
+                                    available_weight=weight, available_space='1.00')
+
+    def search(self, **params):
+        response = self.client.get(reverse('offer-connection-search'), {
+            'origin_airport': 'EVN', 'destination_airport': 'LHR', 'takeoff_date': self.day.isoformat(), **params,
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [[offer['id'] for offer in itinerary['offers']] for itinerary in response.data]
+
+    def test_one_stop_respects_minimum_connection(self):
+        first = self.leg(self.evn, self.cdg, self.at(8), self.at(10))
+        too_tight = self.leg(self.cdg, self.lhr, self.at(10, 30), self.at(12))
+        connecting = self.leg(self.cdg, self.lhr, self.at(11, 30), self.at(13))
+        self.assertEqual(self.search(), [[first.id, connecting.id]])
+        self.assertEqual(self.search(min_connection_minutes=15), [[first.id, too_tight.id], [first.id, connecting.id]])
+
+    def test_every_leg_must_carry_the_weight(self):
+        first = self.leg(self.evn, self.cdg, self.at(8), self.at(10), weight='20.00')
+        self.leg(self.cdg, self.lhr, self.at(12), self.at(14), weight='5.00')
+        roomy = self.leg(self.cdg, self.lhr, self.at(15), self.at(17), weight='20.00')
+        self.assertEqual(self.search(weight='8.00'), [[first.id, roomy.id]])
+
+    def test_two_stops_across_midnight(self):
+        first = self.leg(self.evn, self.cdg, self.at(20), self.at(22))
+        second = self.leg(self.cdg, self.fra, self.at(7, days=1), self.at(8, days=1))
+        third = self.leg(self.fra, self.lhr, self.at(10, days=1), self.at(11, days=1))
+        self.assertEqual(self.search(), [[first.id, second.id, third.id]])
+        self.assertEqual(self.search(max_stops=1), [])
+
+    def test_graph_is_updated_incrementally(self):
+        first = self.leg(self.evn, self.cdg, self.at(8), self.at(10))
+        self.assertEqual(self.search(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            connecting = self.leg(self.cdg, self.lhr, self.at(12), self.at(14))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.search(), [[first.id, connecting.id]])
+        self.assertFalse([query for query in queries if 'offers_offersearchindex' in query['sql']])
+        self.assertEqual(versioning.current(routing.version_key(self.day)), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            connecting.status = 'taken'
+            connecting.save()
+        self.assertEqual(self.search(), [])
+
+    def test_reloads_days_changed_by_another_process(self):
+        first = self.leg(self.evn, self.cdg, self.at(8), self.at(10))
+        connecting = self.leg(self.cdg, self.lhr, self.at(12), self.at(14))
+        self.assertEqual(self.search(), [[first.id, connecting.id]])
+
+        OfferSearchIndex.objects.filter(offer=connecting).update(status='taken')
+        versioning.bump(routing.version_key(self.day))
+        self.assertEqual(self.search(), [[first.id, connecting.id]])
+        with override_settings(REFERENCE_DATA_CHECK_INTERVAL=0):
+            self.assertEqual(self.search(), [])
+
+
+class OfferLocationSearchTest(OfferSearchFixtureMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        country = Country.objects.create(country_code='GB', country_abbr='GBR', country_name='United Kingdom')
+        self.london = City.objects.create(country=country, city_code='LON', city_abbr='LO', city_name='London',
+                                          timezone='Europe/London')
+        self.lgw = Airport.objects.create(city=self.london, airport_code='LGW', airport_name='Gatwick')
+        self.stn = Airport.objects.create(city=self.london, airport_code='STN', airport_name='Stansted')
+        self.gatwick_offer = self.add_offer(self.evn, self.lgw, '80.00')
+        self.stansted_offer = self.add_offer(self.evn, self.stn, '30.00')
+
+    def add_offer(self, origin, destination, price):
+        flight = Flight.objects.create(creator=self.courier, from_airport=origin, to_airport=destination,
+                                       departure_datetime=self.departure,
+                                       arrival_datetime=self.departure + timedelta(hours=5))
+        user_flight = UserFlight.objects.create(flight=flight, user=self.courier)
+        return Offer.objects.create(user_flight=user_flight, courier=self.courier, price=price,
+                                    available_weight='10.00', available_space='1.00')
+
+    def search(self, **params):
+        return self.client.get(reverse('search_offer'), {
+            'origin_airport': 'EVN', 'takeoff_date': timezone.localdate(self.departure).isoformat(), **params,
+        })
+
+    def test_city_covers_all_member_airports_in_price_order(self):
+        response = self.search(destination_city_id=self.london.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([offer['id'] for offer in response.data], [self.stansted_offer.id, self.gatwick_offer.id])
+
+    def test_country_covers_all_member_airports(self):
+        response = self.search(destination_country_id=self.london.country_id)
+        self.assertEqual({offer['id'] for offer in response.data}, {self.stansted_offer.id, self.gatwick_offer.id})
+
+    def test_exactly_one_destination_is_required(self):
+        self.assertEqual(self.search().status_code, status.HTTP_400_BAD_REQUEST)
+        both = self.search(destination_airport='LGW', destination_city_id=self.london.pk)
+        self.assertEqual(both.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.search(destination_city_id=9999).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_flight_search_matches_city_names_through_airport_ids(self):
+        request = APIRequestFactory().get('/flights/search/', {'destination': 'lond'})
+        with CaptureQueriesContext(connection) as queries:
+            response = FlightSearchAPIView.as_view()(request)
+        self.assertEqual({offer['id'] for offer in response.data['results']},
+                         {self.stansted_offer.id, self.gatwick_offer.id})
+        self.assertFalse([query for query in queries if 'LIKE' in query['sql'].upper()])
+
+
+class OfferFlexibleDateSearchTest(OfferSearchFixtureMixin, APITestCase):
+    def add_offer(self, days, price, weight):
+        departure = self.departure + timedelta(days=days)
+        flight = Flight.objects.create(creator=self.courier, from_airport=self.evn, to_airport=self.lhr,
+                                       departure_datetime=departure, arrival_datetime=departure + timedelta(hours=5))
+        user_flight = UserFlight.objects.create(flight=flight, user=self.courier)
+        return Offer.objects.create(user_flight=user_flight, courier=self.courier, price=price,
+                                    available_weight=weight, available_space='1.00')
+
+    def search(self, flex_days):
+        return self.client.get(reverse('search_offer'), {
+            'origin_airport': 'EVN', 'destination_airport': 'LHR',
+            'takeoff_date': timezone.localdate(self.departure).isoformat(), 'flex_days': flex_days,
+        })
+
+    def test_window_results_and_day_summary(self):
+        earlier = self.add_offer(-1, '40.00', '3.00')
+        cheaper = self.add_offer(0, '20.00', '25.00')
+        self.add_offer(3, '10.00', '5.00')  # outside the window
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.search(2)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([offer['id'] for offer in response.data['results']], [cheaper.id, earlier.id, self.offer.id])
+
+        days = response.data['days']
+        self.assertEqual(len(days), 5)
+        self.assertEqual([day['offer_count'] for day in days], [0, 1, 2, 0, 0])
+        self.assertEqual(days[2]['min_price'], '20.00')
+        self.assertEqual(days[2]['max_available_weight'], '25.00')
+        self.assertIsNone(days[0]['min_price'])
+        self.assertEqual(len([query for query in queries if 'GROUP BY' in query['sql'].upper()]), 1)
+
+    def test_repeat_window_is_cached(self):
+        self.search(1)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.search(1).status_code, status.HTTP_200_OK)
+        self.assertFalse([query for query in queries if 'offers_' in query['sql']])
+
+    def test_exact_date_response_is_unchanged(self):
+        response = self.search(0)
+        self.assertEqual([offer['id'] for offer in response.data], [self.offer.id])
+
+
+class OfferPriceCalendarTest(OfferSearchFixtureMixin, APITestCase):
+    def local_date(self, moment):
+        return moment.astimezone(ZoneInfo('Asia/Yerevan')).date()
+
+    def cell(self, day=None):
+        return RoutePriceCalendar.objects.get(from_airport=self.evn, to_airport=self.lhr,
+                                              departure_date=day or self.local_date(self.departure))
+
+    def add_offer(self, price, weight, departure=None):
+        departure = departure or self.departure
+        flight = Flight.objects.create(creator=self.courier, from_airport=self.evn, to_airport=self.lhr,
+                                       departure_datetime=departure, arrival_datetime=departure + timedelta(hours=5))
+        user_flight = UserFlight.objects.create(flight=flight, user=self.courier)
+        return Offer.objects.create(user_flight=user_flight, courier=self.courier, price=price,
+                                    available_weight=weight, available_space='1.00')
+
+    def test_cells_follow_offer_writes(self):
+        cheaper = self.add_offer('30.00', '5.00')
+        cell = self.cell()
+        self.assertEqual((cell.min_price, cell.offer_count, cell.total_available_weight),
+                         (Decimal('30.00'), 2, Decimal('15.00')))
+
+        cheaper.price = '80.00'
+        cheaper.save()
+        self.assertEqual(self.cell().min_price, Decimal('60.00'))
+
+        cheaper.delete()
+        self.assertEqual(self.cell().offer_count, 1)
+
+        self.offer.status = 'taken'
+        self.offer.save()
+        self.assertFalse(RoutePriceCalendar.objects.exists())
+
+    def test_cells_follow_flight_changes_in_local_time(self):
+        # 22:00 UTC is already the next day in Yerevan (UTC+4).
+        moved = (self.departure + timedelta(days=5)).replace(hour=22, minute=0, second=0, microsecond=0,
+                                                            tzinfo=dt_timezone.utc)
+        old_day = self.local_date(self.departure)
+        self.flight.departure_datetime = moved
+        self.flight.arrival_datetime = moved + timedelta(hours=5)
+        self.flight.save()
+
+        self.assertFalse(RoutePriceCalendar.objects.filter(departure_date=old_day).exists())
+        self.assertEqual(self.cell(moved.date() + timedelta(days=1)).offer_count, 1)
+
+    def test_rebuild_command(self):
+        self.add_offer('30.00', '5.00', self.departure + timedelta(days=1))
+        expected = sorted(RoutePriceCalendar.objects.values_list('departure_date', 'min_price', 'offer_count'))
+        RoutePriceCalendar.objects.all().delete()
+
+        out = StringIO()
+        call_command('rebuild_route_price_calendar', stdout=out)
+        self.assertIn('Wrote 2 calendar cells.', out.getvalue())
+        self.assertEqual(sorted(RoutePriceCalendar.objects.values_list('departure_date', 'min_price', 'offer_count')),
+                         expected)
+
+    @override_settings(REFERENCE_DATA_CHECK_INTERVAL=3600)
+    def test_month_endpoint_reads_calendar_once(self):
+        next_month = self.local_date(self.departure).replace(day=1) + timedelta(days=32)
+        self.add_offer('30.00', '5.00', datetime.combine(next_month, dt_time(12), tzinfo=dt_timezone.utc))
+        locations.get()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('route-price-calendar'), {
+                'origin_airport': 'EVN', 'destination_airport': 'LHR',
+                'month': self.local_date(self.departure).strftime('%Y-%m'),
+            })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['departure_date'], self.local_date(self.departure).isoformat())
+        self.assertEqual(response.data[0]['min_price'], '60.00')
+
+    def test_month_endpoint_rejects_bad_month(self):
+        response = self.client.get(reverse('route-price-calendar'), {
+            'origin_airport': 'EVN', 'destination_airport': 'LHR', 'month': '2025-13',
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('month', response.data)
+
+
+class ConcurrentPriceCalendarTest(OfferSearchFixtureMixin, TransactionTestCase):
+    def test_parallel_offers_on_one_cell_are_all_counted(self):
+        departure = self.departure
+        barrier = threading.Barrier(6)
+
+        def create(number):
+            barrier.wait()
+            try:
+                for _ in range(50):
+                    try:
+                        create_offers(self.courier, [{
+                            'flight_number': f'FR{number}', 'from_airport_id': self.evn.id,
+                            'to_airport_id': self.lhr.id, 'departure_datetime': departure,
+                            'arrival_datetime': departure + timedelta(hours=5), 'available_weight': Decimal('10.00'),
+                            'available_space': Decimal('1.00'), 'price': Decimal('50.00'),
+                        }])
+                        return
+                    except OperationalError:
+                        # SQLite allows one writer at a time and reports the others as locked.
+                        time.sleep(0.01)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=create, args=(number,)) for number in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        cell = RoutePriceCalendar.objects.get(from_airport=self.evn, to_airport=self.lhr,
+                                              departure_date=departure.astimezone(ZoneInfo('Asia/Yerevan')).date())
+        self.assertEqual(cell.offer_count, 7)
+
+
+class BulkOfferCreationTest(OfferSearchFixtureMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.courier)
+        self.url = reverse('offer-bulk-create')
+        self.fragile = ItemCategory.objects.create(name='Fragile', description='Glass')
+
+    def trip(self, days=10, **overrides):
+        departure = timezone.now() + timedelta(days=days)
+        return {
+            'flight_number': 'FL100',
+            'from_airport_id': self.evn.id,
+            'to_airport_id': self.lhr.id,
+            'departure_datetime': departure.isoformat(),
+            'arrival_datetime': (departure + timedelta(hours=5)).isoformat(),
+            'category_ids': [self.category.id],
+            'allow_fragile': True,
+            'available_dimensions': '30x40x20',
+            'available_weight': '10.00',
+            'available_space': '1.00',
+            'price': '50.00',
+            **overrides,
+        }
+
+    def test_fifty_trips_in_a_handful_of_queries(self):
+        locations.get()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'trips': [self.trip(days=day) for day in range(4, 54)]},
+                                        format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertLess(len(queries), 25)
+
+        offer_ids = [result['offer_id'] for result in response.data['results']]
+        self.assertEqual(len(offer_ids), 50)
+        offer = Offer.objects.get(pk=offer_ids[0])
+        self.assertEqual((offer.dim_large, offer.dim_medium, offer.dim_small), (40.0, 30.0, 20.0))
+        self.assertEqual(set(offer.categories.values_list('pk', flat=True)), {self.category.id, self.fragile.id})
+        self.assertEqual(OfferSearchIndex.objects.filter(offer_id__in=offer_ids).count(), 50)
+        self.assertEqual(RoutePriceCalendar.objects.filter(min_price=Decimal('50.00')).count(), 50)
+
+    def test_weekly_recurrence(self):
+        response = self.client.post(self.url, {
+            'trip': self.trip(),
+            'recurrence': {'frequency': 'weekly', 'count': 4},
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        departures = [result['departure_datetime'] for result in response.data['results']]
+        self.assertEqual([later - earlier for earlier, later in zip(departures, departures[1:])],
+                         [timedelta(weeks=1)] * 3)
+
+    def test_recurrence_keeps_the_local_departure_time_across_dst(self):
+        chicago = City.objects.create(country=self.evn.city.country, city_code='CHI', city_abbr='CH',
+                                      city_name='Chicago', timezone='America/Chicago')
+        ord_airport = Airport.objects.create(city=chicago, airport_code='ORD', airport_name="O'Hare")
+        # US daylight saving time ends on 2030-11-03.
+        departure = datetime(2030, 10, 27, 14, 0, tzinfo=ZoneInfo('America/Chicago'))
+        trips = recurring_trips({'from_airport_id': ord_airport.id, 'departure_datetime': departure,
+                                 'arrival_datetime': departure + timedelta(hours=3)}, 'weekly', 2)
+        later = trips[1]['departure_datetime'].astimezone(ZoneInfo('America/Chicago'))
+        self.assertEqual((later.date().isoformat(), later.hour), ('2030-11-03', 14))
+        self.assertEqual(trips[1]['arrival_datetime'] - trips[1]['departure_datetime'], timedelta(hours=3))
+
+    def test_invalid_trip_creates_nothing(self):
+        offers_before = Offer.objects.count()
+        response = self.client.post(self.url, {
+            'trips': [self.trip(), self.trip(price='500.00'), self.trip(to_airport_id=999999)],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.data['trips']
+        self.assertEqual(len(errors), 3)
+        self.assertEqual(errors[0], {})
+        self.assertIn('price', errors[1])
+        self.assertIn('to_airport_id', errors[2])
+        self.assertEqual(Offer.objects.count(), offers_before)
+
+    def test_invalid_trip_lists_are_rejected(self):
+        for trips in ([], 'abc', [self.trip()] * 101):
+            response = self.client.post(self.url, {'trips': trips}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('trips', response.data)
+
+    def test_trip_requires_recurrence(self):
+        response = self.client.post(self.url, {'trip': self.trip()}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_searches_see_new_offers_after_commit(self):
+        departure = timezone.now() + timedelta(days=10)
+        params = {'origin_airport': 'EVN', 'destination_airport': 'LHR',
+                  'takeoff_date': timezone.localdate(departure).isoformat()}
+        self.assertEqual(self.client.get(reverse('search_offer'), params).data, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {'trips': [self.trip()]}, format='json')
+        offer_id = response.data['results'][0]['offer_id']
+        self.assertEqual([offer['id'] for offer in self.client.get(reverse('search_offer'), params).data], [offer_id])
+
+
+@override_settings(REFERENCE_DATA_CHECK_INTERVAL=3600)
+class OfferCreationQueryCountTest(OfferSearchFixtureMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.courier)
+        self.fragile = ItemCategory.objects.create(name='Fragile', description='Glass')
+        departure = timezone.now() + timedelta(days=10)
+        self.payload = {
+            'flight_number': 'FL100',
+            'from_airport_id': self.evn.id,
+            'to_airport_id': self.lhr.id,
+            'departure_datetime': departure.isoformat(),
+            'arrival_datetime': (departure + timedelta(hours=5)).isoformat(),
+            'category_ids': [self.category.id],
+            'allow_fragile': True,
+            'available_dimensions': '30x40x20',
+            'available_weight': '10.00',
+            'available_space': '1.00',
+            'price': '50.00',
+        }
+
+    def test_create_offer_query_budget(self):
+        locations.get()
+        category_registry.get()
+        # The canonical flight insert and lookup, three inserts, three reads and one upsert to index the
+        # offer, a cell lock, one read and one upsert for the price calendar, and the savepoints of three
+        # atomic blocks.
+        with self.assertNumQueries(18):
+            response = self.client.post(reverse('offer-create'), self.payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+
+        offer = Offer.objects.get(pk=response.data['offer_id'])
+        self.assertEqual(set(offer.categories.values_list('pk', flat=True)), {self.category.id, self.fragile.id})
+        self.assertEqual(offer.search_index.price, Decimal('50.00'))
+        self.assertEqual(ItemCategory.objects.filter(name='Fragile').count(), 1)
+
+    def test_failed_create_leaves_no_rows(self):
+        flights_before = Flight.objects.count()
+        with mock.patch('offers.creation.Offer.objects.bulk_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.post(reverse('offer-create'), self.payload, format='json')
+        self.assertEqual(Flight.objects.count(), flights_before)
+        self.assertFalse(UserFlight.objects.filter(flight__flight_number='FL100').exists())
+
+
+
+class OfferExpiryTest(OfferSearchFixtureMixin, APITestCase):
+    def add_departed_offer(self, hours_ago=2):
+        departure = timezone.now() - timedelta(hours=hours_ago)
+        flight = Flight.objects.create(creator=self.courier, from_airport=self.evn, to_airport=self.lhr,
+                                       departure_datetime=departure, arrival_datetime=departure + timedelta(hours=5))
+        user_flight = UserFlight.objects.create(flight=flight, user=self.courier)
+        return Offer.objects.create(user_flight=user_flight, courier=self.courier, price='40.00',
+                                    available_weight='10.00', available_space='1.00')
+
+    def add_request(self, offer, status_value='pending'):
+        item = Item.objects.create(user=self.courier, name='Book', weight='1.00', dimensions='20x15x3')
+        return Request.objects.create(item=item, offer=offer, requester=self.courier, status=status_value)
+
+    def test_departed_offers_expire_in_batches(self):
+        departed = [self.add_departed_offer(hours) for hours in (1, 2, 30)]
+        pending = self.add_request(departed[0])
+        accepted = self.add_request(departed[1], 'in_process')
+        upcoming = self.add_request(self.offer)
+        self.assertTrue(RoutePriceCalendar.objects.filter(offer_count=2).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(expire_offers(batch_size=2), 3)
+
+        self.assertEqual(set(Offer.objects.filter(status='expired').values_list('pk', flat=True)),
+                         {offer.pk for offer in departed})
+        self.assertEqual(OfferSearchIndex.objects.filter(status='expired').count(), 3)
+        self.assertEqual(Offer.objects.get(pk=self.offer.pk).status, 'available')
+        self.assertEqual(Request.objects.get(pk=pending.pk).status, 'expired')
+        self.assertEqual(Request.objects.get(pk=accepted.pk).status, 'in_process')
+        self.assertEqual(Request.objects.get(pk=upcoming.pk).status, 'pending')
+        self.assertEqual(list(RoutePriceCalendar.objects.values_list('departure_date', 'offer_count')),
+                         [(self.offer.search_index.departure_local_date, 1)])
+        self.assertEqual(expire_offers(), 0)
+
+    def test_batch_cost_does_not_depend_on_its_size(self):
+        self.add_departed_offer()
+        with CaptureQueriesContext(connection) as single:
+            expire_offers()
+        for hours in range(1, 11):
+            self.add_request(self.add_departed_offer(hours))
+        with CaptureQueriesContext(connection) as many:
+            expire_offers()
+        self.assertEqual(len(many), len(single))
+
+    def test_expired_offers_leave_the_listings(self):
+        expired = self.add_departed_offer()
+        call_command('expire_offers', stdout=StringIO())
+
+        listed = [offer['id'] for offer in self.client.get(reverse('get-all-offers')).json()]
+        self.assertIn(self.offer.id, listed)
+        self.assertNotIn(expired.id, listed)
+
+    def test_command(self):
+        self.add_departed_offer()
+        out = StringIO()
+        call_command('expire_offers', '--batch-size', '10', stdout=out)
+        self.assertIn('Expired 1 offers.', out.getvalue())
+
+
+class CanonicalFlightTest(OfferSearchFixtureMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.other_courier = Users.objects.create_user(email='other-courier@example.com', password='password123',
+                                                       passport_verification_status='verified')
+        self.departure = timezone.now() + timedelta(days=10)
+
+    def trip(self, **overrides):
+        return {
+            'flight_number': 'FR1234',
+            'from_airport_id': self.evn.id,
+            'to_airport_id': self.lhr.id,
+            'departure_datetime': self.departure,
+            'arrival_datetime': self.departure + timedelta(hours=5),
+            'available_weight': Decimal('10.00'),
+            'available_space': Decimal('1.00'),
+            'price': Decimal('50.00'),
+            **overrides,
+        }
+
+    def test_couriers_on_the_same_flight_share_its_row(self):
+        first, = create_offers(self.courier, [self.trip()])
+        second, third = create_offers(self.other_courier, [self.trip(), self.trip()])
+        self.assertEqual(first.user_flight.flight_id, second.user_flight.flight_id)
+        self.assertEqual(second.user_flight.flight_id, third.user_flight.flight_id)
+        flight = Flight.objects.get(pk=first.user_flight.flight_id)
+        self.assertEqual(flight.departure_date, self.departure.astimezone(ZoneInfo('Asia/Yerevan')).date())
+        self.assertEqual(flight.user_flights.count(), 3)
+
+    def test_other_days_numbers_and_custom_flights_are_separate(self):
+        offers = create_offers(self.courier, [
+            self.trip(),
+            self.trip(departure_datetime=self.departure + timedelta(days=1)),
+            self.trip(flight_number='FR9999'),
+            self.trip(publisher='custom'),
+            self.trip(publisher='custom'),
+        ])
+        self.assertEqual(len({offer.user_flight.flight_id for offer in offers}), 5)
+
+    def test_same_flight_to_another_destination_is_rejected(self):
+        first, = create_offers(self.courier, [self.trip()])
+        cdg = Airport.objects.create(city=self.evn.city, airport_code='CDG', airport_name='Charles de Gaulle')
+        self.client.force_authenticate(self.other_courier)
+        response = self.client.post(reverse('offer-create'), {
+            'flight_number': 'FR1234',
+            'from_airport_id': self.evn.id,
+            'to_airport_id': cdg.id,
+            'departure_datetime': self.departure.isoformat(),
+            'arrival_datetime': (self.departure + timedelta(hours=5)).isoformat(),
+            'available_weight': '10.00',
+            'available_space': '1.00',
+            'price': '50.00',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('flight_number', response.data)
+        self.assertFalse(Offer.objects.filter(courier=self.other_courier).exists())
+        flight = Flight.objects.get(pk=first.user_flight.flight_id)
+        self.assertEqual((flight.to_airport_id, flight.user_flights.count()), (self.lhr.id, 1))
+        self.assertEqual(OfferSearchIndex.objects.get(offer=first).to_airport_code, 'LHR')
+
+    def test_same_flight_at_other_times_creates_nothing(self):
+        create_offers(self.courier, [self.trip()])
+        later = self.departure + timedelta(hours=3)
+        offers_before = Offer.objects.count()
+        with self.assertRaises(FlightConflict) as raised:
+            create_offers(self.other_courier, [
+                self.trip(flight_number='FR9999'),
+                self.trip(departure_datetime=later, arrival_datetime=later + timedelta(hours=5)),
+            ])
+        self.assertEqual(raised.exception.indexes, [1])
+        self.assertEqual(Offer.objects.count(), offers_before)
+        self.assertFalse(Flight.objects.filter(flight_number='FR9999').exists())
+
+    def test_unique_key_is_enforced(self):
+        create_offers(self.courier, [self.trip()])
+        duplicate = Flight(creator=self.courier, flight_number='FR1234', from_airport=self.evn, to_airport=self.lhr,
+                           departure_datetime=self.departure, arrival_datetime=self.departure + timedelta(hours=5))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            duplicate.save()
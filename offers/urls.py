@@ -3,9 +3,10 @@
 from django.urls import path
 from .views.flight_views import FlightListCreateAPIView, \
     FlightDetailAPIView, FlightSearchAPIView
-from .views.search_offer_view import OfferSearchView, OfferGetAllView, AdvancedOfferSearchView
+from .views.search_offer_view import OfferSearchView, OfferGetAllView, AdvancedOfferSearchView, \
+    SearchCacheStatsView, ItemMatchingOffersView, ConnectionSearchView, RoutePriceCalendarView
 from .views.user_flight_views import UserFlightListCreateAPIView, UserFlightDetailAPIView
-from .views.offer_views import CreateOfferAPIView, OfferDetailAPIView, OfferListCreateAPIView, GetUserOffersView
+from .views.offer_views import CreateOfferAPIView, BulkCreateOfferAPIView, OfferDetailAPIView, OfferListCreateAPIView, GetUserOffersView
 
 urlpatterns = [
     # path('flights/', FlightListCreateAPIView.as_view(), name='flight-list-create'),
@@ -16,9 +17,14 @@ urlpatterns = [
     # path('userflights/', UserFlightListCreateAPIView.as_view(), name='userflight-list-create'),
     # path('userflights/<int:pk>/', UserFlightDetailAPIView.as_view(), name='userflight-detail'),
     path('create_offer/', CreateOfferAPIView.as_view(), name='offer-create'),
+    path('create_offers/', BulkCreateOfferAPIView.as_view(), name='offer-bulk-create'),
     path('search_offer/', OfferSearchView.as_view(), name='search_offer'),
     path('advanced_search/', AdvancedOfferSearchView.as_view(), name='offer-advanced-search'),
+    path('connection_search/', ConnectionSearchView.as_view(), name='offer-connection-search'),
+    path('route_calendar/', RoutePriceCalendarView.as_view(), name='route-price-calendar'),
+    path('search_cache/stats/', SearchCacheStatsView.as_view(), name='search-cache-stats'),
     path('get_all_offers/', OfferGetAllView.as_view(), name='get-all-offers'),
     path('my_offers/', GetUserOffersView.as_view(), name='my-offers'),
+    path('items/<int:item_id>/matching_offers/', ItemMatchingOffersView.as_view(), name='item-matching-offers'),
 ]
 
@@ -7,6 +7,8 @@ from rest_framework import generics, permissions, filters
 from rest_framework import status
 from rest_framework.response import Response
 
+from core.query_planner import QueryPlanMixin
+from locations.registry import locations
 from .pegination_view import StandardResultsSetPagination
 from ..models import Flight
 from ..models import Offer
@@ -14,7 +16,8 @@ from ..serializer.flight_serializer import FlightSerializer
 from ..serializer.offer_serializer import OfferCreateSerializer
 
 
-class FlightListCreateAPIView(generics.ListCreateAPIView):
+class FlightListCreateAPIView(QueryPlanMixin, generics.ListCreateAPIView):
+    queryset = Flight.objects.all()
     serializer_class = FlightSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     pagination_class = StandardResultsSetPagination
@@ -107,7 +110,7 @@ class FlightDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
         return super().delete(request, *args, **kwargs)
 
 
-class FlightSearchAPIView(generics.ListAPIView):
+class FlightSearchAPIView(QueryPlanMixin, generics.ListAPIView):
     serializer_class = OfferCreateSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     pagination_class = StandardResultsSetPagination
@@ -164,11 +167,14 @@ class FlightSearchAPIView(generics.ListAPIView):
         queryset = self.get_queryset()
 
         try:
+            # City names are matched in memory; the query filters on indexed airport ids.
             if origin:
-                queryset = queryset.filter(user_flight__flight__from_airport__city__city_name__icontains=origin)
+                queryset = queryset.filter(user_flight__flight__from_airport_id__in=self.airport_ids_in_cities(origin))
 
             if destination:
-                queryset = queryset.filter(user_flight__flight__to_airport__city__city_name__icontains=destination)
+                queryset = queryset.filter(
+                    user_flight__flight__to_airport_id__in=self.airport_ids_in_cities(destination)
+                )
 
             if departure_date_from:
                 parsed_date_from = parse_date(departure_date_from)
@@ -198,4 +204,10 @@ class FlightSearchAPIView(generics.ListAPIView):
         except ValidationError as e:
             return Response(e.message_dict, status=status.HTTP_400_BAD_REQUEST)
 
-        return self.list(request, *args, **kwargs)
+        page = self.paginate_queryset(self.filter_queryset(queryset))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @staticmethod
+    def airport_ids_in_cities(name):
+        return sorted(locations.airport_ids(city_ids=locations.city_ids_matching(name)))
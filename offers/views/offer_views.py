@@ -4,12 +4,16 @@ from drf_yasg.utils import swagger_auto_schema
 from rest_framework import generics, permissions, filters
 from rest_framework import status
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 
+from core.query_planner import QueryPlanMixin, optimize_queryset
+from offers.compact import CompactJSONRenderer, COMPACT_FORMAT_PARAMETER, render_offers
 from offers.models import Offer
 from offers.serializer.offer_serializer import OfferCreateSerializer, OfferSerializer
 from offers.serializer.offer_unified_serializer import UnifiedOfferCreationSerializer
-from offers.views.pegination_view import StandardResultsSetPagination
+from offers.serializer.bulk_offer_serializer import BulkOfferCreationSerializer
+from offers.views.pegination_view import StandardResultsSetPagination, KEYSET_PAGINATION_PARAMETERS
 
 
 class CreateOfferAPIView(APIView):
@@ -38,6 +42,40 @@ class CreateOfferAPIView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class BulkCreateOfferAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Create offers for many trips at once: a list of trips, or one trip repeated "
+                              "daily or weekly. All trips are validated first and created together.",
+        request_body=BulkOfferCreationSerializer,
+        responses={
+            201: "Offers created successfully.",
+            400: "Bad Request - Invalid data, with the errors of every trip",
+            401: "Unauthorized",
+        }
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = BulkOfferCreationSerializer(data=request.data, context={'request': request})
+        if serializer.is_valid():
+            offers = serializer.save()
+            return Response(
+                {
+                    "message": f"{len(offers)} offers were successfully created.",
+                    "results": [
+                        {
+                            "offer_id": offer.id,
+                            "flight_id": offer.user_flight.flight_id,
+                            "departure_datetime": offer.user_flight.flight.departure_datetime,
+                        }
+                        for offer in offers
+                    ],
+                },
+                status=status.HTTP_201_CREATED
+            )
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
 class OfferDetailAPIView(APIView):
     queryset = Offer.objects.all()
     serializer_class = OfferCreateSerializer
@@ -60,7 +98,7 @@ class OfferDetailAPIView(APIView):
             )
 
         try:
-            offer = Offer.objects.select_related("user_flight__user", "user_flight__flight").get(pk=pk)
+            offer = optimize_queryset(Offer.objects.all(), OfferSerializer).get(pk=pk)
             offer_data = OfferSerializer(offer, context={"request": request}).data
             return Response({"offer": offer_data}, status=status.HTTP_200_OK)
         except Offer.DoesNotExist:
@@ -104,7 +142,7 @@ class OfferDetailAPIView(APIView):
         return super().delete(request, *args, **kwargs)
 
 
-class OfferListCreateAPIView(generics.ListCreateAPIView):
+class OfferListCreateAPIView(QueryPlanMixin, generics.ListCreateAPIView):
     queryset = Offer.objects.all().order_by('price')
     serializer_class = OfferCreateSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
@@ -148,10 +186,12 @@ class OfferListCreateAPIView(generics.ListCreateAPIView):
 
 class GetUserOffersView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, CompactJSONRenderer]
     serializer_class = OfferSerializer
 
     @swagger_auto_schema(
         operation_description="Retrieve a list of offers created by the authenticated user.",
+        manual_parameters=KEYSET_PAGINATION_PARAMETERS + [COMPACT_FORMAT_PARAMETER],
         responses={
             200: OfferSerializer(many=True),
             401: "Unauthorized",
@@ -160,6 +200,5 @@ class GetUserOffersView(APIView):
     def get(self, request, *args, **kwargs):
         # return
         user = request.user
-        offers = Offer.objects.filter(courier=user)
-        serializer = OfferSerializer(offers, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        data = render_offers(request, Offer.objects.filter(courier=user))
+        return Response(data, status=status.HTTP_200_OK)
\ No newline at end of file
@@ -1,6 +1,150 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from drf_yasg import openapi
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
+
+from core.query_planner import optimize_queryset
+
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
+
+
+KEYSET_PAGINATION_PARAMETERS = [
+    openapi.Parameter('pagination', openapi.IN_QUERY, description="Set to 'cursor' to receive keyset pages",
+                      type=openapi.TYPE_STRING),
+    openapi.Parameter('cursor', openapi.IN_QUERY, description="Opaque cursor from the previous page's 'next' link",
+                      type=openapi.TYPE_STRING),
+    openapi.Parameter('page_size', openapi.IN_QUERY, description="Number of offers per page (max 100)",
+                      type=openapi.TYPE_INTEGER),
+]
+
+
+class KeysetPagination:
+    """
+    Cursor pagination on a composite sort key, e.g. (price, departure, id).
+
+    Pages are fetched with a `WHERE key > last_key` condition instead of OFFSET,
+    no COUNT query is run, and rows inserted before the cursor position never
+    shift later pages. The last column of the ordering must be unique.
+    """
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    opt_in_query_param = 'pagination'
+    opt_in_value = 'cursor'
+    ordering = ('search_index__price', 'search_index__departure_datetime', 'id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = ordering
+        self.keys = [f'keyset_{position}' for position in range(len(self.ordering))]
+        self.next_cursor = None
+        self.request = None
+
+    def is_requested(self, request):
+        params = request.query_params
+        return params.get(self.opt_in_query_param) == self.opt_in_value or self.cursor_query_param in params
+
+    def query_params(self, request):
+        """The request parameters that select a page, e.g. for building cache keys."""
+        names = (self.opt_in_query_param, self.cursor_query_param, self.page_size_query_param)
+        return {name: request.query_params.get(name) for name in names if name in request.query_params}
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def encode_cursor(self, values):
+        payload = json.dumps(values, default=str).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+    def ordering_fields(self, model):
+        """The model fields the ordering paths end on."""
+        fields = []
+        for path in self.ordering:
+            *relations, name = path.split('__')
+            opts = model._meta
+            for relation in relations:
+                opts = opts.get_field(relation).related_model._meta
+            fields.append(opts.get_field(name))
+        return fields
+
+    def decode_cursor(self, cursor, model):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.keys):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            values = [field.to_python(value) for field, value in zip(self.ordering_fields(model), values)]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in values:
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def _after(self, values):
+        condition = Q()
+        for position, key in enumerate(self.keys):
+            step = Q(**{f'{key}__gt': values[position]})
+            for previous in range(position):
+                step &= Q(**{self.keys[previous]: values[previous]})
+            condition |= step
+        return condition
+
+    def paginate_queryset(self, queryset, request):
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.annotate(**{
+            key: F(path) for key, path in zip(self.keys, self.ordering)
+        }).order_by(*self.keys)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self._after(self.decode_cursor(cursor, queryset.model)))
+
+        page = list(queryset[:page_size + 1])
+        if len(page) > page_size:
+            page = page[:page_size]
+            last = page[-1]
+            self.next_cursor = self.encode_cursor([getattr(last, key) for key in self.keys])
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'results': data,
+        }
+
+
+def render_list(request, queryset, serializer_class, pagination_class=KeysetPagination):
+    """
+    Serializes `queryset` with its query plan applied. Clients that opt in with
+    `?pagination=cursor` get a keyset page, everyone else the full list.
+    """
+    queryset = optimize_queryset(queryset, serializer_class)
+    paginator = pagination_class()
+    if not paginator.is_requested(request):
+        return list(serializer_class(queryset, many=True).data)
+    page = paginator.paginate_queryset(queryset, request)
+    return paginator.get_paginated_data(list(serializer_class(page, many=True).data))
@@ -1,20 +1,35 @@
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
-from rest_framework.permissions import AllowAny
+from django.shortcuts import get_object_or_404
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.settings import api_settings
 
 from offers.serializer.offer_serializer import OfferSerializer
 from offers.serializer.search_offer_serializer import OfferSearchSerializer
 from offers.serializer.advanced_offer_search_serializer import AdvancedOfferSearchSerializer
+from offers.serializer.connection_search_serializer import ConnectionSearchSerializer
+from offers.serializer.price_calendar_serializer import RoutePriceCalendarQuerySerializer, \
+    RoutePriceCalendarSerializer
+from core.streaming import NDJSONRenderer, streaming_response
+from items.models.items import Item
+from offers.matching import matching_offers
 from offers.models import Offer
+from offers import search_cache
+from offers.compact import CompactJSONRenderer, COMPACT_FORMAT_PARAMETER, format_params, render_offers
+from offers.views.pegination_view import KeysetPagination, KEYSET_PAGINATION_PARAMETERS
 
 
 class OfferSearchView(APIView):
     permission_classes = [AllowAny]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, CompactJSONRenderer]
+
     @swagger_auto_schema(
         exclude=False,
         query_serializer=OfferSearchSerializer,
+        manual_parameters=KEYSET_PAGINATION_PARAMETERS + [COMPACT_FORMAT_PARAMETER],
         operation_description="Retrieve detailed information about a specific flight offer.",
         responses={
             200: OfferSearchSerializer(),
@@ -26,19 +41,41 @@ class OfferSearchView(APIView):
         serializer = OfferSearchSerializer(data=request.query_params)
 
         if serializer.is_valid():
-            offers = serializer.search_offers()
-
-            serialized_offers = OfferSerializer(offers, many=True)
+            data = search_cache.get_or_compute(
+                'search_offer',
+                {**serializer.validated_data, **KeysetPagination().query_params(request), **format_params(request)},
+                lambda: self.render(request, serializer),
+            )
 
-            return Response(serialized_offers.data, status=status.HTTP_200_OK)
+            return Response(data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @staticmethod
+    def render(request, serializer):
+        data = render_offers(request, serializer.search_offers())
+        if not serializer.validated_data['flex_days']:
+            return data
+        # Flexible searches add a per-day summary of the whole window.
+        if isinstance(data, list):
+            data = {'results': data}
+        data['days'] = serializer.day_summary()
+        return data
+
 class OfferGetAllView(APIView):
     permission_classes = [AllowAny]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer, CompactJSONRenderer]
+    stream_chunk_size = 500
 
     @swagger_auto_schema(
-        operation_description="Retrieve all offers.",
+        operation_description="Retrieve all offers that have not expired.",
+        manual_parameters=KEYSET_PAGINATION_PARAMETERS + [
+            COMPACT_FORMAT_PARAMETER,
+            openapi.Parameter('stream', openapi.IN_QUERY,
+                              description="Set to 'true' to stream the full list as a chunked JSON array. "
+                                          "Send 'Accept: application/x-ndjson' for newline-delimited JSON.",
+                              type=openapi.TYPE_STRING),
+        ],
         responses={
             200: "Returned the list of offers successfully.",
             400: "Bad request.",
@@ -46,17 +83,22 @@ class OfferGetAllView(APIView):
         }
     )
     def get(self, request, *args, **kwargs):
-        offers = Offer.objects.all()
-        serialized_offers = OfferSerializer(offers, many=True)
-        return Response(serialized_offers.data, status=status.HTTP_200_OK)
+        ndjson = request.accepted_renderer.format == NDJSONRenderer.format
+        if ndjson or request.query_params.get('stream') in ('1', 'true'):
+            return streaming_response(Offer.objects.exclude(status='expired'), OfferSerializer, self.stream_chunk_size, ndjson=ndjson)
+
+        data = render_offers(request, Offer.objects.exclude(status='expired'))
+        return Response(data, status=status.HTTP_200_OK)
 
 
 class AdvancedOfferSearchView(APIView):
     permission_classes = [AllowAny]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, CompactJSONRenderer]
 
     @swagger_auto_schema(
         exclude=False,
         query_serializer=AdvancedOfferSearchSerializer,
+        manual_parameters=KEYSET_PAGINATION_PARAMETERS + [COMPACT_FORMAT_PARAMETER],
         operation_description="Search offers with advanced filters",
         responses={
             200: OfferSerializer(many=True),
@@ -66,8 +108,87 @@ class AdvancedOfferSearchView(APIView):
     def get(self, request, *args, **kwargs):
         serializer = AdvancedOfferSearchSerializer(data=request.query_params)
         if serializer.is_valid():
-            offers = serializer.search_offers()
-            serialized_offers = OfferSerializer(offers, many=True)
-            return Response(serialized_offers.data, status=status.HTTP_200_OK)
+            data = search_cache.get_or_compute(
+                'advanced_search',
+                {**serializer.validated_data, **KeysetPagination().query_params(request), **format_params(request)},
+                lambda: render_offers(request, serializer.search_offers()),
+            )
+            return Response(data, status=status.HTTP_200_OK)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ConnectionSearchView(APIView):
+    permission_classes = [AllowAny]
+
+    @swagger_auto_schema(
+        query_serializer=ConnectionSearchSerializer,
+        operation_description="Itineraries with one or two stops over connecting courier offers, "
+                              "respecting a minimum connection time and every leg's remaining capacity.",
+        responses={
+            200: "Returned the itineraries, earliest arrival first.",
+            400: "Bad Request",
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        serializer = ConnectionSearchSerializer(data=request.query_params)
+        if serializer.is_valid():
+            data = serializer.render(serializer.search_itineraries())
+            return Response(data, status=status.HTTP_200_OK)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class RoutePriceCalendarView(APIView):
+    permission_classes = [AllowAny]
+
+    @swagger_auto_schema(
+        query_serializer=RoutePriceCalendarQuerySerializer,
+        operation_description="Cheapest price, offer count and total available weight of a route "
+                              "for every local departure date of a month that has available offers.",
+        responses={
+            200: RoutePriceCalendarSerializer(many=True),
+            400: "Bad Request",
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        serializer = RoutePriceCalendarQuerySerializer(data=request.query_params)
+        if serializer.is_valid():
+            data = RoutePriceCalendarSerializer(serializer.cells(), many=True).data
+            return Response(data, status=status.HTTP_200_OK)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ItemMatchingOffersView(APIView):
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, CompactJSONRenderer]
+
+    @swagger_auto_schema(
+        operation_description="Offers that can carry one of the user's items: enough weight, "
+                              "room for its dimensions in any orientation, and accepted categories.",
+        manual_parameters=KEYSET_PAGINATION_PARAMETERS + [COMPACT_FORMAT_PARAMETER],
+        responses={
+            200: OfferSerializer(many=True),
+            401: "Unauthorized",
+            404: "Item not found",
+        }
+    )
+    def get(self, request, item_id, *args, **kwargs):
+        item = get_object_or_404(Item, pk=item_id, user=request.user)
+        data = render_offers(request, matching_offers(item))
+        return Response(data, status=status.HTTP_200_OK)
+
 
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+class SearchCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Hit/miss counters of the offer search result cache.",
+        responses={
+            200: "Returned the cache counters.",
+            403: "Forbidden",
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        return Response(search_cache.stats(), status=status.HTTP_200_OK)
@@ -5,12 +5,13 @@ from rest_framework import generics, permissions, filters
 from rest_framework import status
 from rest_framework.response import Response
 
+from core.query_planner import QueryPlanMixin
 from .pegination_view import StandardResultsSetPagination
 from ..models import UserFlight
 from ..serializer.user_flight_serializer import UserFlightSerializer
 
 
-class UserFlightListCreateAPIView(generics.ListCreateAPIView):
+class UserFlightListCreateAPIView(QueryPlanMixin, generics.ListCreateAPIView):
     queryset = UserFlight.objects.all().order_by('-publish_datetime')
     serializer_class = UserFlightSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
@@ -13,12 +13,13 @@ django_asgi_app = get_asgi_application()
 
 from chat.middleware import JWTAuthMiddleware
 import chat.routing
+import flight_requests.routing
 
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
     "websocket": JWTAuthMiddleware(AuthMiddlewareStack(
         URLRouter(
-            chat.routing.websocket_urlpatterns
+            chat.routing.websocket_urlpatterns + flight_requests.routing.websocket_urlpatterns
         )
     )),
 })
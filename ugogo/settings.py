@@ -235,4 +235,55 @@ CHANNEL_LAYERS = {
             "hosts": [f"rediss://default:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}"],
         },
     }
-}
\ No newline at end of file
+}
+
+# Offer search result cache: 'locmem' (per process) or 'redis' (shared between workers)
+OFFER_SEARCH_CACHE_BACKEND = env("OFFER_SEARCH_CACHE_BACKEND", default="locmem")
+OFFER_SEARCH_CACHE_TIMEOUT = 300
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "offer_search": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "offer-search",
+        "TIMEOUT": OFFER_SEARCH_CACHE_TIMEOUT,
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+}
+
+if OFFER_SEARCH_CACHE_BACKEND == "redis":
+    CACHES["offer_search"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": f"rediss://default:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}/1",
+        "KEY_PREFIX": "offer_search",
+        "TIMEOUT": OFFER_SEARCH_CACHE_TIMEOUT,
+    }
+
+# Seconds between version checks of the in-process location and category registries.
+REFERENCE_DATA_CHECK_INTERVAL = env.int("REFERENCE_DATA_CHECK_INTERVAL", default=5)
+
+# Seconds HTTP caches may serve version-stamped collections (core.conditional) without revalidating.
+CONDITIONAL_GET_MAX_AGE = env.int("CONDITIONAL_GET_MAX_AGE", default=60)
+
+# Seconds between runs of the offer expiry job in `manage.py run_scheduler`.
+OFFER_EXPIRY_INTERVAL = env.int("OFFER_EXPIRY_INTERVAL", default=300)
+
+# Seconds a request holds its item's weight on the offer while the sender pays. Stripe
+# checkout sessions, which expire with the hold, must last at least 30 minutes.
+CAPACITY_HOLD_TTL = env.int("CAPACITY_HOLD_TTL", default=2100)
+# Seconds past their expiry before unpaid holds are released, so a sender paying just before the
+# checkout session expires is confirmed before the reaper runs. Holds of paid requests are never released.
+CAPACITY_HOLD_GRACE = env.int("CAPACITY_HOLD_GRACE", default=600)
+# Seconds between runs of the job releasing expired holds in `manage.py run_scheduler`.
+CAPACITY_HOLD_REAP_INTERVAL = env.int("CAPACITY_HOLD_REAP_INTERVAL", default=60)
+
+# Seconds between runs of the Stripe checkout outbox worker in `manage.py run_scheduler`, and the
+# number of attempts at creating a session before the checkout fails and its hold is released.
+CHECKOUT_OUTBOX_INTERVAL = env.int("CHECKOUT_OUTBOX_INTERVAL", default=2)
+CHECKOUT_OUTBOX_MAX_ATTEMPTS = env.int("CHECKOUT_OUTBOX_MAX_ATTEMPTS", default=5)
+
+# Connection search: minimum and maximum time between two legs of an itinerary.
+ROUTE_MIN_CONNECTION_MINUTES = env.int("ROUTE_MIN_CONNECTION_MINUTES", default=60)
+ROUTE_MAX_LAYOVER_HOURS = env.int("ROUTE_MAX_LAYOVER_HOURS", default=24)